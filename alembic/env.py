@@ -10,9 +10,10 @@ from app.brands.brands_model import Brand
 from app.categories.categories_model import Category
 from app.fx_rates.fx_rates_model import FxRate
 from app.parts.parts_model import Part
+from app.part_price_snapshot.part_price_snapshot_model import PartPriceSnapshot
 from app.pricing_rules.pricing_rules_model import PricingRule
 from app.shipping_rates.shipping_rates_model import ShippingRate
-from app.shipping_zones.shipping_zones_model import ShippingZone
+from app.shipping_zones.shipping_zones_model import ShippingZone, ShippingZoneCountry
 from app.subcategories.subcategories_model import Subcategory
 from app.supplier_price.supplier_price_model import SupplierPrice
 from app.suppliers.suppliers_model import Supplier
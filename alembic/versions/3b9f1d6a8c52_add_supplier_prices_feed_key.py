@@ -0,0 +1,58 @@
+"""Add supplier prices feed key
+
+Revision ID: 3b9f1d6a8c52
+Revises: e81b3d6c4f27
+Create Date: 2025-12-07 10:15:26.381940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9f1d6a8c52'
+down_revision: Union[str, Sequence[str], None] = 'e81b3d6c4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NAME = 'uq_supplier_prices_supplier_warehouse_sku'
+COLUMNS = ['supplier_id', 'warehouse_id', 'supplier_sku']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The feed importer upserts on this key. Existing duplicates have to be
+    # resolved by hand, there is no safe way to pick which offer to keep.
+    context = op.get_context()
+    if not context.as_sql:
+        duplicates = op.get_bind().execute(
+            sa.text(
+                "SELECT supplier_id, warehouse_id, supplier_sku, count(*) FROM supplier_prices "
+                "GROUP BY supplier_id, warehouse_id, supplier_sku HAVING count(*) > 1 LIMIT 10"
+            )
+        ).all()
+        if duplicates:
+            listed = ", ".join(f"({s}, {w}, {sku!r}) x{n}" for s, w, sku, n in duplicates)
+            raise RuntimeError(f"supplier_prices has duplicate (supplier_id, warehouse_id, supplier_sku) keys: {listed}")
+
+    # Built concurrently like the indexes in c5d8e2f17a03
+    with context.autocommit_block():
+        invalid = not context.as_sql and op.get_bind().execute(
+            sa.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": NAME},
+        ).first()
+        if invalid:
+            op.drop_index(NAME, table_name='supplier_prices', postgresql_concurrently=True)
+        op.create_index(NAME, 'supplier_prices', COLUMNS, unique=True, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(NAME, table_name='supplier_prices', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,48 @@
+"""Add part_price_snapshot table
+
+Revision ID: 4c1e7b9d2a51
+Revises: 110812f61a30
+Create Date: 2025-12-02 14:12:37.418905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7b9d2a51'
+down_revision: Union[str, Sequence[str], None] = '110812f61a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('part_price_snapshot',
+    sa.Column('part_id', sa.Integer(), nullable=False),
+    sa.Column('supplier_price_id', sa.Integer(), nullable=True),
+    sa.Column('cost_pln', sa.Numeric(precision=19, scale=2), nullable=True),
+    sa.Column('selling_price', sa.Numeric(precision=19, scale=2), nullable=True),
+    sa.Column('availability_status', sa.String(), nullable=True),
+    sa.Column('lead_time_days', sa.Integer(), nullable=True),
+    sa.Column('warehouse_region', sa.String(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.Column('dirty_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['part_id'], ['parts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['supplier_price_id'], ['supplier_prices.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('part_id')
+    )
+    # Partial index keeps the recompute queue scan cheap
+    op.create_index('ix_part_price_snapshot_dirty_at', 'part_price_snapshot', ['dirty_at'], postgresql_where=sa.text('dirty_at IS NOT NULL'))
+    op.create_index('ix_part_price_snapshot_warehouse_region', 'part_price_snapshot', ['warehouse_region'])
+    # Queue every existing part for the first recompute
+    op.execute("INSERT INTO part_price_snapshot (part_id, dirty_at) SELECT id, now() FROM parts")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_part_price_snapshot_warehouse_region', table_name='part_price_snapshot')
+    op.drop_index('ix_part_price_snapshot_dirty_at', table_name='part_price_snapshot')
+    op.drop_table('part_price_snapshot')
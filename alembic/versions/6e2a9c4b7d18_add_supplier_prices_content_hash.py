@@ -0,0 +1,42 @@
+"""Add supplier prices content hash
+
+Revision ID: 6e2a9c4b7d18
+Revises: 3b9f1d6a8c52
+Create Date: 2025-12-08 09:41:17.602853
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a9c4b7d18'
+down_revision: Union[str, Sequence[str], None] = '3b9f1d6a8c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same expression as SupplierPrice.content_hash
+CONTENT_HASH = (
+    "md5(coalesce(base_price::text, '') || '|' || coalesce(currency::text, '') || '|' || "
+    "coalesce(available_qty::text, '') || '|' || coalesce(stock_status::text, '') || '|' || "
+    "coalesce(lead_time_days::text, '') || '|' || coalesce(min_order_qty::text, '') || '|' || "
+    "coalesce(pack_size::text, ''))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A stored generated column rewrites supplier_prices once, under an exclusive lock
+    op.add_column(
+        'supplier_prices',
+        sa.Column('content_hash', postgresql.CHAR(length=32), sa.Computed(CONTENT_HASH, persisted=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('supplier_prices', 'content_hash')
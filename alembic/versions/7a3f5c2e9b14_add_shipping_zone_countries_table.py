@@ -0,0 +1,72 @@
+"""Add shipping_zone_countries table
+
+Revision ID: 7a3f5c2e9b14
+Revises: 4c1e7b9d2a51
+Create Date: 2025-12-04 10:27:51.204637
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3f5c2e9b14'
+down_revision: Union[str, Sequence[str], None] = '4c1e7b9d2a51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Initial mapping: the zones the cart used to hardcode, extended to every
+# ISO 3166-1 country and all EU member states
+ISO_COUNTRY_CODES = """
+    AD AE AF AG AI AL AM AO AQ AR AS AT AU AW AX AZ BA BB BD BE BF BG BH BI BJ BL BM BN BO
+    BQ BR BS BT BV BW BY BZ CA CC CD CF CG CH CI CK CL CM CN CO CR CU CV CW CX CY CZ DE DJ
+    DK DM DO DZ EC EE EG EH ER ES ET FI FJ FK FM FO FR GA GB GD GE GF GG GH GI GL GM GN GP
+    GQ GR GS GT GU GW GY HK HM HN HR HT HU ID IE IL IM IN IO IQ IR IS IT JE JM JO JP KE KG
+    KH KI KM KN KP KR KW KY KZ LA LB LC LI LK LR LS LT LU LV LY MA MC MD ME MF MG MH MK ML
+    MM MN MO MP MQ MR MS MT MU MV MW MX MY MZ NA NC NE NF NG NI NL NO NP NR NU NZ OM PA PE
+    PF PG PH PK PL PM PN PR PS PT PW PY QA RE RO RS RU RW SA SB SC SD SE SG SH SI SJ SK SL
+    SM SN SO SR SS ST SV SX SY SZ TC TD TF TG TH TJ TK TL TM TN TO TR TT TV TW TZ UA UG UM
+    US UY UZ VA VC VE VG VI VN VU WF WS YE YT ZA ZM ZW
+""".split()
+EU_COUNTRY_CODES = "AT BE BG CY CZ DE DK EE ES FI FR GR HR HU IE IT LT LU LV MT NL PT RO SE SI SK".split()
+
+
+def _zone_name(code: str) -> str:
+    if code == "PL":
+        return "Poland"
+    if code in EU_COUNTRY_CODES:
+        return "EU"
+    if code in ("US", "CA"):
+        return "North America"
+    return "Rest of World"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('shipping_zone_countries',
+    sa.Column('country_code', postgresql.CHAR(length=2), nullable=False),
+    sa.Column('shipping_zone_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['shipping_zone_id'], ['shipping_zones.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('country_code')
+    )
+    op.create_index(op.f('ix_shipping_zone_countries_shipping_zone_id'), 'shipping_zone_countries', ['shipping_zone_id'], unique=False)
+    # Zones are matched by name the way the cart did (first ILIKE match);
+    # countries whose zone does not exist are left unmapped
+    values = ", ".join(f"('{code}', '{_zone_name(code)}')" for code in ISO_COUNTRY_CODES)
+    op.execute(
+        "INSERT INTO shipping_zone_countries (country_code, shipping_zone_id) "
+        "SELECT DISTINCT ON (v.code) v.code, z.id "
+        f"FROM (VALUES {values}) AS v(code, zone) "
+        "JOIN shipping_zones z ON z.name ILIKE '%' || v.zone || '%' "
+        "ORDER BY v.code, z.id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_shipping_zone_countries_shipping_zone_id'), table_name='shipping_zone_countries')
+    op.drop_table('shipping_zone_countries')
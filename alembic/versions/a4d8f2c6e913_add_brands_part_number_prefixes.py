@@ -0,0 +1,28 @@
+"""Add brands part number prefixes
+
+Revision ID: a4d8f2c6e913
+Revises: 6e2a9c4b7d18
+Create Date: 2025-12-09 11:02:44.519306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8f2c6e913'
+down_revision: Union[str, Sequence[str], None] = '6e2a9c4b7d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('brands', sa.Column('part_number_prefixes', sa.ARRAY(sa.String()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('brands', 'part_number_prefixes')
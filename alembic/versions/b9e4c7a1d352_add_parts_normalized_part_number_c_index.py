@@ -0,0 +1,48 @@
+"""Add parts normalized part number C index
+
+Revision ID: b9e4c7a1d352
+Revises: a4d8f2c6e913
+Create Date: 2025-12-10 10:14:27.603118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4c7a1d352'
+down_revision: Union[str, Sequence[str], None] = 'a4d8f2c6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX = 'ix_parts_normalized_part_number_c'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently, dropping an INVALID leftover first, as in c5d8e2f17a03
+    context = op.get_context()
+    with context.autocommit_block():
+        invalid = not context.as_sql and op.get_bind().execute(
+            sa.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": INDEX},
+        ).first()
+        if invalid:
+            op.drop_index(INDEX, table_name='parts', postgresql_concurrently=True)
+        op.create_index(
+            INDEX, 'parts', [sa.text('normalized_part_number COLLATE "C"')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(INDEX, table_name='parts', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,58 @@
+"""Add hot path indexes
+
+Revision ID: c5d8e2f17a03
+Revises: 7a3f5c2e9b14
+Create Date: 2025-12-05 09:41:18.532704
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8e2f17a03'
+down_revision: Union[str, Sequence[str], None] = '7a3f5c2e9b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# fx_rates (from_currency, to_currency) is already covered by the index
+# behind its unique constraint
+INDEXES = [
+    ('ix_supplier_prices_part_id', 'supplier_prices', ['part_id']),
+    ('ix_supplier_prices_supplier_id', 'supplier_prices', ['supplier_id']),
+    ('ix_supplier_prices_warehouse_id', 'supplier_prices', ['warehouse_id']),
+    ('ix_parts_brand_id_normalized_part_number', 'parts', ['brand_id', 'normalized_part_number']),
+    ('ix_pricing_rules_active_region_priority', 'pricing_rules', ['is_active', 'warehouse_region', 'priority']),
+    ('ix_shipping_rates_zone_region_weight', 'shipping_rates', ['shipping_zone_id', 'warehouse_region', 'weight_min', 'weight_max']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY does not lock out writes but cannot run inside
+    # a transaction. A build that failed halfway leaves an INVALID index that
+    # IF NOT EXISTS would skip, so those are dropped and rebuilt.
+    context = op.get_context()
+    with context.autocommit_block():
+        for name, table, columns in INDEXES:
+            # Nothing to inspect when only rendering SQL (alembic upgrade --sql)
+            invalid = not context.as_sql and op.get_bind().execute(
+                sa.text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ),
+                {"name": name},
+            ).first()
+            if invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
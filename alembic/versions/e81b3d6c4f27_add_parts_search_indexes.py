@@ -0,0 +1,68 @@
+"""Add parts search indexes
+
+Revision ID: e81b3d6c4f27
+Revises: c5d8e2f17a03
+Create Date: 2025-12-06 11:08:42.917356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81b3d6c4f27'
+down_revision: Union[str, Sequence[str], None] = 'c5d8e2f17a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same expression as Part.search_vector
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+INDEXES = [
+    ('ix_parts_part_number_trgm', 'part_number', 'gin_trgm_ops'),
+    ('ix_parts_normalized_part_number_trgm', 'normalized_part_number', 'gin_trgm_ops'),
+    ('ix_parts_search_vector', 'search_vector', None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # A stored generated column rewrites parts once, under an exclusive lock
+    op.add_column('parts', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True))
+    # GIN builds are the slow part, so they run concurrently as in c5d8e2f17a03
+    context = op.get_context()
+    with context.autocommit_block():
+        for name, column, ops in INDEXES:
+            invalid = not context.as_sql and op.get_bind().execute(
+                sa.text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ),
+                {"name": name},
+            ).first()
+            if invalid:
+                op.drop_index(name, table_name='parts', postgresql_concurrently=True)
+            op.create_index(
+                name, 'parts', [column],
+                postgresql_using='gin',
+                postgresql_ops={column: ops} if ops else {},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='parts', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('parts', 'search_vector')
+    # pg_trgm is left installed, other objects may depend on it
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import delete, func, select, update
+from typing import List, Optional
 
-from db_connection import engine
 from app.brands.brands_model import Brand
 from app.parts.parts_model import Part
+from app.pricing_rules.pricing_rules_model import PricingRule
+from app.pricing_rules.pricing_rules_index import pricing_rule_index
+from app.part_price_snapshot.part_price_snapshot_service import mark_dirty_for_rules, rule_scope, snapshot_refresher
+from app.statistics_cache import statistics_cache
 from app.brands.brands_schema import (
     BrandCreate,
     BrandUpdate,
     BrandResponse,
 )
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
 
 from db_routers_connection import get_db
 
@@ -21,11 +26,15 @@ router = APIRouter(prefix="/api/brands/admin", tags=["brands-admin"])
 @router.get("", response_model=List[BrandResponse])
 # Admin: list brands
 def list_brands_admin(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
-    return db.query(Brand).offset(skip).limit(limit).all()
+    brands = paginate(db.query(Brand), Brand.id, cursor, skip, limit).all()
+    set_next_cursor(response, brands, limit)
+    return brands
 
 
 @router.post("", response_model=BrandResponse, status_code=201)
@@ -97,42 +106,54 @@ def delete_brand(
     if parts_count > 0 and not force:
         raise HTTPException(status_code=409, detail="Cannot delete brand with existing parts without force=true")
 
+    widened = _unscope_rules(db, [brand_id])
     db.delete(db_brand)
     db.commit()
+    _rules_widened(db, widened)
     return None
 
 
+def _unscope_rules(db: Session, brand_ids: List[int]) -> list:
+    # Rules scoped to a deleted brand lose the scope, as the ORM delete did.
+    # The widened rule matches every part the scoped one did, so queueing its
+    # new scope covers the parts it priced before as well as the new ones.
+    widened = db.execute(
+        update(PricingRule)
+        .where(any_id(PricingRule.brand_id, brand_ids))
+        .values(brand_id=None)
+        .returning(PricingRule.warehouse_region, PricingRule.brand_id, PricingRule.category_id, PricingRule.supplier_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    mark_dirty_for_rules(db, [rule_scope(r) for r in widened])
+    return widened
+
+
+def _rules_widened(db: Session, widened: list) -> None:
+    if widened:
+        pricing_rule_index.rebuild(db)
+        snapshot_refresher.wake()
+
+
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create brands
 def bulk_create_brands(
     brands_data: List[BrandCreate],
     db: Session = Depends(get_db),
 ):
-    created = 0
-    failed = 0
-    errors: List[str] = []
-    to_insert: List[Brand] = []
-
-    for idx, data in enumerate(brands_data):
-        try:
-            existing = db.query(Brand).filter(Brand.name == data.name).first()
-            if existing:
-                raise ValueError(f"Row {idx + 1}: Brand name '{data.name}' already exists (ID: {existing.id})")
-            to_insert.append(Brand(**data.dict()))
-            created += 1
-        except Exception as e:
-            errors.append(str(e))
-            failed += 1
-
-    if to_insert:
-        db.add_all(to_insert)
+    check = BulkValidation(brands_data).unique(
+        (Brand.name,), lambda b, id: f"Brand name '{b.name}' already exists (ID: {id})"
+    ).run(db)
+
+    if check.valid:
+        db.add_all([Brand(**data.dict()) for data in check.valid])
         db.commit()
+    created, failed = len(check.valid), check.failed
 
     return {
         "total": len(brands_data),
         "created": created,
         "failed": failed,
-        "errors": errors,
+        "errors": check.errors,
         "message": f"Created {created} brands, {failed} failed",
     }
 
@@ -144,34 +165,31 @@ def bulk_delete_brands(
     force: bool = Query(False, description="Force delete even if parts exist"),
     db: Session = Depends(get_db),
 ):
+
     if not ids:
         raise HTTPException(status_code=400, detail="No brand IDs provided")
 
-    deleted = 0
-    failed = 0
-    errors: List[str] = []
-
-    for brand_id in ids:
-        try:
-            db_brand = db.query(Brand).filter(Brand.id == brand_id).first()
-            if not db_brand:
-                errors.append(f"Brand ID {brand_id} not found")
-                failed += 1
-                continue
-
-            parts_count = db.query(Part).filter(Part.brand_id == db_brand.id).count()
-            if parts_count > 0 and not force:
-                errors.append(f"Brand ID {brand_id} ({db_brand.name}) has {parts_count} parts")
-                failed += 1
-                continue
-
-            db.delete(db_brand)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"Brand ID {brand_id}: {str(e)}")
-            failed += 1
-
+    # One grouped dependency check for the whole list
+    parts_count = select(func.count()).where(Part.brand_id == Brand.id).scalar_subquery()
+    found = db.execute(select(Brand.id, Brand.name, parts_count).where(any_id(Brand.id, ids))).all()
+    blocked = {
+        brand_id: f"Brand ID {brand_id} ({name}) has {count} parts"
+        for brand_id, name, count in found
+        if count > 0 and not force
+    }
+    to_delete = [brand_id for brand_id, _, _ in found if brand_id not in blocked]
+
+    deleted_ids, widened = [], []
+    if to_delete:
+        widened = _unscope_rules(db, to_delete)
+        deleted_ids = db.scalars(
+            delete(Brand).where(any_id(Brand.id, to_delete)).returning(Brand.id).execution_options(synchronize_session=False)
+        ).all()
     db.commit()
+    _rules_widened(db, widened)
+
+    deleted, errors = delete_report(ids, deleted_ids, lambda brand_id: f"Brand ID {brand_id} not found", blocked)
+    failed = len(errors)
     return {
         "total": len(ids),
         "deleted": deleted,
@@ -184,22 +202,35 @@ def bulk_delete_brands(
 @router.get("/stats", response_model=dict)
 # Admin: brand statistics
 def get_brand_statistics(db: Session = Depends(get_db)):
-    total_brands = db.query(Brand).count()
+    return statistics_cache.cached("brands", lambda: _brand_statistics(db))
 
-    brands_with_counts = (
+
+def _brand_statistics(db: Session) -> dict:
+    counts = (
         db.query(Brand.id, Brand.name, func.count(Part.id).label("parts_count"))
         .outerjoin(Part, Part.brand_id == Brand.id)
         .group_by(Brand.id, Brand.name)
+        .subquery()
+    )
+    # The window totals are computed over every brand before LIMIT keeps the top 5
+    top_5 = (
+        db.query(
+            counts,
+            func.count().over().label("total_brands"),
+            func.count().filter(counts.c.parts_count > 0).over().label("brands_with_parts"),
+            func.sum(counts.c.parts_count).over().label("total_parts"),
+        )
+        .order_by(counts.c.parts_count.desc(), counts.c.id)
+        .limit(5)
         .all()
     )
 
-    brands_with_parts = sum(1 for b in brands_with_counts if b.parts_count > 0)
+    total_brands = top_5[0].total_brands if top_5 else 0
+    brands_with_parts = top_5[0].brands_with_parts if top_5 else 0
     brands_without_parts = total_brands - brands_with_parts
-    total_parts = sum(b.parts_count for b in brands_with_counts)
+    total_parts = int(top_5[0].total_parts) if top_5 else 0
     avg_parts = total_parts / total_brands if total_brands > 0 else 0
 
-    top_5 = sorted(brands_with_counts, key=lambda x: x.parts_count, reverse=True)[:5]
-
     return {
         "total_brands": total_brands,
         "brands_with_parts": brands_with_parts,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import ARRAY, Column, Integer, String
 from app.db_base import Base
 from sqlalchemy.orm import relationship
 
@@ -8,6 +8,8 @@ class Brand(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
+    # Prefixes stripped from this brand's part numbers when they are normalized
+    part_number_prefixes = Column(ARRAY(String), nullable=True)
 
     parts = relationship('app.parts.parts_model.Part', back_populates='brand')
     pricing_rules = relationship('app.pricing_rules.pricing_rules_model.PricingRule', back_populates='brand')
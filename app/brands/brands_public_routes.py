@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
 from sqlalchemy.orm import Session, sessionmaker
-from typing import List
+from typing import List, Optional
 
 from app.brands.brands_model import Brand
 from app.brands.brands_schema import BrandResponse
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
 
-from db_routers_connection import get_db
+from db_routers_connection import get_read_db
 
 
 router = APIRouter(prefix="/api/brands", tags=["brands-public"])
@@ -14,35 +15,44 @@ router = APIRouter(prefix="/api/brands", tags=["brands-public"])
 @router.get("/", response_model=List[BrandResponse])
 # Public: list brands
 def list_brands(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_read_db),
 ):
-    return db.query(Brand).offset(skip).limit(limit).all()
+    brands = paginate(db.query(Brand), Brand.id, cursor, skip, limit).all()
+    set_next_cursor(response, brands, limit)
+    return brands
 
 
 @router.get("/search", response_model=List[BrandResponse])
 # Public: search brands by name
 def search_brands(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=100),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_read_db),
 ):
-    return (
-        db.query(Brand)
-        .filter(Brand.name.ilike(f"%{name}%"))
-        .offset(skip)
-        .limit(limit)
+    brands = (
+        paginate(
+            db.query(Brand)
+            .filter(Brand.name.ilike(f"%{name}%")),
+            Brand.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, brands, limit)
+    return brands
 
 
 @router.get("/{brand_id}", response_model=BrandResponse)
 # Public: get brand detail
 def get_brand(
     brand_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     brand = db.query(Brand).filter(Brand.id == brand_id).first()
     if not brand:
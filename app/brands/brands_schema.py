@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class BaseConfig:
     from_attributes = True
@@ -7,12 +7,15 @@ class BaseConfig:
 class BrandResponse(BaseModel):
     id: int
     name: str
+    part_number_prefixes: Optional[List[str]] = None
 
     class Config:
         from_attributes = True
 
 class BrandCreate(BaseModel):
     name: str = Field(min_length=1, max_length=200)
+    part_number_prefixes: Optional[List[str]] = Field(None, description="Prefixes stripped from part numbers of this brand")
     
 class BrandUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=200)
+    part_number_prefixes: Optional[List[str]] = None
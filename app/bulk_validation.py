@@ -0,0 +1,195 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import ARRAY, Integer, any_, bindparam, select, tuple_
+
+
+# Values per lookup query; asyncpg allows at most 32767 bind parameters per
+# statement and a composite key uses one per column
+BULK_LOOKUP_CHUNK = 5000
+
+
+def lookup_chunks(values: list, size: int = BULK_LOOKUP_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class _Exists:
+    def __init__(self, column, field: str, message: Callable[[Any], str]):
+        self.column = column
+        self.field = field
+        self.message = message
+        self.found: Set[Any] = set()
+
+    def lookups(self, rows: Sequence):
+        values = sorted({getattr(row, self.field) for row in rows} - {None})
+        for chunk in lookup_chunks(values):
+            yield select(self.column).where(self.column.in_(chunk)), self.collect
+
+    def collect(self, result) -> None:
+        self.found.update(value for (value,) in result)
+
+    def error(self, row, index: int) -> Optional[str]:
+        value = getattr(row, self.field)
+        if value is not None and value not in self.found:
+            return self.message(row)
+        return None
+
+
+class _Unique:
+    def __init__(self, columns: Sequence, key: Callable[[Any], tuple], message: Callable[[Any, int], str]):
+        self.columns = columns
+        self.key = key
+        self.message = message
+        self.existing: Dict[tuple, int] = {}
+        self.seen: Dict[tuple, int] = {}
+
+    def lookups(self, rows: Sequence):
+        keys = sorted({self.key(row) for row in rows} - {None}, key=repr)
+        id_column = self.columns[0].class_.id
+        for chunk in lookup_chunks(keys):
+            if len(self.columns) == 1:
+                where = self.columns[0].in_([k[0] for k in chunk])
+            else:
+                where = tuple_(*self.columns).in_(chunk)
+            yield select(*self.columns, id_column).where(where), self.collect
+
+    def collect(self, result) -> None:
+        for row in result:
+            self.existing[tuple(row[:-1])] = row[-1]
+
+    def error(self, row, index: int) -> Optional[str]:
+        key = self.key(row)
+        if key is None:
+            return None
+        if key in self.existing:
+            return self.message(row, self.existing[key])
+        if key in self.seen:
+            return f"Duplicate of row {self.seen[key]} in this batch"
+        return None
+
+    def accept(self, row, index: int) -> None:
+        key = self.key(row)
+        if key is not None:
+            self.seen[key] = index
+
+
+class _Rule:
+    def __init__(self, ok: Callable[[Any], bool], message: Callable[[Any], str]):
+        self.ok = ok
+        self.message = message
+
+    def lookups(self, rows: Sequence):
+        return ()
+
+    def error(self, row, index: int) -> Optional[str]:
+        return None if self.ok(row) else self.message(row)
+
+
+class BulkValidation:
+    """Checks a bulk-create batch with one query per referenced table.
+
+    Checks are registered in the order a single-row create runs them. `run`
+    (or `run_async`) loads every referenced id and every taken unique key of
+    the batch in chunks of BULK_LOOKUP_CHUNK, then walks the rows in memory:
+    a row gets the message of its first failing check, and a row repeating
+    the unique key of an earlier accepted row fails as a duplicate.
+    """
+
+    def __init__(self, rows: Sequence, start: int = 1):
+        # start is the row number of rows[0], for batches checked in chunks
+        self.rows = rows
+        self.start = start
+        self._checks: list = []
+        self.valid: List[Any] = []
+        self.errors: List[str] = []
+
+    def exists(self, column, field: str, message: Callable[[Any], str]) -> "BulkValidation":
+        # Rows whose field is None reference nothing and pass
+        self._checks.append(_Exists(column, field, message))
+        return self
+
+    def unique(
+        self,
+        columns: Sequence,
+        message: Callable[[Any, int], str],
+        key: Optional[Callable[[Any], Optional[tuple]]] = None,
+    ) -> "BulkValidation":
+        # The message gets the row and the id of the existing record
+        if key is None:
+            key = lambda row: tuple(getattr(row, column.key) for column in columns)
+        self._checks.append(_Unique(columns, key, message))
+        return self
+
+    def rule(self, ok: Callable[[Any], bool], message: Callable[[Any], str]) -> "BulkValidation":
+        self._checks.append(_Rule(ok, message))
+        return self
+
+    def check(self, check) -> "BulkValidation":
+        # Any object with lookups(rows) and error(row, index), and optionally
+        # accept(row, index), which is called for every row that passes
+        self._checks.append(check)
+        return self
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def _lookups(self) -> List[Tuple[Any, Callable]]:
+        return [lookup for check in self._checks for lookup in check.lookups(self.rows)]
+
+    def _evaluate(self) -> "BulkValidation":
+        self.valid, self.errors = [], []
+        for index, row in enumerate(self.rows, self.start):
+            error = next((e for e in (check.error(row, index) for check in self._checks) if e), None)
+            if error:
+                self.errors.append(f"Row {index}: {error}")
+                continue
+            for check in self._checks:
+                if hasattr(check, "accept"):
+                    check.accept(row, index)
+            self.valid.append(row)
+        return self
+
+    def run(self, db) -> "BulkValidation":
+        for stmt, collect in self._lookups():
+            collect(db.execute(stmt).all())
+        return self._evaluate()
+
+    async def run_async(self, db) -> "BulkValidation":
+        for stmt, collect in self._lookups():
+            collect((await db.execute(stmt)).all())
+        return self._evaluate()
+
+
+def any_id(column, ids: Iterable[int]):
+    # `column = ANY(:ids)` binds the whole list as one array parameter, so a
+    # bulk delete of any size is a single statement
+    return column == any_(bindparam(None, list(ids), type_=ARRAY(Integer)))
+
+
+def delete_report(
+    ids: Sequence[int],
+    deleted_ids: Iterable[int],
+    not_found: Callable[[int], str],
+    blocked: Optional[Dict[int, str]] = None,
+) -> Tuple[int, List[str]]:
+    """Per-id outcome of a set-based bulk delete, in request order.
+
+    `deleted_ids` is what DELETE ... RETURNING gave back and `blocked` maps
+    ids kept by the dependency check to their error. An id repeated in the
+    request is deleted once and reported as not found afterwards, as the
+    row-by-row deletes did.
+    """
+    blocked = blocked or {}
+    remaining = set(deleted_ids)
+    deleted = 0
+    errors: List[str] = []
+    for id in ids:
+        if id in blocked:
+            errors.append(blocked[id])
+        elif id in remaining:
+            remaining.discard(id)
+            deleted += 1
+        else:
+            errors.append(not_found(id))
+    return deleted, errors
@@ -1,92 +1,125 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
 from sqlalchemy.orm import Session
 from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import csv
+import io
 
-from app.cart.cart_schema import CartPriceRequest, CartPriceResponse, CartItemOutput
-from app.shipping_rates.shipping_rates_model import ShippingRate
-from app.shipping_zones.shipping_zones_model import ShippingZone
+from app.cart.cart_schema import CartPriceRequest, CartPriceResponse, CartItemOutput, CartItemInput, MAX_CART_LINES
+from app.shipping_rates.shipping_rates_matrix import CompiledShippingRate, shipping_rate_matrix
+from app.shipping_zones.shipping_zones_resolver import country_zone_resolver
 from app.parts.parts_model import Part
-from app.parts.parts_public_routes import _choose_best_offer, _apply_pricing_rule
+from app.pricing_engine import price_parts
 
-from db_routers_connection import get_db
+from db_routers_connection import get_read_db
 
 
 router = APIRouter(prefix="/api/cart", tags=["cart"])
 
 
 def _get_shipping_zone_id(db: Session, country: str) -> int:
-    country = country.upper()
-    
-    if country in ["PL", "POLAND", "POLSKA"]:
-        zone_name = "Poland"
-    elif country in ["DE", "FR", "IT", "ES", "NL", "BE", "AT", "CZ"]:
-        zone_name = "EU"
-    elif country in ["US", "USA", "CA"]:
-        zone_name = "North America"
-    else:
-        zone_name = "Rest of World"
-    
-    zone = db.query(ShippingZone).filter(ShippingZone.name.ilike(f"%{zone_name}%")).first()
-    if not zone:
+    zone_id = country_zone_resolver.resolve(db, country)
+    if zone_id is None:
         raise HTTPException(400, f"Shipping zone not found for country: {country}")
-    return zone.id
+    return zone_id
 
 
-def _calculate_shipping(db: Session, zone_id: int, warehouse_region: str, total_weight: float) -> Decimal:
-    rate = db.query(ShippingRate).filter(
-        ShippingRate.shipping_zone_id == zone_id,
-        ShippingRate.warehouse_region == warehouse_region,
-        ShippingRate.weight_min <= total_weight,
-        ShippingRate.weight_max >= total_weight
-    ).first()
-    
+def _calculate_shipping(
+    db: Session,
+    zone_id: int,
+    warehouse_region: str,
+    total_weight: float,
+    carrier: Optional[str] = None,
+    service_level: Optional[str] = None,
+) -> Tuple[Decimal, Optional[CompiledShippingRate]]:
+    # Cheapest matching option from the in-memory rate matrix
+    rate = shipping_rate_matrix.get(db).cheapest(zone_id, warehouse_region, total_weight, carrier, service_level)
     if rate:
-        return Decimal(str(rate.price_pln))
-    return Decimal("50.00")  # Fallback
-
-
-def _get_part_price(db: Session, part_id: int) -> dict:
-    part = db.query(Part).filter(Part.id == part_id).first()
-    if not part:
-        raise HTTPException(404, f"Part {part_id} not found")
-    
-    offer = _choose_best_offer(db, part)
-    if not offer:
-        raise HTTPException(400, f"Part {part_id} has no available offers")
-    
-    selling_price = _apply_pricing_rule(db, part, offer)
-    availability = offer["availability_status"]
-    lead_time = offer["lead_time_days"]
-    min_days = (lead_time or 0) + 2
-    max_days = (lead_time or 0) + 5
-    delivery_range = f"{min_days}–{max_days} days"
-    warehouse_region = offer["warehouse"].region if offer.get("warehouse") else "EU"
-    
-    return {
-        "part_number": part.part_number,
-        "name": part.name,
-        "selling_price": selling_price,
-        "availability_status": availability,
-        "estimated_delivery_range": delivery_range,
-        "warehouse_region": warehouse_region
+        return rate.price_pln, rate
+    return Decimal("50.00"), None  # Fallback
+
+
+def _get_part_prices(db: Session, part_ids: List[int]) -> Dict[int, dict]:
+    # Fixed number of queries whatever the cart size: one for the parts,
+    # then the batched pricing engine
+    unique_ids = set(part_ids)
+    parts = {
+        row.id: row
+        for row in db.query(Part.id, Part.part_number, Part.name).filter(Part.id.in_(unique_ids)).all()
     }
+    quotes = price_parts(db, parts.keys(), use_snapshot=False)
 
+    result = {}
+    for part_id in part_ids:
+        if part_id in result:
+            continue
+        part = parts.get(part_id)
+        if not part:
+            raise HTTPException(404, f"Part {part_id} not found")
 
-@router.post("/price", response_model=CartPriceResponse)
-def calculate_cart_price(request: CartPriceRequest, db: Session = Depends(get_db)):    
+        quote = quotes[part_id]
+        if not quote.priced:
+            raise HTTPException(400, f"Part {part_id} has no available offers")
+
+        result[part_id] = {
+            "part_number": part.part_number,
+            "name": part.name,
+            "selling_price": quote.selling_price,
+            "availability_status": quote.availability_status,
+            "lead_time_days": quote.lead_time_days or 0,
+            "warehouse_region": quote.warehouse_region,
+        }
+    return result
+
+
+def _parse_cart_csv(content: bytes) -> List[CartItemInput]:
+    # Accepts "part_id,quantity" rows (comma, semicolon or tab separated),
+    # with or without a header line
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(400, "CSV must be UTF-8 encoded")
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    items: List[CartItemInput] = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text), dialect), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line_no == 1 and not row[0].strip().isdigit():
+            continue
+        try:
+            items.append(CartItemInput(part_id=int(row[0]), quantity=int(row[1])))
+        except (IndexError, ValueError):
+            raise HTTPException(400, f"Invalid CSV line {line_no}: expected part_id,quantity")
+
+    if not items:
+        raise HTTPException(400, "CSV contains no cart lines")
+    if len(items) > MAX_CART_LINES:
+        raise HTTPException(400, f"Cart exceeds {MAX_CART_LINES} lines")
+    return items
+
+
+def _price_cart(
+    db: Session,
+    items: List[CartItemInput],
+    delivery_country: str,
+    carrier: Optional[str] = None,
+    service_level: Optional[str] = None,
+) -> CartPriceResponse:
     items_output = []
     subtotal = Decimal("0")
-    warehouse_regions = []
-    delivery_ranges = []
-
-    for item in request.items:
-        part_data = _get_part_price(db, item.part_id)
-        
-        if not part_data["selling_price"]:
-            raise HTTPException(400, f"Part {item.part_id} has no available price")
-        
+    warehouse_regions = set()
+    max_lead_time = None
+
+    part_prices = _get_part_prices(db, [item.part_id for item in items])
+    for item in items:
+        part_data = part_prices[item.part_id]
         unit_price = part_data["selling_price"]
-        
+
         items_output.append(CartItemOutput(
             part_id=item.part_id,
             part_number=part_data["part_number"],
@@ -94,32 +127,53 @@ def calculate_cart_price(request: CartPriceRequest, db: Session = Depends(get_db
             quantity=item.quantity,
             unit_price_pln=unit_price
         ))
-        
+
         subtotal += unit_price * item.quantity
-        
+
         if part_data["warehouse_region"]:
-            warehouse_regions.append(part_data["warehouse_region"])
-        
-        if part_data["estimated_delivery_range"]:
-            delivery_ranges.append(part_data["estimated_delivery_range"])
-                                   
-    shipping_zone_id = _get_shipping_zone_id(db, request.delivery_country)
-    total_items = sum(item.quantity for item in request.items)
+            warehouse_regions.add(part_data["warehouse_region"])
+
+        if max_lead_time is None or part_data["lead_time_days"] > max_lead_time:
+            max_lead_time = part_data["lead_time_days"]
+
+    shipping_zone_id = _get_shipping_zone_id(db, delivery_country)
+    total_items = sum(item.quantity for item in items)
     estimated_weight = total_items * 1.0
-    
-    warehouse_region = "Non-EU" if "Non-EU" in warehouse_regions else (warehouse_regions[0] if warehouse_regions else "EU")
-    shipping_cost = _calculate_shipping(db, shipping_zone_id, warehouse_region, estimated_weight)
-    
-    if delivery_ranges:
-        max_delivery = max(delivery_ranges, key=lambda r: int(r.split("–")[-1].split()[0]) if "–" in r else 0)
-        delivery_days = max_delivery
+
+    first_region = part_prices[items[0].part_id]["warehouse_region"] if items else None
+    warehouse_region = "Non-EU" if "Non-EU" in warehouse_regions else (first_region or "EU")
+    shipping_cost, shipping_rate = _calculate_shipping(
+        db, shipping_zone_id, warehouse_region, estimated_weight, carrier, service_level
+    )
+
+    if max_lead_time is not None:
+        delivery_days = f"{max_lead_time + 2}–{max_lead_time + 5} days"
     else:
         delivery_days = "10-15 days"
-    
+
     return CartPriceResponse(
         items=items_output,
         subtotal_pln=subtotal.quantize(Decimal("0.01")),
         shipping_cost_pln=shipping_cost.quantize(Decimal("0.01")),
         total_pln=(subtotal + shipping_cost).quantize(Decimal("0.01")),
-        estimated_delivery_days=delivery_days
+        estimated_delivery_days=delivery_days,
+        shipping_carrier=shipping_rate.carrier if shipping_rate else None,
+        shipping_service_level=shipping_rate.service_level if shipping_rate else None,
     )
+
+
+@router.post("/price", response_model=CartPriceResponse)
+def calculate_cart_price(request: CartPriceRequest, db: Session = Depends(get_read_db)):
+    return _price_cart(db, request.items, request.delivery_country, request.carrier, request.service_level)
+
+
+@router.post("/price/csv", response_model=CartPriceResponse)
+# Public: price a cart uploaded as CSV (part_id,quantity per line)
+def calculate_cart_price_csv(
+    content: bytes = Body(..., media_type="text/csv"),
+    delivery_country: str = Query(..., min_length=2, max_length=100),
+    carrier: Optional[str] = Query(None, max_length=200),
+    service_level: Optional[str] = Query(None, max_length=200),
+    db: Session = Depends(get_read_db),
+):
+    return _price_cart(db, _parse_cart_csv(content), delivery_country, carrier, service_level)
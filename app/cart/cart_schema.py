@@ -1,16 +1,21 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from decimal import Decimal
 
 
+MAX_CART_LINES = 10000
+
+
 class CartItemInput(BaseModel):
     part_id: int = Field(gt=0)
     quantity: int = Field(gt=0)
 
 
 class CartPriceRequest(BaseModel):
-    items: List[CartItemInput] = Field(min_length=1)
+    items: List[CartItemInput] = Field(min_length=1, max_length=MAX_CART_LINES)
     delivery_country: str = Field(min_length=2, max_length=100)
+    carrier: Optional[str] = Field(None, max_length=200)
+    service_level: Optional[str] = Field(None, max_length=200)
 
 
 class CartItemOutput(BaseModel):
@@ -27,3 +32,5 @@ class CartPriceResponse(BaseModel):
     shipping_cost_pln: Decimal
     total_pln: Decimal
     estimated_delivery_days: str
+    shipping_carrier: Optional[str] = None
+    shipping_service_level: Optional[str] = None
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import delete, func, select, update
+from typing import List, Optional
 
 from app.categories.categories_schema import (
     CategoryCreate,
@@ -11,6 +11,12 @@ from app.categories.categories_schema import (
 from app.categories.categories_model import Category
 from app.subcategories.subcategories_model import Subcategory
 from app.parts.parts_model import Part
+from app.pricing_rules.pricing_rules_model import PricingRule
+from app.pricing_rules.pricing_rules_index import pricing_rule_index
+from app.part_price_snapshot.part_price_snapshot_service import mark_dirty_for_rules, rule_scope, snapshot_refresher
+from app.statistics_cache import statistics_cache
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
 
 from db_routers_connection import get_db
 
@@ -20,18 +26,21 @@ router = APIRouter(prefix="/api/categories/admin", tags=["categories-admin"])
 
 @router.get("/", response_model=List[CategoryResponse])
 # Admin: list categories
-async def list_all_categories_admin(
+def list_all_categories_admin(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
-    categories = db.query(Category).offset(skip).limit(limit).all()
+    categories = paginate(db.query(Category), Category.id, cursor, skip, limit).all()
+    set_next_cursor(response, categories, limit)
     return categories
 
 
 @router.post("/", response_model=CategoryResponse, status_code=201)
 # Admin: create category
-async def create_category(
+def create_category(
     category: CategoryCreate, db: Session = Depends(get_db)
 ):
     existing = db.query(Category).filter(Category.name == category.name).first()
@@ -52,7 +61,7 @@ async def create_category(
 
 @router.get("/{category_id}", response_model=CategoryResponse)
 # Admin: get category detail
-async def get_category_admin(
+def get_category_admin(
     category_id: int = Path(..., gt=0, description="Category ID"),
     db: Session = Depends(get_db),
 ):
@@ -66,7 +75,7 @@ async def get_category_admin(
 
 @router.put("/{category_id}", response_model=CategoryResponse)
 # Admin: update category
-async def update_category(
+def update_category(
     category_id: int = Path(..., gt=0, description="Category ID"),
     category_update: CategoryUpdate = None,
     db: Session = Depends(get_db),
@@ -96,7 +105,7 @@ async def update_category(
 
 @router.delete("/{category_id}", status_code=204)
 # Admin: delete category
-async def delete_category(
+def delete_category(
     category_id: int = Path(..., gt=0, description="Category ID"),
     force: bool = Query(False, description="Force delete even if parts/subcategories exist"),
     db: Session = Depends(get_db),
@@ -118,92 +127,94 @@ async def delete_category(
             ),
         )
 
+    widened = _unscope_rules(db, [category_id])
     db.delete(db_category)
     db.commit()
+    _rules_widened(db, widened)
+
+
+def _unscope_rules(db: Session, category_ids: List[int]) -> list:
+    # Rules scoped to a deleted category lose the scope, as the ORM delete did.
+    # The widened rule matches every part the scoped one did, so queueing its
+    # new scope covers the parts it priced before as well as the new ones.
+    widened = db.execute(
+        update(PricingRule)
+        .where(any_id(PricingRule.category_id, category_ids))
+        .values(category_id=None)
+        .returning(PricingRule.warehouse_region, PricingRule.brand_id, PricingRule.category_id, PricingRule.supplier_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    mark_dirty_for_rules(db, [rule_scope(r) for r in widened])
+    return widened
+
+
+def _rules_widened(db: Session, widened: list) -> None:
+    if widened:
+        pricing_rule_index.rebuild(db)
+        snapshot_refresher.wake()
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create categories
-async def bulk_create_categories(
+def bulk_create_categories(
     categories_data: List[CategoryCreate], db: Session = Depends(get_db)
 ):
-    created = 0
-    failed = 0
-    errors = []
-    categories_to_insert = []
-
-    for idx, category_data in enumerate(categories_data):
-        try:
-            existing = db.query(Category).filter(Category.name == category_data.name).first()
-            if existing:
-                errors.append(
-                    f"Row {idx + 1}: Category name '{category_data.name}' already exists (ID: {existing.id})"
-                )
-                failed += 1
-                continue
-
-            categories_to_insert.append(Category(**category_data.dict()))
-            created += 1
-
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
-
-    if categories_to_insert:
-        db.add_all(categories_to_insert)
+    check = BulkValidation(categories_data).unique(
+        (Category.name,), lambda c, id: f"Category name '{c.name}' already exists (ID: {id})"
+    ).run(db)
+
+    if check.valid:
+        db.add_all([Category(**category_data.dict()) for category_data in check.valid])
         db.commit()
+    created, failed = len(check.valid), check.failed
 
     return {
         "total": len(categories_data),
         "created": created,
         "failed": failed,
-        "errors": errors,
+        "errors": check.errors,
         "message": f"Created {created} categories, {failed} failed",
     }
 
 
 @router.get("/bulk-delete", response_model=dict)
 # Admin: bulk delete categories
-async def bulk_delete_categories(
+def bulk_delete_categories(
     ids: List[int] = Query(..., description="List of category IDs to delete"),
     force: bool = Query(False, description="Force delete even if parts/subcategories exist"),
     db: Session = Depends(get_db),
 ):
+
     if not ids:
         raise HTTPException(status_code=400, detail="No category IDs provided")
 
-    deleted = 0
-    failed = 0
-    errors = []
-
-    for category_id in ids:
-        try:
-            db_category = db.query(Category).filter(Category.id == category_id).first()
-
-            if not db_category:
-                errors.append(f"Category ID {category_id} not found")
-                failed += 1
-                continue
-
-            subcategories_count = db.query(Subcategory).filter(Subcategory.parent_id == category_id).count()
-            parts_count = db.query(Part).filter(Part.category_id == category_id).count()
-
-            if (subcategories_count > 0 or parts_count > 0) and not force:
-                errors.append(
-                    f"Category ID {category_id} ({db_category.name}) has {subcategories_count} subcategories and {parts_count} parts"
-                )
-                failed += 1
-                continue
-
-            db.delete(db_category)
-            deleted += 1
-
-        except Exception as e:
-            errors.append(f"Category ID {category_id}: {str(e)}")
-            failed += 1
-
+    # One grouped dependency check for the whole list
+    subcategories_count = select(func.count()).where(Subcategory.parent_id == Category.id).scalar_subquery()
+    parts_count = select(func.count()).where(Part.category_id == Category.id).scalar_subquery()
+    found = db.execute(
+        select(Category.id, Category.name, subcategories_count, parts_count).where(any_id(Category.id, ids))
+    ).all()
+    blocked = {
+        category_id: f"Category ID {category_id} ({name}) has {subcategories} subcategories and {parts} parts"
+        for category_id, name, subcategories, parts in found
+        if (subcategories > 0 or parts > 0) and not force
+    }
+    to_delete = [category_id for category_id, *_ in found if category_id not in blocked]
+
+    deleted_ids, widened = [], []
+    if to_delete:
+        widened = _unscope_rules(db, to_delete)
+        deleted_ids = db.scalars(
+            delete(Category)
+            .where(any_id(Category.id, to_delete))
+            .returning(Category.id)
+            .execution_options(synchronize_session=False)
+        ).all()
     db.commit()
+    _rules_widened(db, widened)
 
+    deleted, errors = delete_report(ids, deleted_ids, lambda category_id: f"Category ID {category_id} not found", blocked)
+    failed = len(errors)
     return {
         "total": len(ids),
         "deleted": deleted,
@@ -215,10 +226,12 @@ async def bulk_delete_categories(
 
 @router.get("/stats", response_model=dict)
 # Admin: category statistics
-async def get_category_statistics(db: Session = Depends(get_db)):
-    total_categories = db.query(Category).count()
+def get_category_statistics(db: Session = Depends(get_db)):
+    return statistics_cache.cached("categories", lambda: _category_statistics(db))
 
-    categories_with_counts = (
+
+def _category_statistics(db: Session) -> dict:
+    counts = (
         db.query(
             Category.id,
             Category.name,
@@ -226,19 +239,32 @@ async def get_category_statistics(db: Session = Depends(get_db)):
         )
         .outerjoin(Part, Category.id == Part.category_id)
         .group_by(Category.id, Category.name)
+        .subquery()
+    )
+    # The window totals are computed over every category before LIMIT keeps the top 5
+    top_5 = (
+        db.query(
+            counts,
+            func.count().over().label("total_categories"),
+            func.count().filter(counts.c.parts_count > 0).over().label("categories_with_parts"),
+            func.sum(counts.c.parts_count).over().label("total_parts"),
+            select(func.count()).select_from(Subcategory).scalar_subquery().label("total_subcategories"),
+        )
+        .order_by(counts.c.parts_count.desc(), counts.c.id)
+        .limit(5)
         .all()
     )
 
-    categories_with_parts = sum(1 for c in categories_with_counts if c.parts_count > 0)
+    total_categories = top_5[0].total_categories if top_5 else 0
+    categories_with_parts = top_5[0].categories_with_parts if top_5 else 0
     categories_without_parts = total_categories - categories_with_parts
-    total_parts = sum(c.parts_count for c in categories_with_counts)
+    total_parts = int(top_5[0].total_parts) if top_5 else 0
     avg_parts = total_parts / total_categories if total_categories > 0 else 0
 
-    total_subcategories = db.query(Subcategory).count()
+    # Subcategories need a parent category, so none exist without a row here
+    total_subcategories = top_5[0].total_subcategories if top_5 else 0
     avg_subcategories = total_subcategories / total_categories if total_categories > 0 else 0
 
-    top_5 = sorted(categories_with_counts, key=lambda x: x.parts_count, reverse=True)[:5]
-
     return {
         "total_categories": total_categories,
         "categories_with_parts": categories_with_parts,
@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from typing import List, Optional
 
 from app.categories.categories_schema import CategoryResponse
 from app.subcategories.subcategories_schema import SubcategoryResponse
 from app.categories.categories_model import Category
 from app.subcategories.subcategories_model import Subcategory
 from app.parts.parts_model import Part
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
 
-from db_routers_connection import get_db
+from db_routers_connection import get_async_read_db
 
 router = APIRouter(prefix="/api/categories", tags=["categories-public"]) 
 
@@ -17,29 +18,37 @@ router = APIRouter(prefix="/api/categories", tags=["categories-public"])
 @router.get("/", response_model=List[CategoryResponse])
 # Public: list categories
 async def list_categories(
+    response: Response,
     skip: int = Query(0, ge=0, description="Pagination: skip N results"),
     limit: int = Query(50, ge=1, le=500, description="Pagination: max results (default 50, max 500)"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    categories = db.query(Category).offset(skip).limit(limit).all()
+    categories = (await db.scalars(paginate(select(Category), Category.id, cursor, skip, limit))).all()
+    set_next_cursor(response, categories, limit)
     return categories
 
 
 @router.get("/search", response_model=List[CategoryResponse])
 # Public: search categories by name
 async def search_categories(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=100, description="Category name to search (substring)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     categories = (
-        db.query(Category)
-        .filter(Category.name.ilike(f"%{name}%"))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(Category)
+                .where(Category.name.ilike(f"%{name}%")),
+                Category.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, categories, limit)
     return categories
 
 
@@ -47,9 +56,9 @@ async def search_categories(
 # Public: get category detail
 async def get_category(
     category_id: int = Path(..., gt=0, description="Category ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
 
     if not category:
         raise HTTPException(status_code=404, detail=f"Category with ID {category_id} not found")
@@ -60,24 +69,29 @@ async def get_category(
 @router.get("/{category_id}/subcategories", response_model=List[SubcategoryResponse])
 # Public: list subcategories of category
 async def get_category_subcategories(
+    response: Response,
     category_id: int = Path(..., gt=0, description="Category ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
 
     if not category:
         raise HTTPException(status_code=404, detail=f"Category with ID {category_id} not found")
 
     subcategories = (
-        db.query(Subcategory)
-        .filter(Subcategory.parent_id == category_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-
+        await db.scalars(
+            paginate(
+                select(Subcategory)
+                .where(Subcategory.parent_id == category_id),
+                Subcategory.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+
+    set_next_cursor(response, subcategories, limit)
     return subcategories
 
 
@@ -85,15 +99,15 @@ async def get_category_subcategories(
 # Public: category parts/subcategories counts
 async def get_category_parts_count(
     category_id: int = Path(..., gt=0, description="Category ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
 
     if not category:
         raise HTTPException(status_code=404, detail=f"Category with ID {category_id} not found")
 
-    parts_count = db.query(func.count(Part.id)).filter(Part.category_id == category_id).scalar() or 0
-    subcategories_count = db.query(func.count(Subcategory.id)).filter(Subcategory.parent_id == category_id).scalar() or 0
+    parts_count = await db.scalar(select(func.count(Part.id)).where(Part.category_id == category_id)) or 0
+    subcategories_count = await db.scalar(select(func.count(Subcategory.id)).where(Subcategory.parent_id == category_id)) or 0
 
     return {
         "category_id": category.id,
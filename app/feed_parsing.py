@@ -0,0 +1,235 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import accumulate
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+# Bytes of feed parsed by one task; a shard is read into memory whole
+FEED_SHARD_BYTES = int(os.getenv("feed_shard_bytes", str(32 * 1024 * 1024)))
+# Errors a shard sends back; the count of all errors is always exact
+FEED_SHARD_MAX_ERRORS = 1000
+
+FEED_FORMATS = ("csv", "ndjson")
+BOM = "\ufeff".encode("utf-8")
+
+
+class FeedError(ValueError):
+    """The feed as a whole cannot be read (unknown format, missing columns)."""
+
+
+class FeedNotShardable(FeedError):
+    """A shard boundary falls inside a quoted CSV field; the feed has to be
+    parsed sequentially."""
+
+
+def feed_format(filename: str, declared: Optional[str] = None) -> str:
+    fmt = (declared or os.path.splitext(filename)[1].lstrip(".")).lower()
+    if fmt in ("json", "jsonl"):
+        fmt = "ndjson"
+    if fmt not in FEED_FORMATS:
+        raise FeedError(f"Unknown feed format '{fmt}', expected one of {', '.join(FEED_FORMATS)}")
+    return fmt
+
+
+def feed_columns(schema: Type[BaseModel]) -> List[str]:
+    return list(schema.model_fields)
+
+
+def _check_header(fieldnames: Optional[List[str]], schema: Type[BaseModel]) -> None:
+    required = [name for name, field in schema.model_fields.items() if field.is_required()]
+    missing = [c for c in required if c not in (fieldnames or [])]
+    if missing:
+        raise FeedError(f"Missing CSV columns: {', '.join(missing)}")
+
+
+def csv_rows(
+    text: IO[str], schema: Type[BaseModel], fieldnames: Optional[List[str]] = None, first_line: int = 1
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    # Without fieldnames the first line is the header; first_line is the
+    # line number of the first line of text
+    reader = csv.DictReader(text, fieldnames=fieldnames)
+    _check_header(reader.fieldnames, schema)
+    columns = set(schema.model_fields)
+    for row in reader:
+        # Empty cells are missing values, not empty strings
+        yield first_line - 1 + reader.line_num, {k: v for k, v in row.items() if k in columns and v != ""}
+
+
+def ndjson_rows(text: IO[str], first_line: int = 1) -> Iterator[Tuple[int, Any]]:
+    for line_no, line in enumerate(text, start=first_line):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+
+def iter_feed(stream: IO[bytes], fmt: str, schema: Type[BaseModel]) -> Iterator[Tuple[int, Any]]:
+    """(line number, raw row) pairs of a feed; a row that cannot be decoded
+    comes back as the exception."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv_rows(text, schema) if fmt == "csv" else ndjson_rows(text)
+    except UnicodeDecodeError as e:
+        raise _encoding_error(e) from e
+
+
+def _encoding_error(e: UnicodeDecodeError) -> FeedError:
+    return FeedError(f"Feed is not valid UTF-8: {e.reason}")
+
+
+def validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+def validate_row(raw: Any, schema: Type[BaseModel]) -> Tuple[Optional[BaseModel], Optional[str]]:
+    if isinstance(raw, Exception):
+        return None, f"Invalid JSON: {raw}"
+    if not isinstance(raw, dict):
+        return None, "Row must be a JSON object"
+    try:
+        return schema(**raw), None
+    except ValidationError as e:
+        return None, validation_message(e)
+
+
+def copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_line(line_no: int, row: BaseModel, columns: List[str]) -> str:
+    # One line of COPY text format: the line number, then the columns
+    values = row.model_dump()
+    return "\t".join(copy_value(v) for v in [line_no] + [values[c] for c in columns]) + "\n"
+
+
+class ParsedShard(NamedTuple):
+    rows: int
+    staged: int
+    # Valid rows as COPY text, in the column order of copy_line
+    copy_text: str
+    error_count: int
+    errors: List[Tuple[int, str]]
+
+
+def shard_feed(path: str, fmt: str, schema: Type[BaseModel], shard_bytes: int = FEED_SHARD_BYTES):
+    """Splits a feed file into byte ranges that start and end on line breaks.
+
+    Returns the CSV header (None for NDJSON), the line number of the first
+    data line and the ranges. A record must not span lines, which holds for
+    NDJSON; for CSV parse_feed_parallel checks it at every boundary.
+    """
+    with open(path, "rb") as f:
+        start = len(BOM) if f.read(len(BOM)) == BOM else 0
+        f.seek(start)
+        header, first_line = None, 1
+        if fmt == "csv":
+            try:
+                header = next(csv.reader([f.readline().decode("utf-8")]), [])
+            except UnicodeDecodeError as e:
+                raise _encoding_error(e) from e
+            _check_header(header, schema)
+            first_line = 2
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        bounds = [data_start]
+        while bounds[-1] + shard_bytes < size:
+            f.seek(bounds[-1] + shard_bytes - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    return header, first_line, list(zip(bounds, bounds[1:] + [size]))
+
+
+def _scan_range(path: str, start: int, end: int) -> Tuple[int, int]:
+    # Line breaks and double quotes in the range
+    with open(path, "rb") as f:
+        f.seek(start)
+        lines = quotes = 0
+        left = end - start
+        while left > 0:
+            block = f.read(min(left, 1 << 24))
+            if not block:
+                break
+            lines += block.count(b"\n")
+            quotes += block.count(b'"')
+            left -= len(block)
+    return lines, quotes
+
+
+def _parse_shard(
+    path: str, fmt: str, start: int, end: int, first_line: int, header: Optional[List[str]], schema: Type[BaseModel]
+) -> ParsedShard:
+    with open(path, "rb") as f:
+        f.seek(start)
+        try:
+            text = io.StringIO(f.read(end - start).decode("utf-8"), newline="")
+        except UnicodeDecodeError as e:
+            raise _encoding_error(e) from e
+    rows = csv_rows(text, schema, header, first_line) if fmt == "csv" else ndjson_rows(text, first_line)
+    columns = feed_columns(schema)
+    out = io.StringIO()
+    count = staged = error_count = 0
+    errors: List[Tuple[int, str]] = []
+    for line_no, raw in rows:
+        count += 1
+        row, error = validate_row(raw, schema)
+        if error:
+            error_count += 1
+            if len(errors) < FEED_SHARD_MAX_ERRORS:
+                errors.append((line_no, error))
+            continue
+        out.write(copy_line(line_no, row, columns))
+        staged += 1
+    return ParsedShard(count, staged, out.getvalue(), error_count, errors)
+
+
+def parse_feed_parallel(
+    path: str,
+    fmt: str,
+    schema: Type[BaseModel],
+    workers: int,
+    shard_bytes: int = FEED_SHARD_BYTES,
+) -> Iterator[ParsedShard]:
+    """Parses and validates a feed file in a process pool, shard by shard.
+
+    Shards come back in completion order; every row carries its line number,
+    so the consumer does not need them in file order. At most two shards per
+    worker are submitted or waiting to be consumed, so memory stays around
+    2 * workers * shard_bytes and a slow consumer holds the workers back.
+    """
+    header, first_line, ranges = shard_feed(path, fmt, schema, shard_bytes)
+    # Spawned workers share nothing with this process, in particular not the
+    # database connections the consumer holds
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        scans = list(pool.map(_scan_range, *zip(*((path, a, b) for a, b in ranges))))
+        # Escaped quotes come in pairs, so an odd number of quotes before a
+        # boundary means it splits a quoted field. Nothing is parsed yet when
+        # this is raised.
+        if fmt == "csv" and any(q % 2 for q in accumulate(quotes for _, quotes in scans[:-1])):
+            raise FeedNotShardable("CSV feed has line breaks inside quoted fields")
+        counts = [lines for lines, _ in scans]
+        first_lines = [first_line + before for before in accumulate([0] + counts[:-1])]
+        tasks = iter(zip(ranges, first_lines))
+        pending = set()
+        while True:
+            for (a, b), line in tasks:
+                pending.add(pool.submit(_parse_shard, path, fmt, a, b, line, header, schema))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
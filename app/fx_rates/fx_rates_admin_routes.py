@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -11,7 +11,12 @@ from app.fx_rates.fx_rates_schema import (
     FxRateResponse,
 )
 from app.fx_rates.fx_rates_model import FxRate
-from db_routers_connection import get_db
+from app.fx_rates.fx_rates_cache import fx_rate_cache
+from app.statistics_cache import statistics_cache
+from app.part_price_snapshot.part_price_snapshot_service import mark_dirty_for_currencies, snapshot_refresher
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from db_routers_connection import get_async_db
 
 
 router = APIRouter(prefix="/api/fxrates/admin", tags=["fxrates-admin"]) 
@@ -20,25 +25,28 @@ router = APIRouter(prefix="/api/fxrates/admin", tags=["fxrates-admin"])
 @router.get("/", response_model=List[FxRateResponse])
 # Admin: list FX rates
 async def list_fxrates_admin(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    fxrates = db.query(FxRate).offset(skip).limit(limit).all()
+    fxrates = (await db.scalars(paginate(select(FxRate), FxRate.id, cursor, skip, limit))).all()
+    set_next_cursor(response, fxrates, limit)
     return fxrates
 
 
 @router.post("/", response_model=FxRateResponse, status_code=201)
 # Admin: create FX rate
 async def create_fxrate(
-    fxrate: FxRateCreate, db: Session = Depends(get_db)
+    fxrate: FxRateCreate, db: AsyncSession = Depends(get_async_db)
 ):
     from_curr = fxrate.from_currency.upper()
     to_curr = fxrate.to_currency.upper()
 
-    existing = db.query(FxRate).filter(
+    existing = await db.scalar(select(FxRate).where(
         FxRate.from_currency == from_curr, FxRate.to_currency == to_curr
-    ).first()
+    ).limit(1))
 
     if existing:
         raise HTTPException(
@@ -53,8 +61,11 @@ async def create_fxrate(
         updated_at=datetime.utcnow(),
     )
     db.add(db_fxrate)
-    db.commit()
-    db.refresh(db_fxrate)
+    await db.run_sync(mark_dirty_for_currencies, [from_curr])
+    await db.commit()
+    await db.refresh(db_fxrate)
+    await db.run_sync(fx_rate_cache.reload)
+    snapshot_refresher.wake()
 
     return db_fxrate
 
@@ -63,9 +74,9 @@ async def create_fxrate(
 # Admin: get FX rate detail
 async def get_fxrate_admin(
     fxrate_id: int = Path(..., gt=0, description="FX Rate ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    fxrate = db.query(FxRate).filter(FxRate.id == fxrate_id).first()
+    fxrate = await db.get(FxRate, fxrate_id)
 
     if not fxrate:
         raise HTTPException(status_code=404, detail=f"FX Rate with ID {fxrate_id} not found")
@@ -78,9 +89,9 @@ async def get_fxrate_admin(
 async def update_fxrate(
     fxrate_id: int = Path(..., gt=0, description="FX Rate ID"),
     fxrate_update: FxRateUpdate = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_fxrate = db.query(FxRate).filter(FxRate.id == fxrate_id).first()
+    db_fxrate = await db.get(FxRate, fxrate_id)
 
     if not db_fxrate:
         raise HTTPException(status_code=404, detail=f"FX Rate with ID {fxrate_id} not found")
@@ -95,14 +106,14 @@ async def update_fxrate(
         to_curr = fxrate_update.to_currency.upper()
 
     if from_curr != db_fxrate.from_currency or to_curr != db_fxrate.to_currency:
-        existing = (
-            db.query(FxRate)
-            .filter(
+        existing = await db.scalar(
+            select(FxRate)
+            .where(
                 FxRate.from_currency == from_curr,
                 FxRate.to_currency == to_curr,
                 FxRate.id != fxrate_id,
             )
-            .first()
+            .limit(1)
         )
         if existing:
             raise HTTPException(
@@ -110,6 +121,8 @@ async def update_fxrate(
                 detail=f"Exchange rate for {from_curr}/{to_curr} already exists",
             )
 
+    await db.run_sync(mark_dirty_for_currencies, [db_fxrate.from_currency, from_curr])
+
     if fxrate_update.from_currency:
         db_fxrate.from_currency = from_curr
 
@@ -124,8 +137,10 @@ async def update_fxrate(
     else:
         db_fxrate.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(db_fxrate)
+    await db.commit()
+    await db.refresh(db_fxrate)
+    await db.run_sync(fx_rate_cache.reload)
+    snapshot_refresher.wake()
 
     return db_fxrate
 
@@ -134,66 +149,55 @@ async def update_fxrate(
 # Admin: delete FX rate
 async def delete_fxrate(
     fxrate_id: int = Path(..., gt=0, description="FX Rate ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_fxrate = db.query(FxRate).filter(FxRate.id == fxrate_id).first()
+    db_fxrate = await db.get(FxRate, fxrate_id)
 
     if not db_fxrate:
         raise HTTPException(status_code=404, detail=f"FX Rate with ID {fxrate_id} not found")
 
-    db.delete(db_fxrate)
-    db.commit()
+    await db.run_sync(mark_dirty_for_currencies, [db_fxrate.from_currency])
+    await db.delete(db_fxrate)
+    await db.commit()
+    await db.run_sync(fx_rate_cache.reload)
+    snapshot_refresher.wake()
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create FX rates
 async def bulk_create_fxrates(
-    fxrates_data: List[FxRateCreate], db: Session = Depends(get_db)
+    fxrates_data: List[FxRateCreate], db: AsyncSession = Depends(get_async_db)
 ):
     created = 0
-    failed = 0
-    errors = []
-    fxrates_to_insert = []
-
-    for idx, fxrate_data in enumerate(fxrates_data):
-        try:
-            from_curr = fxrate_data.from_currency.upper()
-            to_curr = fxrate_data.to_currency.upper()
-
-            existing = (
-                db.query(FxRate)
-                .filter(FxRate.from_currency == from_curr, FxRate.to_currency == to_curr)
-                .first()
-            )
-            if existing:
-                errors.append(
-                    f"Row {idx + 1}: Exchange rate for {from_curr}/{to_curr} already exists"
-                )
-                failed += 1
-                continue
-
-            fxrates_to_insert.append(
-                FxRate(
-                    from_currency=from_curr,
-                    to_currency=to_curr,
-                    rate=fxrate_data.rate,
-                    updated_at=datetime.utcnow(),
-                )
-            )
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
+    check = await BulkValidation(fxrates_data).unique(
+        (FxRate.from_currency, FxRate.to_currency),
+        lambda f, id: f"Exchange rate for {f.from_currency.upper()}/{f.to_currency.upper()} already exists",
+        key=lambda f: (f.from_currency.upper(), f.to_currency.upper()),
+    ).run_async(db)
+
+    fxrates_to_insert = [
+        FxRate(
+            from_currency=fxrate_data.from_currency.upper(),
+            to_currency=fxrate_data.to_currency.upper(),
+            rate=fxrate_data.rate,
+            updated_at=datetime.utcnow(),
+        )
+        for fxrate_data in check.valid
+    ]
 
     if fxrates_to_insert:
         db.add_all(fxrates_to_insert)
-        db.commit()
+        await db.run_sync(mark_dirty_for_currencies, {f.from_currency for f in fxrates_to_insert})
+        await db.commit()
+        await db.run_sync(fx_rate_cache.reload)
+        snapshot_refresher.wake()
         created = len(fxrates_to_insert)
 
     return {
         "created": created,
-        "failed": failed,
+        "failed": check.failed,
         "total": len(fxrates_data),
-        "errors": errors if errors else None,
+        "errors": check.errors if check.errors else None,
     }
 
 
@@ -201,32 +205,29 @@ async def bulk_create_fxrates(
 # Admin: bulk delete FX rates
 async def bulk_delete_fxrates(
     fxrate_ids: List[int] = Query(..., description="List of FX Rate IDs to delete"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    deleted = 0
-    failed = 0
-    errors = []
-
-    for fxrate_id in fxrate_ids:
-        try:
-            db_fxrate = db.query(FxRate).filter(FxRate.id == fxrate_id).first()
-
-            if not db_fxrate:
-                errors.append(f"ID {fxrate_id}: FX Rate not found")
-                failed += 1
-                continue
 
-            db.delete(db_fxrate)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {fxrate_id}: {str(e)}")
-            failed += 1
+    deleted_rows = (
+        await db.execute(
+            delete(FxRate)
+            .where(any_id(FxRate.id, fxrate_ids))
+            .returning(FxRate.id, FxRate.from_currency)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
 
-    db.commit()
+    await db.run_sync(mark_dirty_for_currencies, {row.from_currency for row in deleted_rows})
+    await db.commit()
+    await db.run_sync(fx_rate_cache.reload)
+    snapshot_refresher.wake()
 
+    deleted, errors = delete_report(
+        fxrate_ids, [row.id for row in deleted_rows], lambda fxrate_id: f"ID {fxrate_id}: FX Rate not found"
+    )
     return {
         "deleted": deleted,
-        "failed": failed,
+        "failed": len(errors),
         "total": len(fxrate_ids),
         "errors": errors if errors else None,
     }
@@ -238,15 +239,15 @@ async def update_fxrate_value(
     from_currency: str = Query(..., min_length=3, max_length=3, description="Source currency code"),
     to_currency: str = Query(..., min_length=3, max_length=3, description="Target currency code"),
     new_rate: Decimal = Query(..., gt=0, description="New exchange rate"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     from_curr = from_currency.upper()
     to_curr = to_currency.upper()
 
-    db_fxrate = (
-        db.query(FxRate)
-        .filter(FxRate.from_currency == from_curr, FxRate.to_currency == to_curr)
-        .first()
+    db_fxrate = await db.scalar(
+        select(FxRate)
+        .where(FxRate.from_currency == from_curr, FxRate.to_currency == to_curr)
+        .limit(1)
     )
 
     if not db_fxrate:
@@ -254,37 +255,50 @@ async def update_fxrate_value(
 
     db_fxrate.rate = new_rate
     db_fxrate.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_fxrate)
+    await db.run_sync(mark_dirty_for_currencies, [from_curr])
+    await db.commit()
+    await db.refresh(db_fxrate)
+    await db.run_sync(fx_rate_cache.reload)
+    snapshot_refresher.wake()
 
     return db_fxrate
 
 
 @router.get("/statistics", response_model=dict)
 # Admin: FX rates statistics
-async def get_fxrates_statistics(db: Session = Depends(get_db)):
-    total_rates = db.query(FxRate).count()
-
-    currencies = db.query(FxRate.from_currency).distinct().count()
-
-    min_rate = db.query(func.min(FxRate.rate)).scalar() or 0
-    max_rate = db.query(func.max(FxRate.rate)).scalar() or 0
-    avg_rate = db.query(func.avg(FxRate.rate)).scalar() or 0
+async def get_fxrates_statistics(db: AsyncSession = Depends(get_async_db)):
+    return await statistics_cache.cached_async("fx_rates", lambda: _fxrates_statistics(db))
+
+
+async def _fxrates_statistics(db: AsyncSession) -> dict:
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_rates"),
+                func.count(func.distinct(FxRate.from_currency)).label("currencies"),
+                func.min(FxRate.rate).label("min_rate"),
+                func.max(FxRate.rate).label("max_rate"),
+                func.avg(FxRate.rate).label("avg_rate"),
+            ).select_from(FxRate)
+        )
+    ).one()
 
     return {
-        "total_exchange_rates": total_rates,
-        "unique_source_currencies": currencies,
-        "min_rate": float(min_rate) if min_rate else 0,
-        "max_rate": float(max_rate) if max_rate else 0,
-        "average_rate": round(float(avg_rate), 6) if avg_rate else 0,
+        "total_exchange_rates": s.total_rates,
+        "unique_source_currencies": s.currencies,
+        "min_rate": float(s.min_rate) if s.min_rate else 0,
+        "max_rate": float(s.max_rate) if s.max_rate else 0,
+        "average_rate": round(float(s.avg_rate), 6) if s.avg_rate else 0,
     }
 
 
 @router.get("/rate-pairs", response_model=dict)
 # Admin: list FX rate pairs summary
-async def get_fxrate_pairs_summary(db: Session = Depends(get_db)):
-    pairs = db.query(
-        FxRate.from_currency, FxRate.to_currency, FxRate.rate, FxRate.updated_at
+async def get_fxrate_pairs_summary(db: AsyncSession = Depends(get_async_db)):
+    pairs = (
+        await db.execute(
+            select(FxRate.from_currency, FxRate.to_currency, FxRate.rate, FxRate.updated_at)
+        )
     ).all()
 
     grouped = {}
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.fx_rates.fx_rates_model import FxRate
+
+
+# Safety net for other worker processes, which never see our invalidations
+FX_RATE_CACHE_TTL = float(os.getenv("fx_rate_cache_ttl", "300"))
+
+
+class FxRateCache:
+    """Process-wide copy of the fx_rates table.
+
+    The table holds a few dozen rows, so it is loaded whole and lookups are
+    served from memory. Admin write paths call `reload` after committing.
+    """
+
+    def __init__(self, ttl: float = FX_RATE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rates: Optional[Dict[Tuple[str, str], Decimal]] = None
+        self._loaded_at = 0.0
+
+    def load_rows(self, rows: Iterable[FxRate]) -> None:
+        rates: Dict[Tuple[str, str], Decimal] = {}
+        # Rows come ordered by updated_at, so the most recent rate wins
+        for r in rows:
+            key = (r.from_currency.strip().upper(), r.to_currency.strip().upper())
+            rates[key] = Decimal(str(r.rate))
+        with self._lock:
+            self._rates = rates
+            self._loaded_at = time.monotonic()
+
+    def reload(self, db: Session) -> None:
+        self.load_rows(db.query(FxRate).order_by(FxRate.updated_at.asc()).all())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rates = None
+
+    def _snapshot(self, db: Session) -> Dict[Tuple[str, str], Decimal]:
+        rates = self._rates
+        if rates is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.reload(db)
+            rates = self._rates
+        return rates
+
+    def get_rate(self, db: Session, from_currency: str, to_currency: str = "PLN") -> Optional[Decimal]:
+        from_currency = (from_currency or to_currency).upper()
+        to_currency = to_currency.upper()
+        if from_currency == to_currency:
+            return Decimal("1")
+        return self._snapshot(db).get((from_currency, to_currency))
+
+    def get_rate_pln(self, db: Session, from_currency: str) -> Optional[Decimal]:
+        return self.get_rate(db, from_currency, "PLN")
+
+    def get_rates_pln(self, db: Session, currencies: Iterable[str]) -> Dict[str, Decimal]:
+        # Returns only the currencies that have a rate; PLN is always present
+        rates = self._snapshot(db)
+        result: Dict[str, Decimal] = {"PLN": Decimal("1")}
+        for c in currencies:
+            code = (c or "PLN").upper()
+            rate = rates.get((code, "PLN"))
+            if rate is not None:
+                result[code] = rate
+        return result
+
+
+fx_rate_cache = FxRateCache()
@@ -0,0 +1,86 @@
+from typing import List, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from app.jobs.jobs_runner import Job
+from app.part_price_snapshot.part_price_snapshot_service import (
+    mark_parts_dirty,
+    refresh_dirty_snapshots,
+    snapshot_refresher,
+)
+from app.parts.parts_model import Part
+from app.parts.parts_normalization import PartNumberIndex, PartNumberNormalizer, check_new_parts
+from app.statistics_cache import statistics_cache
+from app.supplier_price.supplier_price_model import SupplierPrice
+from app.suppliers.suppliers_model import Supplier
+from app.warehouses.warehouses_model import Warehouse
+
+
+# Chunk handlers run on a job worker's session; the runner commits after each
+
+
+def import_supplier_prices(db: Session, prices_data: Sequence, first_row: int) -> List[str]:
+    # Same checks as POST /api/supplierprice/admin/bulk-create; earlier chunks
+    # are committed, so a key repeated across chunks is found in the table
+    check = (
+        BulkValidation(prices_data, start=first_row)
+        .exists(Part.id, "part_id", lambda p: f"Part with ID {p.part_id} not found")
+        .exists(Supplier.id, "supplier_id", lambda p: f"Supplier with ID {p.supplier_id} not found")
+        .exists(Warehouse.id, "warehouse_id", lambda p: f"Warehouse with ID {p.warehouse_id} not found")
+        .unique(
+            (SupplierPrice.supplier_id, SupplierPrice.warehouse_id, SupplierPrice.supplier_sku),
+            lambda p, id: f"Supplier price with SKU {p.supplier_sku} already exists for supplier {p.supplier_id} and warehouse {p.warehouse_id}",
+        )
+        .run(db)
+    )
+    if check.valid:
+        db.add_all([SupplierPrice(**price_data.dict()) for price_data in check.valid])
+        db.flush()
+        mark_parts_dirty(db, {p.part_id for p in check.valid})
+    return check.errors
+
+
+def delete_supplier_prices(db: Session, price_ids: Sequence[int], first_row: int) -> List[str]:
+    deleted_rows = db.execute(
+        delete(SupplierPrice)
+        .where(any_id(SupplierPrice.id, price_ids))
+        .returning(SupplierPrice.id, SupplierPrice.part_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    mark_parts_dirty(db, {row.part_id for row in deleted_rows})
+    _, errors = delete_report(
+        price_ids, [row.id for row in deleted_rows], lambda price_id: f"ID {price_id}: Supplier price not found"
+    )
+    return errors
+
+
+class ImportParts:
+    # One normalizer and number index for the whole job, so every chunk is
+    # deduped against the earlier ones without querying their keys again
+    def __init__(self):
+        self.normalizer = None
+        self.index = PartNumberIndex()
+
+    def __call__(self, db: Session, parts_data: Sequence, first_row: int) -> List[str]:
+        if self.normalizer is None:
+            self.normalizer = PartNumberNormalizer.load(db)
+        check = check_new_parts(parts_data, self.normalizer, self.index, start=first_row).run(db)
+        db.add_all(check.valid)
+        return check.errors
+
+
+def reprice_parts(db: Session, part_ids: Sequence[int], first_row: int) -> List[str]:
+    # The queue entries must be committed before the refresh locks them; the
+    # refresh then commits per snapshot batch itself
+    found = set(db.execute(select(Part.id).where(any_id(Part.id, part_ids))).scalars())
+    mark_parts_dirty(db, found)
+    db.commit()
+    refresh_dirty_snapshots(db, part_ids=found)
+    return [f"ID {part_id}: Part not found" for part_id in part_ids if part_id not in found]
+
+
+def supplier_prices_changed(job: Job) -> None:
+    statistics_cache.invalidate("supplier_prices")
+    snapshot_refresher.wake()
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+
+from app.jobs.jobs_runner import FINISHED, Job, job_runner
+from app.jobs.jobs_handlers import (
+    ImportParts,
+    delete_supplier_prices,
+    import_supplier_prices,
+    reprice_parts,
+    supplier_prices_changed,
+)
+from app.parts.parts_model import Part
+from app.parts.parts_schema import PartCreate
+from app.supplier_price.supplier_price_schema import SupplierPriceCreate
+from db_routers_connection import get_async_db
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("/supplier-prices/import", response_model=dict, status_code=202)
+# Admin: queue a bulk create of supplier prices
+async def queue_supplier_price_import(prices_data: List[SupplierPriceCreate]):
+    job = job_runner.submit(Job("supplier_prices.import", prices_data, import_supplier_prices, supplier_prices_changed))
+    return job.as_dict()
+
+
+@router.post("/supplier-prices/delete", response_model=dict, status_code=202)
+# Admin: queue a bulk delete of supplier prices
+async def queue_supplier_price_delete(price_ids: List[int]):
+    job = job_runner.submit(Job("supplier_prices.delete", price_ids, delete_supplier_prices, supplier_prices_changed))
+    return job.as_dict()
+
+
+@router.post("/parts/import", response_model=dict, status_code=202)
+# Admin: queue a bulk create of parts
+async def queue_parts_import(parts_data: List[PartCreate]):
+    job = job_runner.submit(Job("parts.import", parts_data, ImportParts()))
+    return job.as_dict()
+
+
+@router.post("/parts/reprice", response_model=dict, status_code=202)
+# Admin: queue a price snapshot recompute for parts (all parts when no IDs are given)
+async def queue_parts_reprice(
+    part_ids: Optional[List[int]] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if part_ids is None:
+        part_ids = (await db.scalars(select(Part.id).order_by(Part.id))).all()
+    job = job_runner.submit(Job("parts.reprice", part_ids, reprice_parts))
+    return job.as_dict()
+
+
+@router.get("/", response_model=List[dict])
+# Admin: list queued, running and recent jobs
+async def list_jobs(
+    status: Optional[str] = Query(None, description="Only jobs in this status"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    jobs = [job for job in job_runner.list() if status is None or job.status == status]
+    return [job.as_dict() for job in jobs[:limit]]
+
+
+@router.get("/{job_id}", response_model=dict)
+# Admin: job progress, throughput and errors
+async def get_job(job_id: str = Path(..., description="Job ID")):
+    return get_job_or_404(job_id).as_dict()
+
+
+@router.post("/{job_id}/cancel", response_model=dict)
+# Admin: cancel a job; a running job stops after its current chunk
+async def cancel_job(job_id: str = Path(..., description="Job ID")):
+    job = get_job_or_404(job_id)
+    if job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is already {job.status}")
+    job.cancel()
+    return job.as_dict()
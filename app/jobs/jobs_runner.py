@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from db_routers_connection import SessionLocal
+
+
+# Jobs running at the same time; the rest wait in the executor's queue
+JOB_WORKERS = int(os.getenv("job_workers", "2"))
+# Items per transaction; a failed or cancelled job keeps the chunks before it
+JOB_CHUNK_SIZE = int(os.getenv("job_chunk_size", "1000"))
+# Errors kept per job; the count of all errors is always exact
+JOB_MAX_ERRORS = int(os.getenv("job_max_errors", "1000"))
+# Finished jobs kept for the status API
+JOB_HISTORY = int(os.getenv("job_history", "100"))
+
+logger = logging.getLogger("uvicorn.error")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Processes one chunk inside the job's transaction and returns the errors of
+# its items; first_item is the 1-based position of chunk[0] in the job
+ChunkHandler = Callable[[Session, Sequence, int], List[str]]
+
+
+class Job:
+    def __init__(
+        self,
+        kind: str,
+        items: Sequence,
+        handler: ChunkHandler,
+        after: Optional[Callable[["Job"], None]] = None,
+        chunk_size: int = JOB_CHUNK_SIZE,
+    ):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.items = items
+        self.total = len(items)
+        self.handler = handler
+        self.after = after
+        self.chunk_size = chunk_size
+        self.status = QUEUED
+        self.processed = 0
+        self.failed = 0
+        self.errors: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        with self._lock:
+            # A queued job never starts; a running one stops after its chunk
+            if self.status == QUEUED:
+                self._finish(CANCELLED)
+
+    def _finish(self, status: str, error: Optional[str] = None) -> None:
+        # finished_at first: the runner prunes by it without taking this lock
+        self.finished_at = datetime.utcnow()
+        self.error = error
+        self.status = status
+        # The payload is not needed once the job is done
+        self.items = ()
+
+    def _add_chunk(self, size: int, errors: List[str]) -> None:
+        with self._lock:
+            self.processed += size
+            self.failed += len(errors)
+            self.errors.extend(errors[:max(JOB_MAX_ERRORS - len(self.errors), 0)])
+            self._elapsed = time.perf_counter() - self._started
+
+    def run(self) -> None:
+        with self._lock:
+            if self.status != QUEUED:
+                return
+            self.status = RUNNING
+            self.started_at = datetime.utcnow()
+            self._started = time.perf_counter()
+        items = self.items
+        db = SessionLocal()
+        try:
+            for start in range(0, len(items), self.chunk_size):
+                if self._cancel.is_set():
+                    break
+                chunk = items[start:start + self.chunk_size]
+                errors = self.handler(db, chunk, start + 1)
+                db.commit()
+                self._add_chunk(len(chunk), errors)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s (%s) failed", self.id, self.kind)
+            with self._lock:
+                self._finish(FAILED, str(e))
+        else:
+            with self._lock:
+                self._finish(CANCELLED if self.processed < self.total else SUCCEEDED)
+        finally:
+            db.close()
+        if self.after is not None and self.processed:
+            try:
+                self.after(self)
+            except Exception:
+                logger.exception("Job %s (%s) follow-up failed", self.id, self.kind)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "cancel_requested": self.cancel_requested,
+                "total": self.total,
+                "processed": self.processed,
+                "succeeded": self.processed - self.failed,
+                "failed": self.failed,
+                "progress_percent": round(100 * self.processed / self.total, 1) if self.total else 100.0,
+                "items_per_second": round(self.processed / self._elapsed, 1) if self._elapsed else None,
+                "errors": list(self.errors) or None,
+                "errors_truncated": self.failed > len(self.errors),
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobRunner:
+    """In-process queue for long bulk operations.
+
+    Jobs wait in the executor's queue and run on `workers` threads, each with
+    its own session that commits after every chunk, so a request only has to
+    hand over the payload. State lives in this process: jobs do not survive
+    a restart and each worker process has its own queue.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self.workers = workers
+        self.history = history
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.status not in FINISHED:
+                job.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, job: Job) -> Job:
+        self.start()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._executor.submit(job.run)
+            self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def _forget_finished(self) -> None:
+        finished = [job for job in self._jobs.values() if job.status in FINISHED]
+        finished.sort(key=lambda job: job.finished_at or datetime.min)
+        for job in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job.id]
+
+
+job_runner = JobRunner()
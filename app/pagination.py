@@ -0,0 +1,61 @@
+import base64
+import json
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+
+# List endpoints return a plain JSON array, so the next cursor travels in a header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CURSOR_DESCRIPTION = f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page; replaces skip"
+
+
+def encode_cursor(*key: Any) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """Decodes a cursor made by encode_cursor and checks its shape.
+
+    Cursors are not signed: a forged one can only move the client to another
+    position in the same ordering.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        key = None
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        or not all(isinstance(value, t) and not isinstance(value, bool) for value, t in zip(key, types))
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def paginate(stmt, id_column, cursor: Optional[str], skip: int, limit: int):
+    """One page of a Select or Query in id order.
+
+    With a cursor the page starts right after the last id of the previous
+    page, which the primary key index seeks to directly; without one, skip
+    still works as an offset.
+    """
+    stmt = stmt.order_by(id_column)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        stmt = stmt.where(id_column > last_id)
+    else:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+
+def set_next_cursor(
+    response: Response,
+    rows: Sequence,
+    limit: int,
+    key: Callable[[Any], tuple] = lambda row: (row.id,),
+) -> None:
+    # A short page is the last one
+    if rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, String, ForeignKey, Index, text
+from app.db_base import Base
+
+class PartPriceSnapshot(Base):
+    __tablename__ = 'part_price_snapshot'
+    __table_args__ = (
+        Index('ix_part_price_snapshot_dirty_at', 'dirty_at', postgresql_where=text('dirty_at IS NOT NULL')),
+        Index('ix_part_price_snapshot_warehouse_region', 'warehouse_region'),
+    )
+
+    part_id = Column(Integer, ForeignKey('parts.id', ondelete='CASCADE'), primary_key=True)
+    supplier_price_id = Column(Integer, ForeignKey('supplier_prices.id', ondelete='SET NULL'), nullable=True)
+    cost_pln = Column(Numeric(19, 2), nullable=True)
+    selling_price = Column(Numeric(19, 2), nullable=True)
+    availability_status = Column(String, nullable=True)
+    lead_time_days = Column(Integer, nullable=True)
+    warehouse_region = Column(String, nullable=True)
+    # NULL until the first recompute; public reads fall back to live pricing
+    computed_at = Column(DateTime, nullable=True)
+    # Set by admin write paths, cleared by the background recompute
+    dirty_at = Column(DateTime, nullable=True)
@@ -0,0 +1,231 @@
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.fx_rates.fx_rates_cache import fx_rate_cache
+from app.part_price_snapshot.part_price_snapshot_model import PartPriceSnapshot
+from app.parts.parts_model import Part
+from app.pricing_engine import quote_parts
+from app.pricing_rules.pricing_rules_index import pricing_rule_index
+from app.supplier_price.supplier_price_model import SupplierPrice
+
+from db_routers_connection import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("snapshot_refresh_interval", "30"))
+SNAPSHOT_BATCH_SIZE = int(os.getenv("snapshot_batch_size", "500"))
+
+snapshots = PartPriceSnapshot.__table__
+
+# (warehouse_region, brand_id, category_id, supplier_id) of a pricing rule
+RuleScope = Tuple[str, Optional[int], Optional[int], Optional[int]]
+
+
+def dirty_upsert(part_ids_select):
+    # Upserts so that parts without a snapshot row get one queued as well
+    sub = part_ids_select.distinct().subquery()
+    stmt = pg_insert(snapshots).from_select(
+        ["part_id", "dirty_at"],
+        select(sub.c.part_id, func.clock_timestamp()),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[snapshots.c.part_id],
+        set_={"dirty_at": stmt.excluded.dirty_at},
+    )
+
+
+def _mark_dirty_from_select(db: Session, part_ids_select) -> None:
+    db.execute(dirty_upsert(part_ids_select))
+
+
+def mark_parts_dirty(db: Session, part_ids: Iterable[int]) -> None:
+    ids = {i for i in part_ids if i}
+    if ids:
+        _mark_dirty_from_select(db, select(Part.id.label("part_id")).where(Part.id.in_(ids)))
+
+
+def mark_dirty_for_currencies(db: Session, currencies: Iterable[str]) -> None:
+    codes = {c.upper() for c in currencies if c}
+    if codes:
+        _mark_dirty_from_select(db, select(SupplierPrice.part_id).where(SupplierPrice.currency.in_(codes)))
+
+
+def mark_dirty_for_warehouses(db: Session, warehouse_ids: Iterable[int]) -> None:
+    ids = {i for i in warehouse_ids if i}
+    if ids:
+        _mark_dirty_from_select(db, select(SupplierPrice.part_id).where(SupplierPrice.warehouse_id.in_(ids)))
+
+
+def rule_scope(rule) -> RuleScope:
+    return (rule.warehouse_region, rule.brand_id, rule.category_id, rule.supplier_id)
+
+
+def mark_dirty_for_rules(db: Session, scopes: Iterable[RuleScope]) -> None:
+    # A rule can only change the price of parts it could match, so only
+    # existing snapshots in its region and brand/category/supplier scope are queued
+    for region, brand_id, category_id, supplier_id in set(scopes):
+        q = select(snapshots.c.part_id).where(snapshots.c.warehouse_region == region)
+        if brand_id is not None or category_id is not None:
+            q = q.join(Part, Part.id == snapshots.c.part_id)
+            if brand_id is not None:
+                q = q.where(Part.brand_id == brand_id)
+            if category_id is not None:
+                q = q.where(Part.category_id == category_id)
+        if supplier_id is not None:
+            q = q.join(SupplierPrice, SupplierPrice.id == snapshots.c.supplier_price_id).where(
+                SupplierPrice.supplier_id == supplier_id
+            )
+        db.execute(
+            snapshots.update()
+            .where(snapshots.c.part_id.in_(q.scalar_subquery()))
+            .values(dirty_at=func.clock_timestamp())
+        )
+
+
+def mark_all_dirty(db: Session) -> None:
+    _mark_dirty_from_select(db, select(Part.id.label("part_id")))
+
+
+def refresh_dirty_snapshots(
+    db: Session, batch_size: int = SNAPSHOT_BATCH_SIZE, part_ids: Optional[Iterable[int]] = None
+) -> int:
+    """Recomputes queued snapshots in batches; returns how many were refreshed.
+
+    Each batch is locked with SKIP LOCKED so several workers can share the
+    queue, and a part marked again mid-batch waits on the lock and stays queued.
+    With part_ids only those parts are taken from the queue.
+
+    FX rates and pricing rules are reloaded after every claim rather than
+    served from the process caches: marks commit together with the change
+    that caused them, so the reload sees every change the claimed rows were
+    queued for, whichever worker made it and whether or not it has reloaded
+    its own caches yet.
+    """
+    refreshed = 0
+    update_stmt = (
+        snapshots.update()
+        .where(snapshots.c.part_id == bindparam("b_part_id"))
+        .values(
+            supplier_price_id=bindparam("b_supplier_price_id"),
+            cost_pln=bindparam("b_cost_pln"),
+            selling_price=bindparam("b_selling_price"),
+            availability_status=bindparam("b_availability_status"),
+            lead_time_days=bindparam("b_lead_time_days"),
+            warehouse_region=bindparam("b_warehouse_region"),
+            computed_at=bindparam("b_computed_at"),
+            dirty_at=None,
+        )
+    )
+
+    queued = select(snapshots.c.part_id).where(snapshots.c.dirty_at.isnot(None))
+    if part_ids is not None:
+        queued = queued.where(snapshots.c.part_id.in_(list(part_ids)))
+
+    while True:
+        batch = db.execute(
+            queued.order_by(snapshots.c.dirty_at).limit(batch_size).with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not batch:
+            break
+
+        fx_rate_cache.reload(db)
+        pricing_rule_index.rebuild(db)
+        parts = db.query(Part.id, Part.brand_id, Part.category_id).filter(Part.id.in_(batch)).all()
+        quotes = quote_parts(db, parts)
+        now = datetime.utcnow()
+
+        rows = []
+        for part_id in batch:
+            quote = quotes.get(part_id)
+            rows.append(
+                {
+                    "b_part_id": part_id,
+                    "b_supplier_price_id": quote.supplier_price_id if quote else None,
+                    "b_cost_pln": quote.cost_pln if quote else None,
+                    "b_selling_price": quote.selling_price if quote else None,
+                    "b_availability_status": quote.availability_status if quote else "Unavailable",
+                    "b_lead_time_days": quote.lead_time_days if quote else None,
+                    "b_warehouse_region": quote.warehouse_region if quote and quote.priced else None,
+                    "b_computed_at": now,
+                }
+            )
+        db.execute(update_stmt, rows)
+        db.commit()
+        refreshed += len(rows)
+
+    return refreshed
+
+
+class SnapshotRefresher:
+    """Background thread that drains the dirty snapshot queue.
+
+    It runs every `interval` seconds and immediately after `wake`, which admin
+    write paths call once their transaction has committed.
+    """
+
+    def __init__(self, interval: float = SNAPSHOT_REFRESH_INTERVAL):
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            db = SessionLocal()
+            try:
+                refreshed = refresh_dirty_snapshots(db)
+                if refreshed:
+                    logger.info("Refreshed %d part price snapshots", refreshed)
+            except Exception:
+                db.rollback()
+                logger.exception("Part price snapshot refresh failed")
+            finally:
+                db.close()
+
+
+snapshot_refresher = SnapshotRefresher()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recompute part price snapshots")
+    parser.add_argument("--all", action="store_true", help="queue every part before refreshing")
+    parser.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.all:
+            mark_all_dirty(db)
+            db.commit()
+        print(f"Refreshed {refresh_dirty_snapshots(db, args.batch_size)} snapshots")
+    finally:
+        db.close()
@@ -1,22 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
 from sqlalchemy.orm import Session, sessionmaker
-from typing import List, Optional, Dict, Any
-from decimal import Decimal, ROUND_UP
+from typing import List, Optional
 
 from app.parts.parts_model import Part
 from app.brands.brands_model import Brand
 from app.categories.categories_model import Category
 from app.subcategories.subcategories_model import Subcategory
 from app.supplier_price.supplier_price_model import SupplierPrice
-from app.warehouses.warehouses_model import Warehouse
-from app.fx_rates.fx_rates_model import FxRate
-from app.pricing_rules.pricing_rules_model import PricingRule
+from app.pricing_engine import price_parts
+from app.part_price_snapshot.part_price_snapshot_service import mark_parts_dirty, snapshot_refresher
 from app.parts.parts_schema import (
     PartCreate,
     PartUpdate,
     PartResponse,
     PartAdmin,
 )
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.parts.parts_normalization import PartNumberNormalizer, check_new_parts
 
 from db_routers_connection import get_db
 
@@ -24,36 +24,13 @@ from db_routers_connection import get_db
 router = APIRouter(prefix="/api/parts/admin", tags=["parts-admin"])
 
 
-def _get_fx_rate_pln(db: Session, from_currency: str) -> Optional[Decimal]:
-    if not from_currency or from_currency.upper() == "PLN":
-        return Decimal("1")
-    rate = (
-        db.query(FxRate)
-        .filter(FxRate.from_currency == from_currency.upper(), FxRate.to_currency == "PLN")
-        .order_by(FxRate.updated_at.desc())
-        .first()
-    )
-    return Decimal(str(rate.rate)) if rate else None
-
-
-def _best_cost_pln(db: Session, part_id: int) -> Optional[Decimal]:
-    prices: List[SupplierPrice] = db.query(SupplierPrice).filter(SupplierPrice.part_id == part_id).all()
-    best: Optional[Decimal] = None
-    for sp in prices:
-        fx = _get_fx_rate_pln(db, sp.currency)
-        if fx is None:
-            continue
-        cost = (Decimal(str(sp.base_price)) * fx).quantize(Decimal("0.01"))
-        if best is None or cost < best:
-            best = cost
-    return best
-
-
 @router.get("", response_model=List[PartResponse])
 # Admin: list parts with optional filters
 def list_parts(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     supplier_id: Optional[int] = Query(None, gt=0),
     category_id: Optional[int] = Query(None, gt=0),
     db: Session = Depends(get_db),
@@ -67,7 +44,8 @@ def list_parts(
         part_ids_q = db.query(SupplierPrice.part_id).filter(SupplierPrice.supplier_id == supplier_id).distinct()
         query = query.filter(Part.id.in_(part_ids_q))
 
-    parts = query.offset(skip).limit(limit).all()
+    parts = paginate(query, Part.id, cursor, skip, limit).all()
+    set_next_cursor(response, parts, limit)
     return parts
 
 
@@ -81,15 +59,18 @@ def create_part(part: PartCreate, db: Session = Depends(get_db)):
     if not db.query(Subcategory.id).filter(Subcategory.id == part.subcategory_id).first():
         raise HTTPException(status_code=404, detail="Subcategory not found")
 
+    normalized = PartNumberNormalizer.load(db, [part.brand_id]).normalize(part.brand_id, part.part_number)
+    if not normalized:
+        raise HTTPException(status_code=422, detail="part_number must contain letters or digits")
     exists = (
         db.query(Part.id)
-        .filter(Part.brand_id == part.brand_id, Part.normalized_part_number == part.normalized_part_number)
+        .filter(Part.brand_id == part.brand_id, Part.normalized_part_number == normalized)
         .first()
     )
     if exists:
         raise HTTPException(status_code=409, detail="Part with this brand and normalized_part_number already exists")
 
-    db_part = Part(**part.dict())
+    db_part = Part(**part.dict(), normalized_part_number=normalized)
     db.add(db_part)
     db.commit()
     db.refresh(db_part)
@@ -104,19 +85,18 @@ def get_part_admin(part_id: int = Path(..., gt=0), db: Session = Depends(get_db)
         raise HTTPException(status_code=404, detail="Part not found")
 
     brand = db.query(Brand).filter(Brand.id == p.brand_id).first()
-    sp = db.query(SupplierPrice).filter(SupplierPrice.part_id == p.id).first()
-    best_cost = _best_cost_pln(db, p.id)
+    quote = price_parts(db, [p.id], use_snapshot=False)[p.id]
 
     return PartAdmin(
         id=p.id,
         part_number=p.part_number,
         name=p.name,
         brand=brand.name if brand else None,
-        supplier_id=(sp.supplier_id if sp else None),
-        cost_price=(best_cost if best_cost is not None else None),
-        margin_percent=None,
-        selling_price=None,
-        availability=None,
+        supplier_id=quote.supplier_id,
+        cost_price=quote.cost_pln,
+        margin_percent=quote.margin_percent,
+        selling_price=quote.selling_price,
+        availability=quote.availability_status,
     )
 
 
@@ -136,25 +116,37 @@ def update_part(part_id: int = Path(..., gt=0), part_update: PartUpdate = None,
     if "subcategory_id" in data and not db.query(Subcategory.id).filter(Subcategory.id == data["subcategory_id"]).first():
         raise HTTPException(status_code=404, detail="Subcategory not found")
 
-    new_brand_id = data.get("brand_id", db_part.brand_id)
-    new_norm = data.get("normalized_part_number", db_part.normalized_part_number)
-    conflict = (
-        db.query(Part.id)
-        .filter(
-            Part.id != db_part.id,
-            Part.brand_id == new_brand_id,
-            Part.normalized_part_number == new_norm,
+    if "brand_id" in data or "part_number" in data:
+        new_brand_id = data.get("brand_id", db_part.brand_id)
+        new_norm = PartNumberNormalizer.load(db, [new_brand_id]).normalize(
+            new_brand_id, data.get("part_number", db_part.part_number)
         )
-        .first()
-    )
-    if conflict:
-        raise HTTPException(status_code=409, detail="Part with this brand and normalized_part_number already exists")
+        if not new_norm:
+            raise HTTPException(status_code=422, detail="part_number must contain letters or digits")
+        conflict = (
+            db.query(Part.id)
+            .filter(
+                Part.id != db_part.id,
+                Part.brand_id == new_brand_id,
+                Part.normalized_part_number == new_norm,
+            )
+            .first()
+        )
+        if conflict:
+            raise HTTPException(status_code=409, detail="Part with this brand and normalized_part_number already exists")
+        data["normalized_part_number"] = new_norm
 
+    # Brand and category decide which pricing rule applies
+    repriced = any(k in data and data[k] != getattr(db_part, k) for k in ("brand_id", "category_id"))
     for k, v in data.items():
         setattr(db_part, k, v)
 
+    if repriced:
+        mark_parts_dirty(db, [db_part.id])
     db.commit()
     db.refresh(db_part)
+    if repriced:
+        snapshot_refresher.wake()
     return db_part
 
 
@@ -172,44 +164,18 @@ def delete_part(part_id: int = Path(..., gt=0), db: Session = Depends(get_db)):
 @router.post("/bulk-create")
 # Admin: bulk create parts
 def bulk_create_parts(parts_data: List[PartCreate], db: Session = Depends(get_db)):
-    created = 0
-    failed = 0
-    errors: List[str] = []
-    to_insert: List[Part] = []
-
-    for idx, pdata in enumerate(parts_data):
-        try:
-            if not db.query(Brand.id).filter(Brand.id == pdata.brand_id).first():
-                raise ValueError(f"Row {idx}: Brand {pdata.brand_id} not found")
-            if not db.query(Category.id).filter(Category.id == pdata.category_id).first():
-                raise ValueError(f"Row {idx}: Category {pdata.category_id} not found")
-            if not db.query(Subcategory.id).filter(Subcategory.id == pdata.subcategory_id).first():
-                raise ValueError(f"Row {idx}: Subcategory {pdata.subcategory_id} not found")
-
-            exists = (
-                db.query(Part.id)
-                .filter(Part.brand_id == pdata.brand_id, Part.normalized_part_number == pdata.normalized_part_number)
-                .first()
-            )
-            if exists:
-                raise ValueError(
-                    f"Row {idx}: Part with brand {pdata.brand_id} and normalized_part_number {pdata.normalized_part_number} already exists"
-                )
-
-            to_insert.append(Part(**pdata.dict()))
-            created += 1
-        except Exception as e:
-            errors.append(str(e))
-            failed += 1
-
-    if to_insert:
-        db.add_all(to_insert)
+    normalizer = PartNumberNormalizer.load(db, {p.brand_id for p in parts_data})
+    check = check_new_parts(parts_data, normalizer).run(db)
+
+    if check.valid:
+        db.add_all(check.valid)
         db.commit()
+    created, failed = len(check.valid), check.failed
 
     return {
         "total": len(parts_data),
         "created": created,
         "failed": failed,
-        "errors": errors,
+        "errors": check.errors,
         "message": f"Created {created} parts, {failed} failed",
     }
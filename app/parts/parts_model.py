@@ -1,10 +1,18 @@
-from sqlalchemy import ARRAY, Column, Integer, String, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import ARRAY, Column, Computed, Integer, String, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.db_base import Base
 
 class Part(Base):
     __tablename__ = 'parts'
+    __table_args__ = (
+        Index('ix_parts_brand_id_normalized_part_number', 'brand_id', 'normalized_part_number'),
+        Index('ix_parts_part_number_trgm', 'part_number', postgresql_using='gin', postgresql_ops={'part_number': 'gin_trgm_ops'}),
+        Index('ix_parts_normalized_part_number_trgm', 'normalized_part_number', postgresql_using='gin', postgresql_ops={'normalized_part_number': 'gin_trgm_ops'}),
+        Index('ix_parts_search_vector', 'search_vector', postgresql_using='gin'),
+        # Byte order, so LIKE 'prefix%' is a range scan that can return rows sorted
+        Index('ix_parts_normalized_part_number_c', text('normalized_part_number COLLATE "C"')),
+    )
 
     id = Column(Integer, primary_key=True)
     # supplier_id = Column(Integer, ForeignKey('suppliers.id'), nullable=False)
@@ -19,6 +27,13 @@ class Part(Base):
     images = Column(ARRAY(String), nullable=True)
     attributes = Column(JSONB, nullable=True)
     vehicle_fitment = Column(JSONB, nullable=True)
+    # Maintained by Postgres for search only, so not loaded with the part;
+    # name words rank above description words
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+        persisted=True,
+    )))
 
     brand = relationship('app.brands.brands_model.Brand', back_populates='parts')
     category = relationship('app.categories.categories_model.Category', back_populates='parts')
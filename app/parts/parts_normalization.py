@@ -0,0 +1,224 @@
+import argparse
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.brands.brands_model import Brand
+from app.bulk_validation import BulkValidation, lookup_chunks
+from app.categories.categories_model import Category
+from app.parts.parts_model import Part
+from app.subcategories.subcategories_model import Subcategory
+
+from db_routers_connection import SessionLocal
+
+
+# Parts per transaction when renormalizing the table
+RENORMALIZE_CHUNK = 5000
+RENORMALIZE_WORKERS = 4
+
+parts = Part.__table__
+
+
+def normalize_part_number(part_number: str) -> str:
+    # Full-width digits and ligatures fold to ASCII first, then everything
+    # but letters and digits goes: "0 986 494-524" -> "0986494524"
+    value = unicodedata.normalize("NFKC", part_number or "")
+    return re.sub(r"[\W_]+", "", value).upper()
+
+
+class PartNumberNormalizer:
+    """Brand-aware part number normalization.
+
+    On top of normalize_part_number, a brand can list prefixes that some
+    sources put before its numbers ("BOS 0 986..." or a supplier's brand
+    code); the longest one found is stripped, as long as a number remains.
+    """
+
+    def __init__(self, prefixes: Optional[Dict[int, Iterable[str]]] = None):
+        self.prefixes: Dict[int, List[str]] = {}
+        for brand_id, values in (prefixes or {}).items():
+            normalized = {normalize_part_number(p) for p in values or ()} - {""}
+            if normalized:
+                self.prefixes[brand_id] = sorted(normalized, key=len, reverse=True)
+
+    @classmethod
+    def load(cls, db: Session, brand_ids: Optional[Iterable[int]] = None) -> "PartNumberNormalizer":
+        stmt = select(Brand.id, Brand.part_number_prefixes).where(Brand.part_number_prefixes.isnot(None))
+        if brand_ids is not None:
+            stmt = stmt.where(Brand.id.in_(list(brand_ids)))
+        return cls(dict(db.execute(stmt).all()))
+
+    def normalize(self, brand_id: int, part_number: str) -> str:
+        number = normalize_part_number(part_number)
+        for prefix in self.prefixes.get(brand_id, ()):
+            if number.startswith(prefix) and len(number) > len(prefix):
+                return number[len(prefix):]
+        return number
+
+
+class PartNumberIndex:
+    """Hash index of normalized part numbers per brand, as a BulkValidation check.
+
+    Each (brand, number) is looked up in parts once, with the other new keys
+    of the batch, and rows accepted afterwards are added to it. Sharing one
+    index between the chunks of an ingest therefore catches duplicates within
+    and across chunks without querying a key again.
+    """
+
+    def __init__(self):
+        # brand_id -> number -> id of the stored part, or None when not stored
+        self.stored: Dict[int, Dict[str, Optional[int]]] = {}
+        # brand_id -> number -> row that added it in this ingest
+        self.accepted: Dict[int, Dict[str, int]] = {}
+
+    def lookups(self, rows: Sequence):
+        keys = sorted({
+            (row.brand_id, row.normalized_part_number) for row in rows
+            if row.normalized_part_number not in self.stored.get(row.brand_id, {})
+        })
+        for brand_id, number in keys:
+            self.stored.setdefault(brand_id, {})[number] = None
+        for chunk in lookup_chunks(keys):
+            stmt = select(Part.brand_id, Part.normalized_part_number, Part.id).where(
+                tuple_(Part.brand_id, Part.normalized_part_number).in_(chunk)
+            )
+            yield stmt, self.collect
+
+    def collect(self, result) -> None:
+        for brand_id, number, part_id in result:
+            if self.stored[brand_id][number] is None:
+                self.stored[brand_id][number] = part_id
+
+    def error(self, row, index: int) -> Optional[str]:
+        number = row.normalized_part_number
+        if self.stored.get(row.brand_id, {}).get(number) is not None:
+            return f"Part with brand {row.brand_id} and normalized_part_number {number} already exists"
+        accepted = self.accepted.get(row.brand_id, {}).get(number)
+        if accepted is not None:
+            return f"Duplicate of row {accepted} in this batch"
+        return None
+
+    def accept(self, row, index: int) -> None:
+        self.accepted.setdefault(row.brand_id, {})[row.normalized_part_number] = index
+
+
+def new_part(data, normalizer: PartNumberNormalizer) -> Part:
+    return Part(**data.dict(), normalized_part_number=normalizer.normalize(data.brand_id, data.part_number))
+
+
+def check_new_parts(
+    parts_data: Sequence,
+    normalizer: PartNumberNormalizer,
+    index: Optional[PartNumberIndex] = None,
+    start: int = 1,
+) -> BulkValidation:
+    # Rows are unsaved Part objects, so the valid ones can be added as they are
+    return (
+        BulkValidation([new_part(data, normalizer) for data in parts_data], start=start)
+        .exists(Brand.id, "brand_id", lambda p: f"Brand {p.brand_id} not found")
+        .exists(Category.id, "category_id", lambda p: f"Category {p.category_id} not found")
+        .exists(Subcategory.id, "subcategory_id", lambda p: f"Subcategory {p.subcategory_id} not found")
+        .rule(lambda p: p.normalized_part_number, lambda p: f"Part number {p.part_number!r} has no letters or digits")
+        .check(index or PartNumberIndex())
+    )
+
+
+def _renormalize_range(
+    normalizer: PartNumberNormalizer, first_id: int, last_id: int, brand_ids: Optional[Sequence[int]], dry_run: bool
+):
+    update_stmt = (
+        parts.update()
+        .where(parts.c.id == bindparam("b_id"))
+        .values(normalized_part_number=bindparam("b_number"))
+    )
+    db = SessionLocal()
+    try:
+        stmt = select(Part.id, Part.brand_id, Part.part_number, Part.normalized_part_number).where(
+            Part.id.between(first_id, last_id)
+        )
+        if brand_ids:
+            stmt = stmt.where(Part.brand_id.in_(brand_ids))
+        rows = db.execute(stmt).all()
+        keys, changed = [], []
+        for part_id, brand_id, part_number, stored in rows:
+            number = normalizer.normalize(brand_id, part_number) or stored
+            keys.append((brand_id, number, part_id))
+            if number != stored:
+                changed.append({"b_id": part_id, "b_number": number})
+        if changed and not dry_run:
+            db.execute(update_stmt, changed)
+            db.commit()
+        return len(rows), len(changed), keys
+    finally:
+        db.close()
+
+
+def renormalize_parts(
+    brand_ids: Optional[Sequence[int]] = None,
+    chunk_size: int = RENORMALIZE_CHUNK,
+    workers: int = RENORMALIZE_WORKERS,
+    dry_run: bool = False,
+) -> Dict[str, object]:
+    """Recomputes normalized_part_number of existing parts in parallel.
+
+    The id range is split into chunks of `chunk_size` ids; each worker reads,
+    normalizes and updates its chunk in its own transaction, writing only
+    rows whose number changed. Parts whose number normalizes to nothing keep
+    the stored one. Parts of a brand that end up with the same number are
+    reported, not merged: they may carry offers and cart lines of their own.
+    """
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        normalizer = PartNumberNormalizer.load(db)
+        bounds = select(func.min(Part.id), func.max(Part.id))
+        if brand_ids:
+            bounds = bounds.where(Part.brand_id.in_(brand_ids))
+        low, high = db.execute(bounds).one()
+    finally:
+        db.close()
+
+    scanned = changed = 0
+    index: Dict[Tuple[int, str], List[int]] = {}
+    if low is not None:
+        ranges = [(start, min(start + chunk_size - 1, high)) for start in range(low, high + 1, chunk_size)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_renormalize_range, normalizer, a, b, brand_ids, dry_run) for a, b in ranges]
+            for future in futures:
+                rows, updated, keys = future.result()
+                scanned += rows
+                changed += updated
+                for brand_id, number, part_id in keys:
+                    index.setdefault((brand_id, number), []).append(part_id)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "scanned": scanned,
+        "changed": changed,
+        "duplicates": [
+            {"brand_id": brand_id, "normalized_part_number": number, "part_ids": ids}
+            for (brand_id, number), ids in sorted(index.items()) if len(ids) > 1
+        ],
+        "seconds": round(elapsed, 3),
+        "parts_per_second": round(scanned / elapsed, 1) if elapsed else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recompute normalized part numbers of existing parts")
+    parser.add_argument("--brand", type=int, action="append", dest="brands", help="only parts of this brand (repeatable)")
+    parser.add_argument("--chunk-size", type=int, default=RENORMALIZE_CHUNK)
+    parser.add_argument("--workers", type=int, default=RENORMALIZE_WORKERS)
+    parser.add_argument("--dry-run", action="store_true", help="count changes and duplicates without writing")
+    args = parser.parse_args()
+
+    report = renormalize_parts(args.brands, args.chunk_size, args.workers, args.dry_run)
+    print(f"Scanned: {report['scanned']}, changed: {report['changed']}")
+    for dup in report["duplicates"]:
+        print(f"Duplicate: brand {dup['brand_id']} {dup['normalized_part_number']}: parts {dup['part_ids']}")
+    print(f"Took {report['seconds']}s ({report['parts_per_second']} parts/s)")
@@ -32,9 +32,9 @@ class PartDetail(BaseModel):
         from_attributes = True
 
 class PartCreate(BaseModel):
+    # normalized_part_number is computed by the server from brand_id and part_number
     brand_id: int = Field(gt=0)
     part_number: str = Field(min_length=1, max_length=100)
-    normalized_part_number: str = Field(min_length=1, max_length=100)
     name: str = Field(min_length=1, max_length=200)
     description: str = Field(min_length=1, max_length=1000)
     category_id: int = Field(gt=0)
@@ -46,8 +46,7 @@ class PartCreate(BaseModel):
 
 class PartUpdate(BaseModel):
     brand_id: Optional[int] = Field(None, gt=0)
-    part_number: Optional[str] = None
-    normalized_part_number: Optional[str] = None
+    part_number: Optional[str] = Field(None, min_length=1, max_length=100)
     name: Optional[str] = None
     description: Optional[str] = None
     category_id: Optional[int] = Field(None, gt=0)
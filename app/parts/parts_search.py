@@ -0,0 +1,137 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, and_, case, func, literal, or_, select, union
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from app.brands.brands_model import Brand
+from app.categories.categories_model import Category
+from app.parts.parts_model import Part
+from app.parts.parts_normalization import normalize_part_number
+
+
+# Upper bound on rows taken from each candidate query, so a very common word
+# or number fragment cannot make the ranking step scan a large part of the
+# catalog. Results past it are not reachable by paging.
+PARTS_SEARCH_CANDIDATE_LIMIT = int(os.getenv("parts_search_candidate_limit", "2000"))
+
+# Must match the configuration of the parts.search_vector column
+TS_CONFIG = "simple"
+
+
+def _like_escape(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    # Every word must match, the last ones may still be being typed
+    words = re.findall(r"[^\W_]+", q.lower())
+    return " & ".join(f"{w}:*" for w in words) if words else None
+
+
+def _filtered(stmt: Select, brand: Optional[str], category: Optional[str]) -> Select:
+    if brand:
+        stmt = stmt.join(Brand, Brand.id == Part.brand_id).where(Brand.name.ilike(f"%{brand}%"))
+    if category:
+        stmt = stmt.join(Category, Category.id == Part.category_id).where(Category.name.ilike(f"%{category}%"))
+    return stmt
+
+
+def search_parts(
+    db: Session,
+    q: str,
+    brand: Optional[str] = None,
+    category: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[float, int]] = None,
+) -> List[Tuple[Part, float]]:
+    """Parts matching q with their rank, most relevant first.
+
+    Index-backed queries find candidates, each taking at most
+    PARTS_SEARCH_CANDIDATE_LIMIT rows, best first where an index can deliver
+    them in that order:
+
+    - exact and prefix part number matches, read in order from the C-collation
+      btree index so the scan stops at the limit;
+    - substring matches at least pg_trgm.similarity_threshold similar, most
+      similar first; the % operator lets the trigram GIN index drop the rest
+      before anything is sorted;
+    - any other substring matches, unordered: they rank below both of the above;
+    - name/description words through the weighted tsvector GIN index, by
+      ts_rank_cd (name weighs more than description).
+
+    Candidates are ranked by exact/prefix part number match, trigram
+    similarity and ts_rank_cd, so the first pages hold the best matches even
+    for a very common word or fragment; only the order of the tail past the
+    limits is approximate, and paging ends there.
+
+    after is the (rank, id) of the last row of the previous page and
+    replaces skip.
+    """
+    number = normalize_part_number(q)
+    words = prefix_tsquery(q)
+
+    branches = []
+    if number:
+        # Normalized numbers only hold letters and digits, so there is nothing
+        # to escape in number
+        substring = or_(
+            Part.normalized_part_number.like(f"%{number}%"),
+            Part.part_number.ilike(f"%{_like_escape(q)}%", escape="\\"),
+        )
+        branches += [
+            _filtered(select(Part.id).where(Part.normalized_part_number.like(f"{number}%")), brand, category)
+            .order_by(Part.normalized_part_number.collate("C"))
+            .limit(PARTS_SEARCH_CANDIDATE_LIMIT),
+            _filtered(
+                select(Part.id).where(
+                    Part.normalized_part_number.like(f"%{number}%"),
+                    Part.normalized_part_number.op("%")(number),
+                ),
+                brand,
+                category,
+            )
+            .order_by(func.similarity(Part.normalized_part_number, number).desc(), Part.id)
+            .limit(PARTS_SEARCH_CANDIDATE_LIMIT),
+            _filtered(select(Part.id).where(substring), brand, category).limit(PARTS_SEARCH_CANDIDATE_LIMIT),
+        ]
+    if words:
+        tsquery = func.to_tsquery(literal(TS_CONFIG).cast(REGCONFIG), words)
+        branches.append(
+            _filtered(select(Part.id).where(Part.search_vector.op("@@")(tsquery)), brand, category)
+            .order_by(func.ts_rank_cd(Part.search_vector, tsquery).desc(), Part.id)
+            .limit(PARTS_SEARCH_CANDIDATE_LIMIT)
+        )
+    if not branches:
+        return []
+
+    candidates = union(*(b.subquery().select() for b in branches)).subquery()
+
+    rank = literal(0.0)
+    if number:
+        rank = rank + case(
+            (Part.normalized_part_number == number, 10.0),
+            (Part.normalized_part_number.like(f"{number}%"), 5.0),
+            else_=0.0,
+        ) + func.similarity(Part.normalized_part_number, number)
+    if words:
+        rank = rank + func.coalesce(func.ts_rank_cd(Part.search_vector, tsquery), 0.0)
+
+    rank = rank.label("rank")
+    stmt = (
+        select(Part, rank)
+        .join(candidates, candidates.c.id == Part.id)
+        .order_by(rank.desc(), Part.id)
+    )
+    if after:
+        # The rank is computed, so this seek filters the capped candidates
+        # rather than an index; it still keeps deep pages stable under inserts
+        last_rank, last_id = after
+        stmt = stmt.where(or_(rank < last_rank, and_(rank == last_rank, Part.id > last_id)))
+    else:
+        stmt = stmt.offset(skip)
+    return [tuple(row) for row in db.execute(stmt.limit(limit)).all()]
+
@@ -1,101 +1,191 @@
-from sqlalchemy import exists, or_
-from app.db_routers_connection import SessionLocal
-from app.fx_rates.fx_rates_model import FxRate
-from app.parts.parts_model import Part
-from app.pricing_rules.pricing_rules_model import PricingRule
-from app.supplier_price.supplier_price_model import SupplierPrice
-from decimal import Decimal
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_UP
+from typing import Any, Dict, Iterable, List, Optional
+
 from sqlalchemy.orm import Session
 
+from app.fx_rates.fx_rates_cache import fx_rate_cache
+from app.part_price_snapshot.part_price_snapshot_model import PartPriceSnapshot
+from app.parts.parts_model import Part
+from app.pricing_rules.pricing_rules_index import CompiledRule, pricing_rule_index
+from app.supplier_price.supplier_price_model import SupplierPrice
 from app.warehouses.warehouses_model import Warehouse
 
-class PricingEngine:
-    def __init__(self, db: Session):
-        self.db = db
-    
-    # Takes money value in currency and currency
-    # Returns money value in PLN
-    def convert_to_pln(self, price: Decimal, currency: str) -> Decimal:
-        exchange_rate = self.db.query(FxRate).filter(FxRate.from_currency == currency, FxRate.to_currency == 'PLN').first()
-        return price * exchange_rate.rate
-
-    # Takes supplier_parts record
-    # Return price with logistics in PLN
-    def calculate_price_with_logistics(self, supplier_price: SupplierPrice) -> Decimal:
-        base_price_pln = self.convert_to_pln(supplier_price.base_price, supplier_price.currency)
-        # Logic for calculation of price with logistics
-        # To be decided yet
-        # ...
-        price_with_logistics_pln = base_price_pln
-        # ...
-        # ...
-        return price_with_logistics_pln
-
-    # Takes parts record
-    # Returns best supplier_price record
-    def find_best_supplier_price(self, part: Part) -> SupplierPrice:
-        eu_exists = self.db.query(
-            exists()
-            .where(SupplierPrice.part_id == part.id)
-             .where(SupplierPrice.stock_status == 'Available')
-             .where(SupplierPrice.warehouse_id == Warehouse.id)
-            .where(Warehouse.region == 'EU')
-        ).scalar()
-        query = self.db.query(SupplierPrice).join(Warehouse).filter(SupplierPrice.part_id == part.id, SupplierPrice.stock_status == 'Available')
-        if eu_exists:
-            query = query.filter(Warehouse.region == 'EU')
-        supplier_prices = query.all()
-        return min(supplier_prices, key=lambda sp: (self.calculate_price_with_logistics(sp), sp.lead_time_days))
-
-    # Takes supplier_prices record
-    # Return pricing_rules record
-    def get_pricing_rule(self, supplier_price: SupplierPrice) -> PricingRule:
-        price_with_logistcs_pln = self.calculate_price_with_logistics(supplier_price)
-        pricing_rule = self.db.query(PricingRule).order_by(PricingRule.priority.asc()).filter(
-            or_(PricingRule.supplier_id == supplier_price.supplier_id, PricingRule.supplier_id.is_(None)),
-            or_(PricingRule.brand_id == supplier_price.part.brand_id, PricingRule.brand_id.is_(None)),
-            or_(PricingRule.category_id == supplier_price.part.category_id, PricingRule.category_id.is_(None)),
-            PricingRule.price_min < price_with_logistcs_pln,
-            PricingRule.price_max >= price_with_logistcs_pln,
-            PricingRule.warehouse_region == supplier_price.warehouse.region,
-            PricingRule.is_active).first()
-        # If no rules applicable - use default rule
-        return pricing_rule or PricingRule(
-            rule_name='Default margin rule',
-            margin_percent=Decimal('10'),
-            fixed_markup=Decimal('10'),
-            rounding_rule='Ceiling',
-            priority=0,
-            is_active=True)
-
-    # Takes parts record
-    # Returns final price in PLN 
-    def calculate_final_price(self, part):
-        supplier_price = self.find_best_supplier_price(part)
-        pricing_rule = self.get_pricing_rule(supplier_price)
-        return self.calculate_price_with_logistics(supplier_price) * (100% + pricing_rule.margin_percent) + pricing_rule.fixed_markup
+
+# Markup used when no pricing rule matches the best offer
+DEFAULT_MARGIN_PERCENT = Decimal("25")
+
+
+@dataclass
+class Quote:
+    part_id: int
+    supplier_price_id: Optional[int] = None
+    supplier_id: Optional[int] = None
+    cost_pln: Optional[Decimal] = None
+    selling_price: Optional[Decimal] = None
+    # None when the quote was served from part_price_snapshot
+    margin_percent: Optional[Decimal] = None
+    availability_status: str = "Unavailable"
+    lead_time_days: Optional[int] = None
+    warehouse_region: Optional[str] = None
+
+    @property
+    def priced(self) -> bool:
+        return self.selling_price is not None
+
+
+def availability_status(available_qty: int, stock_status: str) -> str:
+    status = (stock_status or "").upper()
+    if available_qty and available_qty > 0 and status in {"IN_STOCK", "AVAILABLE", "LOW_STOCK"}:
+        return "Available"
+    if status in {"BACKORDER", "PREORDER"}:
+        return "On order"
+    return "Unavailable"
+
+
+def selling_price(cost: Decimal, rule: Optional[CompiledRule]) -> Decimal:
+    if not rule:
+        return (cost * (Decimal("1") + DEFAULT_MARGIN_PERCENT / Decimal("100"))).quantize(Decimal("1"), rounding=ROUND_UP)
+
+    margin = Decimal(str(rule.margin_percent)) / Decimal("100")
+    fixed = Decimal(str(rule.fixed_markup))
+    price = cost * (Decimal("1") + margin) + fixed
+    return price.quantize(Decimal("1"), rounding=ROUND_UP)
+
+
+def _offer_sort_key(o: Dict[str, Any]):
+    region = (o.get("warehouse").region if o.get("warehouse") else "").upper()
+    prefer = 0 if region == "EU" else 1
+    return (prefer, o["cost_pln"], o["lead_time_days"], o["supplier_price"].id)
+
+
+def choose_best_offers(db: Session, part_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    # Resolves best offers for many parts in two queries: EU warehouses
+    # first, then the lowest PLN cost, then the shortest lead time
+    part_ids = set(part_ids)
+    if not part_ids:
+        return {}
+
+    prices: List[SupplierPrice] = db.query(SupplierPrice).filter(SupplierPrice.part_id.in_(part_ids)).all()
+    if not prices:
+        return {}
+
+    warehouse_ids = {sp.warehouse_id for sp in prices}
+    warehouses = {w.id: w for w in db.query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()}
+    fx_rates = fx_rate_cache.get_rates_pln(db, {sp.currency for sp in prices})
+
+    offers_by_part: Dict[int, List[Dict[str, Any]]] = {}
+    for sp in prices:
+        wh = warehouses.get(sp.warehouse_id)
+        fx = fx_rates.get((sp.currency or "PLN").upper())
+        if fx is None:
+            continue
+        cost_pln = (Decimal(str(sp.base_price)) * fx).quantize(Decimal("0.01"))
+        offers_by_part.setdefault(sp.part_id, []).append(
+            {
+                "supplier_price": sp,
+                "warehouse": wh,
+                "cost_pln": cost_pln,
+                "availability_status": availability_status(sp.available_qty, sp.stock_status),
+                "lead_time_days": sp.lead_time_days if sp.lead_time_days is not None else (wh.default_lead_time_days if wh else 0),
+            }
+        )
+
+    return {part_id: min(offers, key=_offer_sort_key) for part_id, offers in offers_by_part.items()}
+
+
+def quote_parts(db: Session, parts: Iterable[Any]) -> Dict[int, Quote]:
+    """Prices parts live from supplier prices, FX rates and pricing rules.
+
+    `parts` only need `id`, `brand_id` and `category_id`, so Part rows and
+    light column tuples both work. Every part gets a Quote; parts without a
+    usable offer come back unpriced.
+    """
+    parts = list(parts)
+    offers = choose_best_offers(db, [p.id for p in parts])
+    rules = pricing_rule_index.get(db) if offers else None
+
+    quotes: Dict[int, Quote] = {}
+    for part in parts:
+        offer = offers.get(part.id)
+        if not offer:
+            quotes[part.id] = Quote(part_id=part.id)
+            continue
+        sp = offer["supplier_price"]
+        region = offer["warehouse"].region if offer.get("warehouse") else None
+        rule = rules.find(
+            region,
+            offer["cost_pln"],
+            brand_id=part.brand_id,
+            category_id=part.category_id,
+            supplier_id=sp.supplier_id,
+        )
+        quotes[part.id] = Quote(
+            part_id=part.id,
+            supplier_price_id=sp.id,
+            supplier_id=sp.supplier_id,
+            cost_pln=offer["cost_pln"],
+            selling_price=selling_price(offer["cost_pln"], rule),
+            margin_percent=rule.margin_percent if rule else DEFAULT_MARGIN_PERCENT,
+            availability_status=offer["availability_status"],
+            lead_time_days=offer["lead_time_days"],
+            warehouse_region=region or "EU",
+        )
+    return quotes
+
+
+def price_parts(db: Session, part_ids: Iterable[int], use_snapshot: bool = True) -> Dict[int, Quote]:
+    """Returns a Quote for every existing part in `part_ids`.
+
+    With `use_snapshot` prices come from part_price_snapshot and only parts
+    that were never snapshotted are priced live; without it everything is
+    priced live. Unknown part ids are left out of the result.
+    """
+    ids = set(part_ids)
+    if not ids:
+        return {}
+
+    quotes: Dict[int, Quote] = {}
+    if use_snapshot:
+        rows = (
+            db.query(PartPriceSnapshot, SupplierPrice.supplier_id)
+            .outerjoin(SupplierPrice, SupplierPrice.id == PartPriceSnapshot.supplier_price_id)
+            .filter(PartPriceSnapshot.part_id.in_(ids), PartPriceSnapshot.computed_at.isnot(None))
+            .all()
+        )
+        for s, supplier_id in rows:
+            priced = s.selling_price is not None
+            quotes[s.part_id] = Quote(
+                part_id=s.part_id,
+                supplier_price_id=s.supplier_price_id,
+                supplier_id=supplier_id,
+                cost_pln=s.cost_pln,
+                selling_price=s.selling_price.quantize(Decimal("1")) if priced else None,
+                availability_status=s.availability_status or "Unavailable",
+                lead_time_days=s.lead_time_days,
+                warehouse_region=(s.warehouse_region or "EU") if priced else None,
+            )
+
+    missing = ids - quotes.keys()
+    if missing:
+        parts = db.query(Part.id, Part.brand_id, Part.category_id).filter(Part.id.in_(missing)).all()
+        quotes.update(quote_parts(db, parts))
+    return quotes
+
 
 if __name__ == '__main__':
+    import argparse
+
+    from app.db_routers_connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Print quotes for parts")
+    parser.add_argument("part_ids", type=int, nargs="+")
+    parser.add_argument("--live", action="store_true", help="ignore part_price_snapshot")
+    args = parser.parse_args()
+
     db = SessionLocal()
-    eng = PricingEngine(db)
-
-    print('convert_to_pln')
-    value = eng.convert_to_pln(5, 'EUR')
-    print(value)
-
-    print('price_with_logistics')
-    supplier_price = db.query(SupplierPrice).first()
-    price_with_logistics = eng.calculate_price_with_logistics(supplier_price)
-    print(price_with_logistics)
-
-    print('find_best_supplier_price')
-    part = db.query(Part).first()
-    supplier_price = eng.find_best_supplier_price(part)
-    print(supplier_price.id)
-
-    print('get_pricing_rule')
-    supplier_price = db.query(SupplierPrice).first()
-    pricing_rule = eng.get_pricing_rule(supplier_price)
-    print(pricing_rule.rule_name)
-    print(pricing_rule.margin_percent)
-    print(pricing_rule.fixed_markup)
\ No newline at end of file
+    try:
+        for quote in price_parts(db, args.part_ids, use_snapshot=not args.live).values():
+            print(quote)
+    finally:
+        db.close()
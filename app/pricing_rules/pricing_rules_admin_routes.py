@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Response
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import delete, func
+from typing import List, Optional
 
 from app.pricing_rules.pricing_rules_schema import (
     PricingRuleResponse,
@@ -9,9 +9,14 @@ from app.pricing_rules.pricing_rules_schema import (
     PricingRuleUpdate,
 )
 from app.pricing_rules.pricing_rules_model import PricingRule
+from app.pricing_rules.pricing_rules_index import pricing_rule_index
+from app.part_price_snapshot.part_price_snapshot_service import mark_dirty_for_rules, rule_scope, snapshot_refresher
+from app.statistics_cache import statistics_cache
 from app.suppliers.suppliers_model import Supplier
 from app.brands.brands_model import Brand
 from app.categories.categories_model import Category
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
 from db_routers_connection import get_db
 
 
@@ -21,11 +26,14 @@ router = APIRouter(prefix="/api/pricingrules/admin", tags=["pricing-rules-admin"
 @router.get("/", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules
 def list_pricing_rules(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
-    rules = db.query(PricingRule).offset(skip).limit(limit).all()
+    rules = paginate(db.query(PricingRule), PricingRule.id, cursor, skip, limit).all()
+    set_next_cursor(response, rules, limit)
     return rules
 
 
@@ -65,8 +73,11 @@ def create_pricing_rule(rule: PricingRuleCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_rule)
+    mark_dirty_for_rules(db, [rule_scope(new_rule)])
     db.commit()
     db.refresh(new_rule)
+    pricing_rule_index.rebuild(db)
+    snapshot_refresher.wake()
     return new_rule
 
 
@@ -80,6 +91,7 @@ def update_pricing_rule(
     rule = db.query(PricingRule).filter(PricingRule.id == rule_id).first()
     if not rule:
         raise HTTPException(status_code=404, detail="Pricing rule not found")
+    old_scope = rule_scope(rule)
 
     new_name = update_data.rule_name if update_data.rule_name is not None else getattr(update_data, "name", None)
     if new_name is not None:
@@ -122,8 +134,11 @@ def update_pricing_rule(
     if update_data.is_active is not None:
         rule.is_active = update_data.is_active
 
+    mark_dirty_for_rules(db, [old_scope, rule_scope(rule)])
     db.commit()
     db.refresh(rule)
+    pricing_rule_index.rebuild(db)
+    snapshot_refresher.wake()
     return rule
 
 
@@ -133,8 +148,11 @@ def delete_pricing_rule(rule_id: int = Path(..., gt=0), db: Session = Depends(ge
     rule = db.query(PricingRule).filter(PricingRule.id == rule_id).first()
     if not rule:
         raise HTTPException(status_code=404, detail="Pricing rule not found")
+    mark_dirty_for_rules(db, [rule_scope(rule)])
     db.delete(rule)
     db.commit()
+    pricing_rule_index.rebuild(db)
+    snapshot_refresher.wake()
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
@@ -145,56 +163,44 @@ def bulk_create_pricing_rules(
     if not rules_data:
         raise HTTPException(status_code=422, detail="Empty rules list")
 
+    check = (
+        BulkValidation(rules_data)
+        .exists(Supplier.id, "supplier_id", lambda rd: "Supplier not found")
+        .exists(Brand.id, "brand_id", lambda rd: "Brand not found")
+        .exists(Category.id, "category_id", lambda rd: "Category not found")
+        .rule(lambda rd: rd.price_min < rd.price_max, lambda rd: "price_min must be less than price_max")
+        .unique((PricingRule.rule_name,), lambda rd, id: "rule_name already exists")
+        .run(db)
+    )
+
     created = 0
-    failed = 0
-    errors: List[str] = []
-    to_insert: List[PricingRule] = []
-
-    for idx, rd in enumerate(rules_data, 1):
-        try:
-            if rd.supplier_id is not None and not db.query(Supplier).filter(Supplier.id == rd.supplier_id).first():
-                raise ValueError("Supplier not found")
-            if rd.brand_id is not None and not db.query(Brand).filter(Brand.id == rd.brand_id).first():
-                raise ValueError("Brand not found")
-            if rd.category_id is not None and not db.query(Category).filter(Category.id == rd.category_id).first():
-                raise ValueError("Category not found")
-
-            if rd.price_min >= rd.price_max:
-                raise ValueError("price_min must be less than price_max")
-
-            rd_name = getattr(rd, "rule_name", None) or getattr(rd, "name", None)
-            if not rd_name:
-                raise ValueError("rule_name (alias 'name') is required")
-
-            if db.query(PricingRule).filter(PricingRule.rule_name == rd_name).first():
-                raise ValueError("rule_name already exists")
-
-            to_insert.append(
-                PricingRule(
-                    rule_name=rd_name,
-                    supplier_id=rd.supplier_id,
-                    brand_id=rd.brand_id,
-                    category_id=rd.category_id,
-                    price_min=rd.price_min,
-                    price_max=rd.price_max,
-                    warehouse_region=rd.warehouse_region,
-                    margin_percent=rd.margin_percent,
-                    fixed_markup=rd.fixed_markup,
-                    rounding_rule=rd.rounding_rule,
-                    priority=rd.priority,
-                    is_active=rd.is_active,
-                )
-            )
-        except Exception as e:
-            errors.append(f"Row {idx}: {str(e)}")
-            failed += 1
+    to_insert = [
+        PricingRule(
+            rule_name=rd.rule_name,
+            supplier_id=rd.supplier_id,
+            brand_id=rd.brand_id,
+            category_id=rd.category_id,
+            price_min=rd.price_min,
+            price_max=rd.price_max,
+            warehouse_region=rd.warehouse_region,
+            margin_percent=rd.margin_percent,
+            fixed_markup=rd.fixed_markup,
+            rounding_rule=rd.rounding_rule,
+            priority=rd.priority,
+            is_active=rd.is_active,
+        )
+        for rd in check.valid
+    ]
 
     if to_insert:
         db.add_all(to_insert)
+        mark_dirty_for_rules(db, [rule_scope(r) for r in to_insert])
         db.commit()
+        pricing_rule_index.rebuild(db)
+        snapshot_refresher.wake()
         created = len(to_insert)
 
-    return {"created": created, "failed": failed, "total": len(rules_data), "errors": errors or None}
+    return {"created": created, "failed": check.failed, "total": len(rules_data), "errors": check.errors or None}
 
 
 @router.post("/bulk-delete", response_model=dict)
@@ -203,200 +209,252 @@ def bulk_delete_pricing_rules(
     rule_ids: List[int] = Query(..., description="IDs to delete"),
     db: Session = Depends(get_db),
 ):
+
     if not rule_ids:
         raise HTTPException(status_code=422, detail="Empty rule_ids list")
 
-    deleted = 0
-    failed = 0
-    errors: List[str] = []
-
-    for rid in rule_ids:
-        rule = db.query(PricingRule).filter(PricingRule.id == rid).first()
-        if not rule:
-            errors.append(f"ID {rid}: not found")
-            failed += 1
-            continue
-        db.delete(rule)
-        deleted += 1
-
+    deleted_rules = db.execute(
+        delete(PricingRule)
+        .where(any_id(PricingRule.id, rule_ids))
+        .returning(
+            PricingRule.id,
+            PricingRule.warehouse_region,
+            PricingRule.brand_id,
+            PricingRule.category_id,
+            PricingRule.supplier_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    mark_dirty_for_rules(db, [rule_scope(r) for r in deleted_rules])
     db.commit()
-    return {"deleted": deleted, "failed": failed, "total": len(rule_ids), "errors": errors or None}
+    pricing_rule_index.rebuild(db)
+    snapshot_refresher.wake()
+
+    deleted, errors = delete_report(rule_ids, [r.id for r in deleted_rules], lambda rid: f"ID {rid}: not found")
+    return {"deleted": deleted, "failed": len(errors), "total": len(rule_ids), "errors": errors or None}
 
 
 @router.get("/statistics", response_model=dict)
 # Admin: pricing rules statistics
 def get_pricing_rules_statistics(db: Session = Depends(get_db)):
-    total_rules = db.query(PricingRule).count()
-    active_rules = db.query(PricingRule).filter(PricingRule.is_active == True).count()
-    inactive_rules = db.query(PricingRule).filter(PricingRule.is_active == False).count()
-
-    unique_suppliers = db.query(PricingRule.supplier_id).distinct().count()
-    unique_brands = db.query(PricingRule.brand_id).distinct().count()
-    unique_categories = db.query(PricingRule.category_id).distinct().count()
-    unique_regions = db.query(PricingRule.warehouse_region).distinct().count()
-
-    avg_margin = db.query(func.avg(PricingRule.margin_percent)).scalar() or 0
-    min_margin = db.query(func.min(PricingRule.margin_percent)).scalar() or 0
-    max_margin = db.query(func.max(PricingRule.margin_percent)).scalar() or 0
-    avg_fixed_markup = db.query(func.avg(PricingRule.fixed_markup)).scalar() or 0
-    min_price = db.query(func.min(PricingRule.price_min)).scalar() or 0
-    max_price = db.query(func.max(PricingRule.price_max)).scalar() or 0
-    highest_priority = db.query(func.max(PricingRule.priority)).scalar() or 0
+    return statistics_cache.cached("pricing_rules", lambda: _pricing_rules_statistics(db))
+
+
+def _pricing_rules_statistics(db: Session) -> dict:
+    # A NULL supplier/brand/category/region means "any", so it is not
+    # counted as a distinct value
+    s = db.query(
+        func.count(PricingRule.id).label("total_rules"),
+        func.count(PricingRule.id).filter(PricingRule.is_active == True).label("active_rules"),
+        func.count(PricingRule.id).filter(PricingRule.is_active == False).label("inactive_rules"),
+        func.count(func.distinct(PricingRule.supplier_id)).label("unique_suppliers"),
+        func.count(func.distinct(PricingRule.brand_id)).label("unique_brands"),
+        func.count(func.distinct(PricingRule.category_id)).label("unique_categories"),
+        func.count(func.distinct(PricingRule.warehouse_region)).label("unique_regions"),
+        func.avg(PricingRule.margin_percent).label("avg_margin"),
+        func.min(PricingRule.margin_percent).label("min_margin"),
+        func.max(PricingRule.margin_percent).label("max_margin"),
+        func.avg(PricingRule.fixed_markup).label("avg_fixed_markup"),
+        func.min(PricingRule.price_min).label("min_price"),
+        func.max(PricingRule.price_max).label("max_price"),
+        func.max(PricingRule.priority).label("highest_priority"),
+    ).one()
 
     return {
-        "total_pricing_rules": total_rules,
-        "active_rules": active_rules,
-        "inactive_rules": inactive_rules,
-        "unique_suppliers": unique_suppliers,
-        "unique_brands": unique_brands,
-        "unique_categories": unique_categories,
-        "unique_regions": unique_regions,
-        "average_margin_percent": float(avg_margin),
-        "min_margin_percent": float(min_margin),
-        "max_margin_percent": float(max_margin),
-        "average_fixed_markup": float(avg_fixed_markup),
-        "min_price_range": float(min_price),
-        "max_price_range": float(max_price),
-        "highest_priority_level": highest_priority,
+        "total_pricing_rules": s.total_rules,
+        "active_rules": s.active_rules,
+        "inactive_rules": s.inactive_rules,
+        "unique_suppliers": s.unique_suppliers,
+        "unique_brands": s.unique_brands,
+        "unique_categories": s.unique_categories,
+        "unique_regions": s.unique_regions,
+        "average_margin_percent": float(s.avg_margin or 0),
+        "min_margin_percent": float(s.min_margin or 0),
+        "max_margin_percent": float(s.max_margin or 0),
+        "average_fixed_markup": float(s.avg_fixed_markup or 0),
+        "min_price_range": float(s.min_price or 0),
+        "max_price_range": float(s.max_price or 0),
+        "highest_priority_level": s.highest_priority or 0,
     }
 
 
 @router.get("/by-active/{is_active}", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules by active status
 def get_rules_by_active_status(
-    is_active: bool, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_db)
+    response: Response,
+    is_active: bool,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.is_active == is_active)
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.is_active == is_active),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/by-supplier/{supplier_id}", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules by supplier
 def get_rules_by_supplier(
+    response: Response,
     supplier_id: int = Path(..., gt=0),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.supplier_id == supplier_id)
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.supplier_id == supplier_id),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/by-brand/{brand_id}", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules by brand
 def get_rules_by_brand(
+    response: Response,
     brand_id: int = Path(..., gt=0),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.brand_id == brand_id)
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.brand_id == brand_id),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/by-category/{category_id}", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules by category
 def get_rules_by_category(
+    response: Response,
     category_id: int = Path(..., gt=0),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.category_id == category_id)
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.category_id == category_id),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/by-region/{region}", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules by region
 def get_rules_by_region(
+    response: Response,
     region: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.warehouse_region.ilike(f"%{region}%"))
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.warehouse_region.ilike(f"%{region}%")),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/by-priority/{priority}", response_model=List[PricingRuleResponse])
 # Admin: list pricing rules by priority
 def get_rules_by_priority(
+    response: Response,
     priority: int = Path(..., gt=0),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.priority == priority)
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.priority == priority),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/search", response_model=List[PricingRuleResponse])
 # Admin: search pricing rules by name
 def search_pricing_rules(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=200),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     rules = (
-        db.query(PricingRule)
-        .filter(PricingRule.rule_name.ilike(f"%{name}%"))
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            db.query(PricingRule)
+            .filter(PricingRule.rule_name.ilike(f"%{name}%")),
+            PricingRule.id, cursor, skip, limit,
+        )
         .all()
     )
+    set_next_cursor(response, rules, limit)
     return rules
 
 
 @router.get("/price-range-analysis", response_model=dict)
 # Admin: analyze pricing rule price ranges
 def get_price_range_analysis(db: Session = Depends(get_db)):
-    total_rules = db.query(PricingRule).count()
-    rules = db.query(PricingRule).all()
+    return statistics_cache.cached("pricing_rules:price_ranges", lambda: _price_range_analysis(db))
+
+
+def _price_range_analysis(db: Session) -> dict:
+    # One row per distinct range instead of loading every rule
+    ranges = (
+        db.query(PricingRule.price_min, PricingRule.price_max, func.count(PricingRule.id).label("rules"))
+        .group_by(PricingRule.price_min, PricingRule.price_max)
+        .all()
+    )
+    total_rules = sum(r.rules for r in ranges)
 
     price_ranges: dict[str, int] = {}
-    for r in rules:
+    for r in ranges:
         key = f"{float(r.price_min)}-{float(r.price_max)}"
-        price_ranges[key] = price_ranges.get(key, 0) + 1
+        price_ranges[key] = price_ranges.get(key, 0) + r.rules
 
     avg_price_range = (
-        sum((float(r.price_max) - float(r.price_min)) for r in rules) / total_rules
+        sum((float(r.price_max) - float(r.price_min)) * r.rules for r in ranges) / total_rules
         if total_rules > 0
         else 0
     )
@@ -405,8 +463,8 @@ def get_price_range_analysis(db: Session = Depends(get_db)):
         "total_rules": total_rules,
         "average_price_range_width": avg_price_range,
         "price_range_distribution": price_ranges,
-        "min_price_overall": float(min(r.price_min for r in rules)) if rules else 0,
-        "max_price_overall": float(max(r.price_max for r in rules)) if rules else 0,
+        "min_price_overall": float(min(r.price_min for r in ranges)) if ranges else 0,
+        "max_price_overall": float(max(r.price_max for r in ranges)) if ranges else 0,
     }
 
 
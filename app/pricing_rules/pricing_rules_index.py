@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.pricing_rules.pricing_rules_model import PricingRule
+
+
+# Safety net for other worker processes, which never see our rebuilds
+PRICING_RULE_INDEX_TTL = float(os.getenv("pricing_rule_index_ttl", "300"))
+
+
+class CompiledRule(NamedTuple):
+    id: int
+    rule_name: str
+    supplier_id: Optional[int]
+    brand_id: Optional[int]
+    category_id: Optional[int]
+    price_min: Decimal
+    price_max: Decimal
+    warehouse_region: str
+    margin_percent: Decimal
+    fixed_markup: Decimal
+    rounding_rule: str
+    priority: int
+
+    def matches(self, brand_id: Optional[int], category_id: Optional[int], supplier_id: Optional[int]) -> bool:
+        if self.brand_id is not None and self.brand_id != brand_id:
+            return False
+        if self.category_id is not None and self.category_id != category_id:
+            return False
+        if self.supplier_id is not None and self.supplier_id != supplier_id:
+            return False
+        return True
+
+
+class _RegionIndex:
+    # Price bounds split the axis into slots: slot 2i+1 is exactly points[i],
+    # slot 2i is the open gap below it. Every slot keeps the rules covering it
+    # in priority order, so a lookup is one bisect plus a short scan.
+
+    def __init__(self, rules: List[CompiledRule]):
+        self.points: List[Decimal] = sorted({r.price_min for r in rules} | {r.price_max for r in rules})
+        self.slots: List[List[CompiledRule]] = [[] for _ in range(2 * len(self.points) + 1)]
+        for r in sorted(rules, key=lambda r: (r.priority, r.id)):
+            first = 2 * bisect_left(self.points, r.price_min) + 1
+            last = 2 * bisect_left(self.points, r.price_max) + 1
+            for slot in range(first, last + 1):
+                self.slots[slot].append(r)
+
+    def candidates(self, price: Decimal) -> List[CompiledRule]:
+        i = bisect_left(self.points, price)
+        if i < len(self.points) and self.points[i] == price:
+            return self.slots[2 * i + 1]
+        return self.slots[2 * i]
+
+
+class PricingRuleIndex:
+    """Active pricing rules compiled for lookups without a query.
+
+    Rules are partitioned by warehouse_region; within a region the price band
+    (price_min <= price <= price_max) is resolved by binary search, then the
+    brand/category/supplier filters pick the highest-priority match.
+    """
+
+    def __init__(self, rules: Iterable[CompiledRule]):
+        self._rules = sorted(rules, key=lambda r: (r.priority, r.id))
+        by_region: Dict[str, List[CompiledRule]] = {}
+        for r in self._rules:
+            by_region.setdefault(r.warehouse_region, []).append(r)
+        self._regions = {region: _RegionIndex(rs) for region, rs in by_region.items()}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[PricingRule]) -> "PricingRuleIndex":
+        return cls(
+            CompiledRule(
+                id=r.id,
+                rule_name=r.rule_name,
+                supplier_id=r.supplier_id,
+                brand_id=r.brand_id,
+                category_id=r.category_id,
+                price_min=Decimal(str(r.price_min)),
+                price_max=Decimal(str(r.price_max)),
+                warehouse_region=r.warehouse_region,
+                margin_percent=Decimal(str(r.margin_percent)),
+                fixed_markup=Decimal(str(r.fixed_markup)),
+                rounding_rule=r.rounding_rule,
+                priority=r.priority,
+            )
+            for r in rows
+            if r.is_active
+        )
+
+    def rules(self) -> List[CompiledRule]:
+        # All rules in the order `find` tries them
+        return list(self._rules)
+
+    def find(
+        self,
+        region: Optional[str],
+        price: Decimal,
+        brand_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        supplier_id: Optional[int] = None,
+    ) -> Optional[CompiledRule]:
+        index = self._regions.get(region)
+        if index is None:
+            return None
+        return next((r for r in index.candidates(price) if r.matches(brand_id, category_id, supplier_id)), None)
+
+
+class PricingRuleIndexCache:
+    """Holds the current PricingRuleIndex for the process.
+
+    `rebuild` compiles a fresh index and swaps it in with a single assignment,
+    so readers never see a half-built index.
+    """
+
+    def __init__(self, ttl: float = PRICING_RULE_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Optional[PricingRuleIndex] = None
+        self._built_at = 0.0
+
+    def rebuild(self, db: Session) -> PricingRuleIndex:
+        index = PricingRuleIndex.from_rows(db.query(PricingRule).filter(PricingRule.is_active == True).all())
+        with self._lock:
+            self._index = index
+            self._built_at = time.monotonic()
+        return index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def get(self, db: Session) -> PricingRuleIndex:
+        index = self._index
+        if index is None or time.monotonic() - self._built_at > self.ttl:
+            index = self.rebuild(db)
+        return index
+
+    def find(
+        self,
+        db: Session,
+        region: Optional[str],
+        price: Decimal,
+        brand_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        supplier_id: Optional[int] = None,
+    ) -> Optional[CompiledRule]:
+        return self.get(db).find(region, price, brand_id, category_id, supplier_id)
+
+
+pricing_rule_index = PricingRuleIndexCache()
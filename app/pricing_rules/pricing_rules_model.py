@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db_base import Base
 
 class PricingRule(Base):
     __tablename__ = 'pricing_rules'
+    __table_args__ = (
+        Index('ix_pricing_rules_active_region_priority', 'is_active', 'warehouse_region', 'priority'),
+    )
 
     id = Column(Integer, primary_key=True)
     rule_name = Column(String, nullable=False, unique=True)
@@ -0,0 +1,293 @@
+import argparse
+import io
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy import BigInteger, DateTime, case, cast, func, select, text
+from sqlalchemy.orm import Session
+
+from app.fx_rates.fx_rates_cache import fx_rate_cache
+from app.parts.parts_model import Part
+from app.pricing_rules.pricing_rules_index import pricing_rule_index
+from app.supplier_price.supplier_price_model import SupplierPrice
+from app.warehouses.warehouses_model import Warehouse
+
+from db_routers_connection import SessionLocal
+
+
+# Prices are kept as integers so the result matches the Decimal pricing path
+# exactly: base_price in 1e-4 PLN units, FX rates in 1e-6, cost in cents
+PRICE_SCALE = 10_000
+FX_SCALE = 1_000_000
+FETCH_CHUNK = 100_000
+
+# Availability codes, same rules as pricing_engine.availability_status
+AVAILABILITY = np.array(["Available", "On order", "Unavailable"], dtype=object)
+
+
+def _load_offers(db: Session) -> Dict[str, np.ndarray]:
+    status = func.upper(SupplierPrice.stock_status)
+    stmt = select(
+        SupplierPrice.id,
+        SupplierPrice.part_id,
+        SupplierPrice.supplier_id,
+        SupplierPrice.warehouse_id,
+        cast(SupplierPrice.base_price * PRICE_SCALE, BigInteger),
+        func.upper(SupplierPrice.currency),
+        case(
+            ((SupplierPrice.available_qty > 0) & status.in_(["IN_STOCK", "AVAILABLE", "LOW_STOCK"]), 0),
+            (status.in_(["BACKORDER", "PREORDER"]), 1),
+            else_=2,
+        ),
+        func.coalesce(SupplierPrice.lead_time_days, -1),
+    ).execution_options(stream_results=True, yield_per=FETCH_CHUNK)
+
+    names = ["id", "part_id", "supplier_id", "warehouse_id", "price_e4", "currency", "availability", "lead_time"]
+    chunks: Dict[str, List[np.ndarray]] = {n: [] for n in names}
+    for partition in db.execute(stmt).partitions():
+        for name, values in zip(names, zip(*partition)):
+            dtype = object if name == "currency" else np.int64
+            chunks[name].append(np.array(values, dtype=dtype))
+
+    return {
+        n: (np.concatenate(c) if c else np.empty(0, dtype=object if n == "currency" else np.int64))
+        for n, c in chunks.items()
+    }
+
+
+def _lookup(keys: np.ndarray, table_keys: np.ndarray, table_values: np.ndarray, missing) -> np.ndarray:
+    # Vectorized dict lookup through a sorted key array
+    if len(table_keys) == 0:
+        return np.full(len(keys), missing, dtype=table_values.dtype)
+    order = np.argsort(table_keys)
+    sorted_keys = table_keys[order]
+    pos = np.clip(np.searchsorted(sorted_keys, keys), 0, len(sorted_keys) - 1)
+    found = sorted_keys[pos] == keys
+    return np.where(found, table_values[order][pos], missing)
+
+
+def _round_half_even(value: np.ndarray, divisor: int) -> np.ndarray:
+    q, r = np.divmod(value, divisor)
+    half = divisor // 2
+    return q + ((r > half) | ((r == half) & (q % 2 == 1)))
+
+
+def _ceil_div(value: np.ndarray, divisor: int) -> np.ndarray:
+    return -((-value) // divisor)
+
+
+def compute_catalog_prices(db: Session) -> Dict[str, Any]:
+    """Computes best offer and selling price for every part in one pass.
+
+    Returns columnar arrays indexed by part: part_id, supplier_price_id
+    (-1 when the part has no usable offer), cost_cents, selling_pln,
+    availability, lead_time_days and warehouse_region.
+    """
+    offers = _load_offers(db)
+
+    part_rows = db.execute(select(Part.id, Part.brand_id, Part.category_id).order_by(Part.id)).all()
+    part_ids = np.array([r[0] for r in part_rows], dtype=np.int64)
+    brand_ids = np.array([r[1] for r in part_rows], dtype=np.int64)
+    category_ids = np.array([r[2] for r in part_rows], dtype=np.int64)
+
+    wh_rows = db.execute(select(Warehouse.id, Warehouse.region, Warehouse.default_lead_time_days)).all()
+    regions = sorted({r[1] for r in wh_rows})
+    region_codes = {region: i for i, region in enumerate(regions)}
+    wh_ids = np.array([r[0] for r in wh_rows], dtype=np.int64)
+    wh_region = np.array([region_codes[r[1]] for r in wh_rows], dtype=np.int64)
+    wh_eu = np.array([(r[1] or "").upper() == "EU" for r in wh_rows], dtype=bool)
+    wh_lead = np.array([r[2] for r in wh_rows], dtype=np.int64)
+
+    # FX: currency codes -> rate in 1e-6 units, 0 when there is no rate
+    currencies, currency_idx = np.unique(offers["currency"], return_inverse=True)
+    rates = fx_rate_cache.get_rates_pln(db, [str(c) for c in currencies])
+    currency_fx = np.array(
+        [int(rates[str(c)] * FX_SCALE) if str(c) in rates else 0 for c in currencies], dtype=np.int64
+    )
+    fx = currency_fx[currency_idx] if len(currencies) else np.empty(0, dtype=np.int64)
+
+    if len(fx) and int(offers["price_e4"].max()) * int(fx.max()) >= 2 ** 63:
+        raise ValueError("Supplier prices too large for fixed-point repricing")
+
+    usable = fx > 0
+    o_id = offers["id"][usable]
+    o_part = offers["part_id"][usable]
+    o_supplier = offers["supplier_id"][usable]
+    o_warehouse = offers["warehouse_id"][usable]
+    o_availability = offers["availability"][usable]
+    cost_cents = _round_half_even(offers["price_e4"][usable] * fx[usable], PRICE_SCALE * FX_SCALE // 100)
+
+    o_region = _lookup(o_warehouse, wh_ids, wh_region, -1)
+    o_eu = _lookup(o_warehouse, wh_ids, wh_eu, False)
+    o_lead = offers["lead_time"][usable]
+    o_lead = np.where(o_lead >= 0, o_lead, _lookup(o_warehouse, wh_ids, wh_lead, 0))
+
+    # Best offer per part: EU warehouses first, then cost, then lead time
+    order = np.lexsort((o_id, o_lead, cost_cents, ~o_eu, o_part))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = o_part[order][1:] != o_part[order][:-1]
+    best = order[first]
+
+    n = len(part_ids)
+    part_pos = np.searchsorted(part_ids, o_part[best])
+    known = (part_pos < n) & (part_ids[np.clip(part_pos, 0, max(n - 1, 0))] == o_part[best]) if n else np.zeros(0, bool)
+    best, part_pos = best[known], part_pos[known]
+
+    result_sp = np.full(n, -1, dtype=np.int64)
+    result_cost = np.zeros(n, dtype=np.int64)
+    result_lead = np.full(n, -1, dtype=np.int64)
+    result_availability = np.full(n, 2, dtype=np.int64)
+    result_region = np.full(n, -1, dtype=np.int64)
+    result_supplier = np.full(n, -1, dtype=np.int64)
+
+    result_sp[part_pos] = o_id[best]
+    result_cost[part_pos] = cost_cents[best]
+    result_lead[part_pos] = o_lead[best]
+    result_availability[part_pos] = o_availability[best]
+    result_region[part_pos] = o_region[best]
+    result_supplier[part_pos] = o_supplier[best]
+    priced = result_sp >= 0
+
+    # Rules in priority order; each part keeps the first rule that matches
+    rules = pricing_rule_index.rebuild(db).rules()
+    rule_margin = np.zeros(n, dtype=np.int64)
+    rule_fixed = np.zeros(n, dtype=np.int64)
+    matched = np.zeros(n, dtype=bool)
+    cost_e4 = result_cost * 100
+    for r in rules:
+        if r.warehouse_region not in region_codes:
+            continue
+        mask = (
+            priced
+            & ~matched
+            & (result_region == region_codes[r.warehouse_region])
+            & (cost_e4 >= int(r.price_min * PRICE_SCALE))
+            & (cost_e4 <= int(r.price_max * PRICE_SCALE))
+        )
+        if r.brand_id is not None:
+            mask &= brand_ids == r.brand_id
+        if r.category_id is not None:
+            mask &= category_ids == r.category_id
+        if r.supplier_id is not None:
+            mask &= result_supplier == r.supplier_id
+        rule_margin[mask] = int(r.margin_percent * 100)
+        rule_fixed[mask] = int(r.fixed_markup * PRICE_SCALE)
+        matched |= mask
+
+    # cost * (1 + margin / 100) + fixed_markup, rounded up to whole PLN (1e-6 units)
+    with_rule = result_cost * (10_000 + rule_margin) + rule_fixed * 100
+    default = result_cost * 12_500
+    selling = _ceil_div(np.where(matched, with_rule, default), FX_SCALE)
+
+    region_names = np.array(regions + [None], dtype=object)
+    return {
+        "part_id": part_ids,
+        "supplier_price_id": result_sp,
+        "cost_cents": result_cost,
+        "selling_pln": selling,
+        "availability": AVAILABILITY[result_availability],
+        "lead_time_days": result_lead,
+        "warehouse_region": region_names[result_region],
+        "priced": priced,
+        "offers_loaded": len(offers["id"]),
+    }
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def write_snapshots(db: Session, prices: Dict[str, Any], started_at: datetime) -> int:
+    """Bulk-writes computed prices into part_price_snapshot through COPY.
+
+    Parts marked dirty after `started_at` stay queued for the refresher.
+    """
+    db.execute(text(
+        "CREATE TEMP TABLE tmp_part_price_snapshot ("
+        " part_id integer PRIMARY KEY, supplier_price_id integer, cost_pln numeric(19, 2),"
+        " selling_price numeric(19, 2), availability_status varchar, lead_time_days integer,"
+        " warehouse_region varchar) ON COMMIT DROP"
+    ))
+
+    buf = io.StringIO()
+    priced = prices["priced"]
+    for i, part_id in enumerate(prices["part_id"]):
+        if priced[i]:
+            cents = int(prices["cost_cents"][i])
+            row = (
+                int(part_id),
+                int(prices["supplier_price_id"][i]),
+                f"{cents // 100}.{cents % 100:02d}",
+                int(prices["selling_pln"][i]),
+                prices["availability"][i],
+                int(prices["lead_time_days"][i]),
+                prices["warehouse_region"][i],
+            )
+        else:
+            row = (int(part_id), None, None, None, "Unavailable", None, None)
+        buf.write("\t".join(_copy_value(v) for v in row) + "\n")
+    buf.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert("COPY tmp_part_price_snapshot FROM STDIN", buf)
+
+    result = db.execute(
+        text(
+            "INSERT INTO part_price_snapshot AS s (part_id, supplier_price_id, cost_pln, selling_price,"
+            " availability_status, lead_time_days, warehouse_region, computed_at, dirty_at)"
+            " SELECT part_id, supplier_price_id, cost_pln, selling_price, availability_status,"
+            " lead_time_days, warehouse_region, :now, NULL FROM tmp_part_price_snapshot"
+            " ON CONFLICT (part_id) DO UPDATE SET"
+            " supplier_price_id = excluded.supplier_price_id, cost_pln = excluded.cost_pln,"
+            " selling_price = excluded.selling_price, availability_status = excluded.availability_status,"
+            " lead_time_days = excluded.lead_time_days, warehouse_region = excluded.warehouse_region,"
+            " computed_at = excluded.computed_at,"
+            " dirty_at = CASE WHEN s.dirty_at <= :started_at THEN NULL ELSE s.dirty_at END"
+        ),
+        {"now": datetime.utcnow(), "started_at": started_at},
+    )
+    db.commit()
+    return result.rowcount
+
+
+def reprice_catalog(db: Session, dry_run: bool = False) -> Dict[str, Any]:
+    started_at = db.execute(select(cast(func.clock_timestamp(), DateTime))).scalar()
+    t0 = time.perf_counter()
+    fx_rate_cache.reload(db)
+    prices = compute_catalog_prices(db)
+    t1 = time.perf_counter()
+    written = 0 if dry_run else write_snapshots(db, prices, started_at)
+    t2 = time.perf_counter()
+
+    parts = len(prices["part_id"])
+    return {
+        "parts": parts,
+        "priced_parts": int(prices["priced"].sum()),
+        "offers": prices["offers_loaded"],
+        "written": written,
+        "compute_seconds": round(t1 - t0, 3),
+        "write_seconds": round(t2 - t1, 3),
+        "parts_per_second": round(parts / (t2 - t0), 1) if t2 > t0 else None,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reprice the whole catalog into part_price_snapshot")
+    parser.add_argument("--dry-run", action="store_true", help="compute prices without writing them")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = reprice_catalog(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    print(f"Parts:   {report['parts']} ({report['priced_parts']} with offers)")
+    print(f"Offers:  {report['offers']}")
+    print(f"Written: {report['written']}")
+    print(f"Compute: {report['compute_seconds']}s, write: {report['write_seconds']}s")
+    print(f"Throughput: {report['parts_per_second']} parts/s")
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
 from typing import List, Optional
 
 from app.shipping_rates.shipping_rates_schema import (
@@ -9,8 +9,12 @@ from app.shipping_rates.shipping_rates_schema import (
     ShippingRateResponse,
 )
 from app.shipping_rates.shipping_rates_model import ShippingRate
+from app.shipping_rates.shipping_rates_matrix import shipping_rate_matrix
+from app.statistics_cache import statistics_cache
 from app.shipping_zones.shipping_zones_model import ShippingZone
-from db_routers_connection import get_db
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from db_routers_connection import get_async_db
 
 
 router = APIRouter(prefix="/api/shippingrates/admin", tags=["shipping-rates-admin"]) 
@@ -19,20 +23,23 @@ router = APIRouter(prefix="/api/shippingrates/admin", tags=["shipping-rates-admi
 @router.get("/", response_model=List[ShippingRateResponse])
 # Admin: list shipping rates
 async def list_shipping_rates_admin(
+    response: Response,
     skip: int = Query(0, ge=0, description="Pagination: skip N results"),
     limit: int = Query(50, ge=1, le=500, description="Pagination: max results (default 50, max 500)"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    rates = db.query(ShippingRate).offset(skip).limit(limit).all()
+    rates = (await db.scalars(paginate(select(ShippingRate), ShippingRate.id, cursor, skip, limit))).all()
+    set_next_cursor(response, rates, limit)
     return rates
 
 
 @router.post("/", response_model=ShippingRateResponse, status_code=201)
 # Admin: create shipping rate
 async def create_shipping_rate_admin(
-    rate: ShippingRateCreate, db: Session = Depends(get_db)
+    rate: ShippingRateCreate, db: AsyncSession = Depends(get_async_db)
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == rate.shipping_zone_id).first()
+    zone = await db.get(ShippingZone, rate.shipping_zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail=f"Shipping zone with ID {rate.shipping_zone_id} not found")
 
@@ -41,103 +48,92 @@ async def create_shipping_rate_admin(
 
     db_rate = ShippingRate(**rate.dict())
     db.add(db_rate)
-    db.commit()
-    db.refresh(db_rate)
+    await db.commit()
+    await db.run_sync(shipping_rate_matrix.rebuild)
+    await db.refresh(db_rate)
     return db_rate
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create shipping rates
 async def bulk_create_shipping_rates_admin(
-    rates_data: List[ShippingRateCreate], db: Session = Depends(get_db)
+    rates_data: List[ShippingRateCreate], db: AsyncSession = Depends(get_async_db)
 ):
     created = 0
-    failed = 0
-    errors: List[str] = []
-    rates_to_insert: List[ShippingRate] = []
-
-    for idx, rate_data in enumerate(rates_data, 1):
-        try:
-            zone = db.query(ShippingZone).filter(ShippingZone.id == rate_data.shipping_zone_id).first()
-            if not zone:
-                errors.append(f"Row {idx}: Shipping zone with ID {rate_data.shipping_zone_id} not found")
-                failed += 1
-                continue
-
-            if rate_data.weight_min >= rate_data.weight_max:
-                errors.append(
-                    f"Row {idx}: weight_min ({rate_data.weight_min}) must be less than weight_max ({rate_data.weight_max})"
-                )
-                failed += 1
-                continue
-
-            rates_to_insert.append(ShippingRate(**rate_data.dict()))
-        except Exception as e:
-            errors.append(f"Row {idx}: {str(e)}")
-            failed += 1
+    check = await (
+        BulkValidation(rates_data)
+        .exists(ShippingZone.id, "shipping_zone_id", lambda r: f"Shipping zone with ID {r.shipping_zone_id} not found")
+        .rule(
+            lambda r: r.weight_min < r.weight_max,
+            lambda r: f"weight_min ({r.weight_min}) must be less than weight_max ({r.weight_max})",
+        )
+        .run_async(db)
+    )
+    rates_to_insert = [ShippingRate(**rate_data.dict()) for rate_data in check.valid]
 
     if rates_to_insert:
         db.add_all(rates_to_insert)
-        db.commit()
+        await db.commit()
+        await db.run_sync(shipping_rate_matrix.rebuild)
         created = len(rates_to_insert)
 
-    return {"created": created, "failed": failed, "total": len(rates_data), "errors": errors or None}
+    return {"created": created, "failed": check.failed, "total": len(rates_data), "errors": check.errors or None}
 
 
 @router.post("/bulk-delete", response_model=dict)
 # Admin: bulk delete shipping rates
 async def bulk_delete_shipping_rates_admin(
     rate_ids: List[int] = Query(..., description="List of shipping rate IDs to delete"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    deleted = 0
-    failed = 0
-    errors: List[str] = []
-
-    for rate_id in rate_ids:
-        try:
-            db_rate = db.query(ShippingRate).filter(ShippingRate.id == rate_id).first()
-            if not db_rate:
-                errors.append(f"ID {rate_id}: Shipping rate not found")
-                failed += 1
-                continue
-            db.delete(db_rate)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {rate_id}: {str(e)}")
-            failed += 1
-
-    db.commit()
-    return {"deleted": deleted, "failed": failed, "total": len(rate_ids), "errors": errors or None}
 
+    deleted_ids = (
+        await db.scalars(
+            delete(ShippingRate)
+            .where(any_id(ShippingRate.id, rate_ids))
+            .returning(ShippingRate.id)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
 
-@router.get("/statistics", response_model=dict)
-# Admin: shipping rates statistics
-async def get_shipping_rates_statistics_admin(db: Session = Depends(get_db)):
-    total_rates = db.query(ShippingRate).count()
-    total_zones = db.query(ShippingZone).count()
-    zones_with_rates = (
-        db.query(ShippingZone)
-        .join(ShippingRate, ShippingZone.id == ShippingRate.shipping_zone_id)
-        .count()
-    )
+    await db.commit()
+    await db.run_sync(shipping_rate_matrix.rebuild)
 
-    avg_price = db.query(func.avg(ShippingRate.price_pln)).scalar() or 0
-    min_price = db.query(func.min(ShippingRate.price_pln)).scalar() or 0
-    max_price = db.query(func.max(ShippingRate.price_pln)).scalar() or 0
+    deleted, errors = delete_report(rate_ids, deleted_ids, lambda rate_id: f"ID {rate_id}: Shipping rate not found")
+    return {"deleted": deleted, "failed": len(errors), "total": len(rate_ids), "errors": errors or None}
 
-    unique_carriers = db.query(func.count(func.distinct(ShippingRate.carrier))).scalar() or 0
-    unique_regions = db.query(func.count(func.distinct(ShippingRate.warehouse_region))).scalar() or 0
+
+@router.get("/statistics", response_model=dict)
+# Admin: shipping rates statistics
+async def get_shipping_rates_statistics_admin(db: AsyncSession = Depends(get_async_db)):
+    return await statistics_cache.cached_async("shipping_rates", lambda: _shipping_rates_statistics(db))
+
+
+async def _shipping_rates_statistics(db: AsyncSession) -> dict:
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_rates"),
+                func.count(func.distinct(ShippingRate.shipping_zone_id)).label("zones_with_rates"),
+                func.count(func.distinct(ShippingRate.carrier)).label("unique_carriers"),
+                func.count(func.distinct(ShippingRate.warehouse_region)).label("unique_regions"),
+                func.avg(ShippingRate.price_pln).label("avg_price"),
+                func.min(ShippingRate.price_pln).label("min_price"),
+                func.max(ShippingRate.price_pln).label("max_price"),
+                select(func.count()).select_from(ShippingZone).scalar_subquery().label("total_zones"),
+            ).select_from(ShippingRate)
+        )
+    ).one()
 
     return {
-        "total_shipping_rates": total_rates,
-        "total_shipping_zones": total_zones,
-        "zones_with_rates": zones_with_rates,
-        "unique_carriers": unique_carriers,
-        "unique_warehouse_regions": unique_regions,
-        "average_price_pln": round(float(avg_price), 4) if avg_price else 0,
-        "min_price_pln": float(min_price) if min_price else 0,
-        "max_price_pln": float(max_price) if max_price else 0,
+        "total_shipping_rates": s.total_rates,
+        "total_shipping_zones": s.total_zones,
+        "zones_with_rates": s.zones_with_rates,
+        "unique_carriers": s.unique_carriers,
+        "unique_warehouse_regions": s.unique_regions,
+        "average_price_pln": round(float(s.avg_price), 4) if s.avg_price else 0,
+        "min_price_pln": float(s.min_price) if s.min_price else 0,
+        "max_price_pln": float(s.max_price) if s.max_price else 0,
     }
 
 
@@ -145,80 +141,105 @@ async def get_shipping_rates_statistics_admin(db: Session = Depends(get_db)):
 # Admin: carrier shipping rates statistics
 async def get_carrier_statistics_admin(
     carrier: str = Path(..., min_length=1, max_length=200, description="Carrier name"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    rates = db.query(ShippingRate).filter(ShippingRate.carrier.ilike(f"%{carrier}%")).all()
-    if not rates:
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_rates"),
+                func.count(func.distinct(ShippingRate.shipping_zone_id)).label("unique_zones"),
+                func.count(func.distinct(ShippingRate.warehouse_region)).label("unique_regions"),
+                func.count(func.distinct(ShippingRate.service_level)).label("unique_service_levels"),
+                func.min(ShippingRate.price_pln).label("min_price"),
+                func.max(ShippingRate.price_pln).label("max_price"),
+                func.avg(ShippingRate.price_pln).label("avg_price"),
+            ).where(ShippingRate.carrier.ilike(f"%{carrier}%"))
+        )
+    ).one()
+    if not s.total_rates:
         raise HTTPException(status_code=404, detail=f"No rates found for carrier '{carrier}'")
 
-    prices = [float(getattr(r, "price_pln", 0) or 0) for r in rates]
-
     return {
         "carrier": carrier,
-        "total_rates": len(rates),
-        "unique_zones": len({r.shipping_zone_id for r in rates}),
-        "unique_regions": len({r.warehouse_region for r in rates}),
-        "unique_service_levels": len({r.service_level for r in rates}),
-        "min_price_pln": min(prices) if prices else 0,
-        "max_price_pln": max(prices) if prices else 0,
-        "average_price_pln": round(sum(prices) / len(prices), 4) if prices else 0,
+        "total_rates": s.total_rates,
+        "unique_zones": s.unique_zones,
+        "unique_regions": s.unique_regions,
+        "unique_service_levels": s.unique_service_levels,
+        "min_price_pln": float(s.min_price or 0),
+        "max_price_pln": float(s.max_price or 0),
+        "average_price_pln": round(float(s.avg_price or 0), 4),
     }
 
 
 @router.get("/by-zone/{zone_id}", response_model=List[ShippingRateResponse])
 # Admin: list shipping rates by zone
 async def get_rates_by_zone_admin(
+    response: Response,
     zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    zone = await db.get(ShippingZone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
     rates = (
-        db.query(ShippingRate)
-        .filter(ShippingRate.shipping_zone_id == zone_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(ShippingRate)
+                .where(ShippingRate.shipping_zone_id == zone_id),
+                ShippingRate.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, rates, limit)
     return rates
 
 
 @router.get("/by-region/{region}", response_model=List[ShippingRateResponse])
 # Admin: list shipping rates by region
 async def get_rates_by_region_admin(
+    response: Response,
     region: str = Path(..., min_length=1, max_length=200, description="Warehouse region"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
     rates = (
-        db.query(ShippingRate)
-        .filter(ShippingRate.warehouse_region.ilike(f"%{region}%"))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(ShippingRate)
+                .where(ShippingRate.warehouse_region.ilike(f"%{region}%")),
+                ShippingRate.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, rates, limit)
     return rates
 
 
 @router.get("/search", response_model=List[ShippingRateResponse])
 # Admin: search shipping rates by carrier
 async def search_shipping_rates_admin(
+    response: Response,
     carrier: str = Query(..., min_length=1, max_length=100, description="Carrier substring"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
     rates = (
-        db.query(ShippingRate)
-        .filter(ShippingRate.carrier.ilike(f"%{carrier}%"))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(ShippingRate)
+                .where(ShippingRate.carrier.ilike(f"%{carrier}%")),
+                ShippingRate.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, rates, limit)
     return rates
 
 
@@ -230,31 +251,25 @@ async def find_shipping_rates_admin(
     carrier: Optional[str] = Query(None, description="Optional: filter by carrier substring"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    zone = await db.get(ShippingZone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
 
-    query = db.query(ShippingRate).filter(
-        ShippingRate.shipping_zone_id == zone_id,
-        ShippingRate.weight_min <= weight,
-        ShippingRate.weight_max >= weight,
-    )
-    if carrier:
-        query = query.filter(ShippingRate.carrier.ilike(f"%{carrier}%"))
-
-    rates = query.offset(skip).limit(limit).all()
-    return rates
+    # Served from the in-memory matrix, cheapest first
+    matrix = await db.run_sync(shipping_rate_matrix.get)
+    rates = matrix.options(zone_id, weight, carrier=carrier)
+    return rates[skip:skip + limit]
 
 
 @router.get("/{rate_id}", response_model=ShippingRateResponse)
 # Admin: get shipping rate detail
 async def get_shipping_rate_admin(
     rate_id: int = Path(..., gt=0, description="Shipping rate ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    rate = db.query(ShippingRate).filter(ShippingRate.id == rate_id).first()
+    rate = await db.get(ShippingRate, rate_id)
     if not rate:
         raise HTTPException(status_code=404, detail=f"Shipping rate with ID {rate_id} not found")
     return rate
@@ -265,14 +280,14 @@ async def get_shipping_rate_admin(
 async def update_shipping_rate_admin(
     rate_id: int = Path(..., gt=0, description="Shipping rate ID"),
     rate_update: ShippingRateUpdate = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_rate = db.query(ShippingRate).filter(ShippingRate.id == rate_id).first()
+    db_rate = await db.get(ShippingRate, rate_id)
     if not db_rate:
         raise HTTPException(status_code=404, detail=f"Shipping rate with ID {rate_id} not found")
 
     if rate_update.shipping_zone_id and rate_update.shipping_zone_id != db_rate.shipping_zone_id:
-        zone = db.query(ShippingZone).filter(ShippingZone.id == rate_update.shipping_zone_id).first()
+        zone = await db.get(ShippingZone, rate_update.shipping_zone_id)
         if not zone:
             raise HTTPException(status_code=404, detail=f"Shipping zone with ID {rate_update.shipping_zone_id} not found")
 
@@ -285,8 +300,9 @@ async def update_shipping_rate_admin(
     for key, value in update_data.items():
         setattr(db_rate, key, value)
 
-    db.commit()
-    db.refresh(db_rate)
+    await db.commit()
+    await db.run_sync(shipping_rate_matrix.rebuild)
+    await db.refresh(db_rate)
     return db_rate
 
 
@@ -294,10 +310,11 @@ async def update_shipping_rate_admin(
 # Admin: delete shipping rate
 async def delete_shipping_rate_admin(
     rate_id: int = Path(..., gt=0, description="Shipping rate ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_rate = db.query(ShippingRate).filter(ShippingRate.id == rate_id).first()
+    db_rate = await db.get(ShippingRate, rate_id)
     if not db_rate:
         raise HTTPException(status_code=404, detail=f"Shipping rate with ID {rate_id} not found")
-    db.delete(db_rate)
-    db.commit()
+    await db.delete(db_rate)
+    await db.commit()
+    await db.run_sync(shipping_rate_matrix.rebuild)
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.shipping_rates.shipping_rates_model import ShippingRate
+
+
+# Safety net for other worker processes, which never see our rebuilds
+SHIPPING_RATE_MATRIX_TTL = float(os.getenv("shipping_rate_matrix_ttl", "300"))
+
+
+class CompiledShippingRate(NamedTuple):
+    id: int
+    shipping_zone_id: int
+    warehouse_region: str
+    weight_min: float
+    weight_max: float
+    price_pln: Decimal
+    carrier: str
+    service_level: str
+
+    def matches(self, carrier: Optional[str], service_level: Optional[str]) -> bool:
+        # carrier is a case-insensitive substring like the admin search,
+        # service_level a case-insensitive exact match
+        if carrier and carrier.lower() not in self.carrier.lower():
+            return False
+        if service_level and service_level.lower() != self.service_level.lower():
+            return False
+        return True
+
+
+class _WeightBrackets:
+    # Same slot layout as the pricing rule index: slot 2i+1 is exactly
+    # points[i], slot 2i the open gap below it. Each slot keeps the rates of
+    # every carrier/service level covering it, cheapest first.
+
+    def __init__(self, rates: List[CompiledShippingRate]):
+        self.points: List[float] = sorted({r.weight_min for r in rates} | {r.weight_max for r in rates})
+        self.slots: List[List[CompiledShippingRate]] = [[] for _ in range(2 * len(self.points) + 1)]
+        for r in sorted(rates, key=lambda r: (r.price_pln, r.id)):
+            first = 2 * bisect_left(self.points, r.weight_min) + 1
+            last = 2 * bisect_left(self.points, r.weight_max) + 1
+            for slot in range(first, last + 1):
+                self.slots[slot].append(r)
+
+    def candidates(self, weight: float) -> List[CompiledShippingRate]:
+        i = bisect_left(self.points, weight)
+        if i < len(self.points) and self.points[i] == weight:
+            return self.slots[2 * i + 1]
+        return self.slots[2 * i]
+
+
+class ShippingRateMatrix:
+    """Shipping rates compiled per (shipping_zone_id, warehouse_region).
+
+    Weight brackets (weight_min <= weight <= weight_max) are resolved by
+    binary search; options for a weight come back cheapest first.
+    """
+
+    def __init__(self, rates: Iterable[CompiledShippingRate]):
+        by_key: Dict[Tuple[int, str], List[CompiledShippingRate]] = {}
+        for r in rates:
+            by_key.setdefault((r.shipping_zone_id, r.warehouse_region), []).append(r)
+        self._brackets = {key: _WeightBrackets(rs) for key, rs in by_key.items()}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[ShippingRate]) -> "ShippingRateMatrix":
+        return cls(
+            CompiledShippingRate(
+                id=r.id,
+                shipping_zone_id=r.shipping_zone_id,
+                warehouse_region=r.warehouse_region,
+                weight_min=float(r.weight_min),
+                weight_max=float(r.weight_max),
+                price_pln=Decimal(str(r.price_pln)),
+                carrier=r.carrier,
+                service_level=r.service_level,
+            )
+            for r in rows
+        )
+
+    def options(
+        self,
+        zone_id: int,
+        weight: float,
+        warehouse_region: Optional[str] = None,
+        carrier: Optional[str] = None,
+        service_level: Optional[str] = None,
+    ) -> List[CompiledShippingRate]:
+        # Without warehouse_region every region of the zone is searched
+        if warehouse_region is not None:
+            brackets = [self._brackets.get((zone_id, warehouse_region))]
+        else:
+            brackets = [b for (zone, _), b in self._brackets.items() if zone == zone_id]
+
+        found = [
+            r
+            for b in brackets
+            if b is not None
+            for r in b.candidates(weight)
+            if r.matches(carrier, service_level)
+        ]
+        if len(brackets) > 1:
+            found.sort(key=lambda r: (r.price_pln, r.id))
+        return found
+
+    def cheapest(
+        self,
+        zone_id: int,
+        warehouse_region: str,
+        weight: float,
+        carrier: Optional[str] = None,
+        service_level: Optional[str] = None,
+    ) -> Optional[CompiledShippingRate]:
+        options = self.options(zone_id, weight, warehouse_region, carrier, service_level)
+        return options[0] if options else None
+
+
+class ShippingRateMatrixCache:
+    """Holds the current ShippingRateMatrix for the process.
+
+    Shipping rate and zone admin routes call `rebuild` after committing; the
+    new matrix is swapped in with a single assignment.
+    """
+
+    def __init__(self, ttl: float = SHIPPING_RATE_MATRIX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._matrix: Optional[ShippingRateMatrix] = None
+        self._built_at = 0.0
+
+    def rebuild(self, db: Session) -> ShippingRateMatrix:
+        matrix = ShippingRateMatrix.from_rows(db.query(ShippingRate).all())
+        with self._lock:
+            self._matrix = matrix
+            self._built_at = time.monotonic()
+        return matrix
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._matrix = None
+
+    def get(self, db: Session) -> ShippingRateMatrix:
+        matrix = self._matrix
+        if matrix is None or time.monotonic() - self._built_at > self.ttl:
+            matrix = self.rebuild(db)
+        return matrix
+
+
+shipping_rate_matrix = ShippingRateMatrixCache()
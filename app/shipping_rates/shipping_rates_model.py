@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Double
+from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, Double, Index
 from app.db_base import Base
 from sqlalchemy.orm import relationship
 
 class ShippingRate(Base):
     __tablename__ = 'shipping_rates'
+    __table_args__ = (
+        Index('ix_shipping_rates_zone_region_weight', 'shipping_zone_id', 'warehouse_region', 'weight_min', 'weight_max'),
+    )
 
     id = Column(Integer, primary_key=True)
     shipping_zone_id = Column(Integer, ForeignKey('shipping_zones.id'), nullable=False)
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import List, Optional
 
 from app.shipping_zones.shipping_zones_schema import (
     ShippingZoneCreate,
     ShippingZoneUpdate,
     ShippingZoneResponse,
+    ShippingZoneCountryResponse,
+    ShippingZoneCountryAssign,
+    ShippingZoneCountriesAssign,
 )
-from app.shipping_zones.shipping_zones_model import ShippingZone
+from app.shipping_zones.shipping_zones_model import ShippingZone, ShippingZoneCountry
+from app.shipping_zones.shipping_zones_resolver import country_zone_resolver
+from app.shipping_zones.iso_countries import ISO_COUNTRIES, normalize_country
 from app.shipping_rates.shipping_rates_model import ShippingRate
+from app.shipping_rates.shipping_rates_matrix import shipping_rate_matrix
+from app.statistics_cache import statistics_cache
 from app.warehouses.warehouses_model import Warehouse
-from db_routers_connection import get_db
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from db_routers_connection import get_async_db
 
 router = APIRouter(prefix="/api/shippingzones/admin", tags=["shipping-zones-admin"])
 
@@ -18,70 +29,164 @@ router = APIRouter(prefix="/api/shippingzones/admin", tags=["shipping-zones-admi
 @router.get("/", response_model=List[ShippingZoneResponse])
 # Admin: list shipping zones
 async def list_shipping_zones_admin(
+    response: Response,
     skip: int = Query(0, ge=0, description="Pagination: skip N results"),
     limit: int = Query(50, ge=1, le=500, description="Pagination: max results (default 50, max 500)"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    zones = db.query(ShippingZone).offset(skip).limit(limit).all()
+    zones = (await db.scalars(paginate(select(ShippingZone), ShippingZone.id, cursor, skip, limit))).all()
+    set_next_cursor(response, zones, limit)
     return zones
 
 
 @router.get("/search", response_model=List[ShippingZoneResponse])
 # Admin: search shipping zones by name
 async def search_shipping_zones_admin(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=100, description="Zone name substring"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
     zones = (
-        db.query(ShippingZone)
-        .filter(ShippingZone.name.ilike(f"%{name}%"))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(ShippingZone)
+                .where(ShippingZone.name.ilike(f"%{name}%")),
+                ShippingZone.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, zones, limit)
     return zones
 
 
 @router.get("/statistics", response_model=dict)
 # Admin: shipping zones global statistics
-async def get_shipping_zones_statistics_admin(db: Session = Depends(get_db)):
-    total_zones = db.query(ShippingZone).count()
-    
-    total_rates = db.query(ShippingRate).count()
-    
-    total_warehouses = db.query(Warehouse).count()
-    
-    zones_with_rates = db.query(ShippingZone).join(
-        ShippingRate, ShippingZone.id == ShippingRate.shipping_zone_id
-    ).count()
-    
-    zones_with_warehouses = db.query(ShippingZone).join(
-        Warehouse, ShippingZone.id == Warehouse.shipping_zone_id
-    ).count()
-    
-    zones_without_rates = total_zones - zones_with_rates
-    zones_without_warehouses = total_zones - zones_with_warehouses
+async def get_shipping_zones_statistics_admin(db: AsyncSession = Depends(get_async_db)):
+    return await statistics_cache.cached_async("shipping_zones", lambda: _shipping_zones_statistics(db))
+
+
+async def _shipping_zones_statistics(db: AsyncSession) -> dict:
+    # EXISTS per zone rather than joins, which counted one row per rate/warehouse
+    has_rates = select(ShippingRate.id).where(ShippingRate.shipping_zone_id == ShippingZone.id).exists()
+    has_warehouses = select(Warehouse.id).where(Warehouse.shipping_zone_id == ShippingZone.id).exists()
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_zones"),
+                func.count().filter(has_rates).label("zones_with_rates"),
+                func.count().filter(has_warehouses).label("zones_with_warehouses"),
+                select(func.count()).select_from(ShippingRate).scalar_subquery().label("total_rates"),
+                select(func.count()).select_from(Warehouse).scalar_subquery().label("total_warehouses"),
+            ).select_from(ShippingZone)
+        )
+    ).one()
     
     return {
-        "total_zones": total_zones,
-        "total_shipping_rates_in_system": total_rates,
-        "total_warehouses_in_system": total_warehouses,
-        "zones_with_shipping_rates": zones_with_rates,
-        "zones_without_shipping_rates": zones_without_rates,
-        "zones_with_warehouses": zones_with_warehouses,
-        "zones_without_warehouses": zones_without_warehouses
+        "total_zones": s.total_zones,
+        "total_shipping_rates_in_system": s.total_rates,
+        "total_warehouses_in_system": s.total_warehouses,
+        "zones_with_shipping_rates": s.zones_with_rates,
+        "zones_without_shipping_rates": s.total_zones - s.zones_with_rates,
+        "zones_with_warehouses": s.zones_with_warehouses,
+        "zones_without_warehouses": s.total_zones - s.zones_with_warehouses
     }
 
 
+def _country_response(mapping: ShippingZoneCountry) -> ShippingZoneCountryResponse:
+    code = mapping.country_code.strip()
+    return ShippingZoneCountryResponse(
+        country_code=code,
+        country_name=ISO_COUNTRIES[code][1] if code in ISO_COUNTRIES else None,
+        shipping_zone_id=mapping.shipping_zone_id,
+    )
+
+
+async def _assign_countries(db: AsyncSession, zone_id: int, codes: List[str]) -> None:
+    stmt = pg_insert(ShippingZoneCountry.__table__).values(
+        [{"country_code": code, "shipping_zone_id": zone_id} for code in codes]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["country_code"],
+            set_={"shipping_zone_id": stmt.excluded.shipping_zone_id},
+        )
+    )
+
+
+@router.get("/countries", response_model=List[ShippingZoneCountryResponse])
+# Admin: list country -> shipping zone mappings
+async def list_zone_countries_admin(
+    zone_id: Optional[int] = Query(None, gt=0, description="Optional: only countries of this zone"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    query = select(ShippingZoneCountry)
+    if zone_id:
+        query = query.where(ShippingZoneCountry.shipping_zone_id == zone_id)
+    mappings = await db.scalars(query.order_by(ShippingZoneCountry.country_code))
+    return [_country_response(m) for m in mappings]
+
+
+@router.get("/countries/resolve", response_model=dict)
+# Admin: resolve a country code, name or alias to its shipping zone
+async def resolve_zone_country_admin(
+    country: str = Query(..., min_length=2, max_length=100, description="Country code, name or alias"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    code = normalize_country(country)
+    if code is None:
+        raise HTTPException(status_code=404, detail=f"Unknown country '{country}'")
+    zone_id = await db.run_sync(country_zone_resolver.resolve, code)
+    return {"country": country, "country_code": code, "shipping_zone_id": zone_id}
+
+
+@router.put("/countries/{country}", response_model=ShippingZoneCountryResponse)
+# Admin: map a country to a shipping zone
+async def assign_zone_country_admin(
+    country: str = Path(..., min_length=2, max_length=100, description="Country code, name or alias"),
+    assignment: ShippingZoneCountryAssign = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    code = normalize_country(country)
+    if code is None:
+        raise HTTPException(status_code=422, detail=f"Unknown country '{country}'")
+
+    zone = await db.get(ShippingZone, assignment.shipping_zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail=f"Shipping zone with ID {assignment.shipping_zone_id} not found")
+
+    await _assign_countries(db, zone.id, [code])
+    await db.commit()
+    await db.run_sync(country_zone_resolver.reload)
+
+    return _country_response(await db.scalar(select(ShippingZoneCountry).where(ShippingZoneCountry.country_code == code).limit(1)))
+
+
+@router.delete("/countries/{country}", status_code=204)
+# Admin: remove a country mapping
+async def delete_zone_country_admin(
+    country: str = Path(..., min_length=2, max_length=100, description="Country code, name or alias"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    code = normalize_country(country)
+    mapping = await db.scalar(select(ShippingZoneCountry).where(ShippingZoneCountry.country_code == code).limit(1)) if code else None
+    if not mapping:
+        raise HTTPException(status_code=404, detail=f"No shipping zone mapping for country '{country}'")
+    await db.delete(mapping)
+    await db.commit()
+    await db.run_sync(country_zone_resolver.reload)
+
+
 @router.get("/{zone_id}", response_model=ShippingZoneResponse)
 # Admin: get shipping zone detail
 async def get_shipping_zone_admin(
     zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    zone = await db.get(ShippingZone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
     return zone
@@ -91,30 +196,50 @@ async def get_shipping_zone_admin(
 # Admin: shipping zone statistics
 async def get_shipping_zone_statistics_admin(
     zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    return await statistics_cache.cached_async(
+        f"shipping_zones:{zone_id}", lambda: _shipping_zone_statistics(db, zone_id)
+    )
+
+
+async def _shipping_zone_statistics(db: AsyncSession, zone_id: int) -> dict:
+    zone = (
+        await db.execute(
+            select(
+                ShippingZone.id,
+                ShippingZone.name,
+                select(func.count())
+                .select_from(ShippingRate)
+                .where(ShippingRate.shipping_zone_id == ShippingZone.id)
+                .scalar_subquery()
+                .label("rates_count"),
+                select(func.count())
+                .select_from(Warehouse)
+                .where(Warehouse.shipping_zone_id == ShippingZone.id)
+                .scalar_subquery()
+                .label("warehouses_count"),
+            ).where(ShippingZone.id == zone_id)
+        )
+    ).first()
     if not zone:
         raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
 
-    shipping_rates_count = db.query(ShippingRate).filter(ShippingRate.shipping_zone_id == zone_id).count()
-    warehouses_count = db.query(Warehouse).filter(Warehouse.shipping_zone_id == zone_id).count()
-
     return {
         "zone_id": zone.id,
         "zone_name": zone.name,
-        "total_shipping_rates": shipping_rates_count,
-        "total_warehouses": warehouses_count,
-        "total_related_entities": shipping_rates_count + warehouses_count,
+        "total_shipping_rates": zone.rates_count,
+        "total_warehouses": zone.warehouses_count,
+        "total_related_entities": zone.rates_count + zone.warehouses_count,
     }
 
 
 @router.post("/", response_model=ShippingZoneResponse, status_code=201)
 # Admin: create shipping zone
-async def create_shipping_zone_admin(zone: ShippingZoneCreate, db: Session = Depends(get_db)):
-    existing = db.query(ShippingZone).filter(
+async def create_shipping_zone_admin(zone: ShippingZoneCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(ShippingZone).where(
         ShippingZone.name == zone.name
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(
@@ -124,8 +249,9 @@ async def create_shipping_zone_admin(zone: ShippingZoneCreate, db: Session = Dep
     
     db_zone = ShippingZone(**zone.dict())
     db.add(db_zone)
-    db.commit()
-    db.refresh(db_zone)
+    await db.commit()
+    await db.run_sync(country_zone_resolver.reload)
+    await db.refresh(db_zone)
     
     return db_zone
 
@@ -135,9 +261,9 @@ async def create_shipping_zone_admin(zone: ShippingZoneCreate, db: Session = Dep
 async def update_shipping_zone_admin(
     zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
     zone_update: ShippingZoneUpdate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    db_zone = await db.get(ShippingZone, zone_id)
     
     if not db_zone:
         raise HTTPException(
@@ -146,10 +272,10 @@ async def update_shipping_zone_admin(
         )
     
     if zone_update.name and zone_update.name != db_zone.name:
-        existing = db.query(ShippingZone).filter(
+        existing = await db.scalar(select(ShippingZone).where(
             ShippingZone.name == zone_update.name,
             ShippingZone.id != zone_id
-        ).first()
+        ).limit(1))
         if existing:
             raise HTTPException(
                 status_code=409,
@@ -160,8 +286,9 @@ async def update_shipping_zone_admin(
     for key, value in update_data.items():
         setattr(db_zone, key, value)
     
-    db.commit()
-    db.refresh(db_zone)
+    await db.commit()
+    await db.run_sync(country_zone_resolver.reload)
+    await db.refresh(db_zone)
     
     return db_zone
 
@@ -171,9 +298,9 @@ async def update_shipping_zone_admin(
 async def delete_shipping_zone_admin(
     zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
     force: bool = Query(False, description="Force delete even if rates/warehouses exist"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    db_zone = await db.get(ShippingZone, zone_id)
     
     if not db_zone:
         raise HTTPException(
@@ -181,13 +308,13 @@ async def delete_shipping_zone_admin(
             detail=f"Shipping zone with ID {zone_id} not found"
         )
     
-    rates_count = db.query(ShippingRate).filter(
+    rates_count = await db.scalar(select(func.count()).select_from(ShippingRate).where(
         ShippingRate.shipping_zone_id == zone_id
-    ).count()
+    ))
     
-    warehouses_count = db.query(Warehouse).filter(
+    warehouses_count = await db.scalar(select(func.count()).select_from(Warehouse).where(
         Warehouse.shipping_zone_id == zone_id
-    ).count()
+    ))
     
     total_refs = rates_count + warehouses_count
     
@@ -197,46 +324,35 @@ async def delete_shipping_zone_admin(
             detail=f"Cannot delete shipping zone: has {rates_count} shipping rates and {warehouses_count} warehouses. Use force=true to delete anyway."
         )
     
-    db.delete(db_zone)
-    db.commit()
+    await db.delete(db_zone)
+    await db.commit()
+    await db.run_sync(shipping_rate_matrix.rebuild)
+    await db.run_sync(country_zone_resolver.reload)
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create shipping zones
 async def bulk_create_shipping_zones_admin(
     zones_data: List[ShippingZoneCreate],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     created = 0
-    failed = 0
-    errors = []
-    zones_to_insert = []
-
-    for idx, zone_data in enumerate(zones_data):
-        try:
-            existing = db.query(ShippingZone).filter(
-                ShippingZone.name == zone_data.name
-            ).first()
-            if existing:
-                errors.append(f"Row {idx + 1}: Zone name '{zone_data.name}' already exists (ID: {existing.id})")
-                failed += 1
-                continue
-            
-            zones_to_insert.append(ShippingZone(**zone_data.dict()))
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
+    check = await BulkValidation(zones_data).unique(
+        (ShippingZone.name,), lambda z, id: f"Zone name '{z.name}' already exists (ID: {id})"
+    ).run_async(db)
+    zones_to_insert = [ShippingZone(**zone_data.dict()) for zone_data in check.valid]
 
     if zones_to_insert:
         db.add_all(zones_to_insert)
-        db.commit()
+        await db.commit()
+        await db.run_sync(country_zone_resolver.reload)
         created = len(zones_to_insert)
 
     return {
         "created": created,
-        "failed": failed,
+        "failed": check.failed,
         "total": len(zones_data),
-        "errors": errors if errors else None
+        "errors": check.errors if check.errors else None
     }
 
 
@@ -245,47 +361,43 @@ async def bulk_create_shipping_zones_admin(
 async def bulk_delete_shipping_zones_admin(
     zone_ids: List[int] = Query(..., description="List of shipping zone IDs to delete"),
     force: bool = Query(False, description="Force delete even if rates/warehouses exist"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    deleted = 0
-    failed = 0
-    errors = []
-
-    for zone_id in zone_ids:
-        try:
-            db_zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
-            
-            if not db_zone:
-                errors.append(f"ID {zone_id}: Shipping zone not found")
-                failed += 1
-                continue
-            
-            rates_count = db.query(ShippingRate).filter(
-                ShippingRate.shipping_zone_id == zone_id
-            ).count()
-            
-            warehouses_count = db.query(Warehouse).filter(
-                Warehouse.shipping_zone_id == zone_id
-            ).count()
-            
-            total_refs = rates_count + warehouses_count
-            
-            if total_refs > 0 and not force:
-                errors.append(f"ID {zone_id}: Has {rates_count} rates and {warehouses_count} warehouses. Set force=true to delete")
-                failed += 1
-                continue
-            
-            db.delete(db_zone)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {zone_id}: {str(e)}")
-            failed += 1
-
-    db.commit()
 
+    # One grouped dependency check for the whole list
+    rates_count = select(func.count()).where(ShippingRate.shipping_zone_id == ShippingZone.id).scalar_subquery()
+    warehouses_count = select(func.count()).where(Warehouse.shipping_zone_id == ShippingZone.id).scalar_subquery()
+    found = (
+        await db.execute(select(ShippingZone.id, rates_count, warehouses_count).where(any_id(ShippingZone.id, zone_ids)))
+    ).all()
+    blocked = {
+        zone_id: f"ID {zone_id}: Has {rates} rates and {warehouses} warehouses. Set force=true to delete"
+        for zone_id, rates, warehouses in found
+        if rates + warehouses > 0 and not force
+    }
+    to_delete = [zone_id for zone_id, _, _ in found if zone_id not in blocked]
+
+    deleted_ids = []
+    if to_delete:
+        deleted_ids = (
+            await db.scalars(
+                delete(ShippingZone)
+                .where(any_id(ShippingZone.id, to_delete))
+                .returning(ShippingZone.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+
+    await db.commit()
+    await db.run_sync(shipping_rate_matrix.rebuild)
+    await db.run_sync(country_zone_resolver.reload)
+
+    deleted, errors = delete_report(
+        zone_ids, deleted_ids, lambda zone_id: f"ID {zone_id}: Shipping zone not found", blocked
+    )
     return {
         "deleted": deleted,
-        "failed": failed,
+        "failed": len(errors),
         "total": len(zone_ids),
         "errors": errors if errors else None
     }
@@ -294,22 +406,27 @@ async def bulk_delete_shipping_zones_admin(
 @router.get("/{zone_id}/warehouses", response_model=list)
 # Admin: list warehouses for zone
 async def get_zone_warehouses_admin(
+    response: Response,
     zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == zone_id).first()
+    zone = await db.get(ShippingZone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
 
     warehouses = (
-        db.query(Warehouse)
-        .filter(Warehouse.shipping_zone_id == zone_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(Warehouse)
+                .where(Warehouse.shipping_zone_id == zone_id),
+                Warehouse.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, warehouses, limit)
     return [
         {
             "id": warehouse.id,
@@ -321,3 +438,57 @@ async def get_zone_warehouses_admin(
         }
         for warehouse in warehouses
     ]
+
+
+@router.get("/{zone_id}/countries", response_model=List[ShippingZoneCountryResponse])
+# Admin: list countries mapped to zone
+async def get_zone_countries_admin(
+    zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    zone = await db.get(ShippingZone, zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
+
+    mappings = (
+        await db.scalars(
+            select(ShippingZoneCountry)
+            .where(ShippingZoneCountry.shipping_zone_id == zone_id)
+            .order_by(ShippingZoneCountry.country_code)
+        )
+    ).all()
+    return [_country_response(m) for m in mappings]
+
+
+@router.post("/{zone_id}/countries", response_model=dict)
+# Admin: bulk map countries to zone
+async def assign_zone_countries_admin(
+    zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
+    payload: ShippingZoneCountriesAssign = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    zone = await db.get(ShippingZone, zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail=f"Shipping zone with ID {zone_id} not found")
+
+    codes = []
+    errors: List[str] = []
+    for idx, country in enumerate(payload.countries, 1):
+        code = normalize_country(country)
+        if code is None:
+            errors.append(f"Row {idx}: Unknown country '{country}'")
+            continue
+        if code not in codes:
+            codes.append(code)
+
+    if codes:
+        await _assign_countries(db, zone_id, codes)
+        await db.commit()
+        await db.run_sync(country_zone_resolver.reload)
+
+    return {
+        "assigned": len(codes),
+        "failed": len(errors),
+        "total": len(payload.countries),
+        "errors": errors or None,
+    }
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy.dialects.postgresql import CHAR
 from sqlalchemy.orm import relationship
 from app.db_base import Base
 
@@ -10,3 +11,14 @@ class ShippingZone(Base):
     name = Column(String, nullable=False, unique=True)
 
     shipping_rates = relationship('app.shipping_rates.shipping_rates_model.ShippingRate', back_populates='shipping_zone')
+    countries = relationship('app.shipping_zones.shipping_zones_model.ShippingZoneCountry', back_populates='shipping_zone', passive_deletes=True)
+
+
+class ShippingZoneCountry(Base):
+    __tablename__ = 'shipping_zone_countries'
+
+    # ISO 3166-1 alpha-2
+    country_code = Column(CHAR(2), primary_key=True)
+    shipping_zone_id = Column(Integer, ForeignKey('shipping_zones.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    shipping_zone = relationship('app.shipping_zones.shipping_zones_model.ShippingZone', back_populates='countries')
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.shipping_zones.iso_countries import normalize_country
+from app.shipping_zones.shipping_zones_model import ShippingZone, ShippingZoneCountry
+
+
+# Safety net for other worker processes, which never see our reloads
+COUNTRY_ZONE_RESOLVER_TTL = float(os.getenv("country_zone_resolver_ttl", "300"))
+
+# Zone used for valid countries that have no mapping row
+DEFAULT_ZONE_NAME = "Rest of World"
+
+
+class CountryZoneResolver:
+    """Process-wide copy of shipping_zone_countries.
+
+    Input is normalized to an ISO alpha-2 code (codes, alpha-3, names and
+    aliases are accepted), then the zone is a dictionary lookup. Loaded at
+    startup and reloaded by the shipping zone admin routes after writes.
+    """
+
+    def __init__(self, ttl: float = COUNTRY_ZONE_RESOLVER_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._zones: Optional[Dict[str, int]] = None
+        self._default_zone_id: Optional[int] = None
+        self._loaded_at = 0.0
+
+    def reload(self, db: Session) -> None:
+        zones = {code.strip(): zone_id for code, zone_id in db.query(
+            ShippingZoneCountry.country_code, ShippingZoneCountry.shipping_zone_id
+        ).all()}
+        default_zone_id = db.query(ShippingZone.id).filter(ShippingZone.name == DEFAULT_ZONE_NAME).scalar()
+        with self._lock:
+            self._zones = zones
+            self._default_zone_id = default_zone_id
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._zones = None
+
+    def _snapshot(self, db: Session) -> Dict[str, int]:
+        zones = self._zones
+        if zones is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.reload(db)
+            zones = self._zones
+        return zones
+
+    def resolve(self, db: Session, country: str) -> Optional[int]:
+        # None for input that is not a country at all
+        code = normalize_country(country)
+        if code is None:
+            return None
+        zone_id = self._snapshot(db).get(code)
+        return zone_id if zone_id is not None else self._default_zone_id
+
+
+country_zone_resolver = CountryZoneResolver()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class BaseConfig:
     from_attributes = True
@@ -16,3 +16,17 @@ class ShippingZoneCreate(BaseModel):
 
 class ShippingZoneUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=200)
+
+class ShippingZoneCountryResponse(BaseModel):
+    country_code: str
+    country_name: Optional[str] = None
+    shipping_zone_id: int
+
+    class Config:
+        from_attributes = True
+
+class ShippingZoneCountryAssign(BaseModel):
+    shipping_zone_id: int = Field(gt=0)
+
+class ShippingZoneCountriesAssign(BaseModel):
+    countries: List[str] = Field(min_length=1, description="ISO codes, names or aliases")
@@ -0,0 +1,168 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Statements of the same shape allowed per request before it is reported as
+# an N+1 pattern; 0 turns the detector off
+SQL_REPEAT_THRESHOLD = int(os.getenv("sql_repeat_threshold", "10"))
+# "log" writes a warning, "raise" fails the request (meant for tests and CI)
+SQL_REPEAT_ACTION = os.getenv("sql_repeat_action", "log").lower()
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class RepeatedQueryError(RuntimeError):
+    pass
+
+
+_IN_LIST = re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    # Expanding IN parameters render one placeholder per value, so the same
+    # query with a different list length would otherwise count as a new shape
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Queries issued while one request (or one track_queries block) runs."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        if threshold <= 0:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_time * 1000:.1f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_time * 1000:.1f}"
+        )
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collects the queries run inside the block, including sync work done
+    through run_sync or the threadpool, which inherit the context."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def check_repeats(stats: QueryStats, label: str) -> None:
+    repeated = stats.repeated()
+    if not repeated:
+        return
+    shape, n = repeated[0]
+    message = f"{label}: statement ran {n} times (threshold {SQL_REPEAT_THRESHOLD}): {shape[:300]}"
+    if SQL_REPEAT_ACTION == "raise":
+        raise RepeatedQueryError(message)
+    logger.warning("Repeated query in %s", message)
+
+
+class SqlMetrics:
+    """Per-route totals of the request stats, served by /metrics/sql."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, dict] = {}
+
+    def add(self, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            m = self._routes.setdefault(
+                route,
+                {"requests": 0, "queries": 0, "db_time_ms": 0.0, "max_queries": 0,
+                 "slowest_ms": 0.0, "slowest_statement": None, "repeated_requests": 0},
+            )
+            m["requests"] += 1
+            m["queries"] += stats.count
+            m["db_time_ms"] += stats.total_time * 1000
+            m["max_queries"] = max(m["max_queries"], stats.count)
+            if stats.slowest_time * 1000 > m["slowest_ms"]:
+                m["slowest_ms"] = stats.slowest_time * 1000
+                m["slowest_statement"] = stats.slowest_statement
+            if stats.repeated():
+                m["repeated_requests"] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            routes = {route: dict(m) for route, m in self._routes.items()}
+        for m in routes.values():
+            m["avg_queries"] = round(m["queries"] / m["requests"], 2)
+            m["avg_db_time_ms"] = round(m["db_time_ms"] / m["requests"], 2)
+            m["db_time_ms"] = round(m["db_time_ms"], 2)
+            m["slowest_ms"] = round(m["slowest_ms"], 2)
+        return routes
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+sql_metrics = SqlMetrics()
+
+
+async def sql_instrumentation_middleware(request, call_next):
+    with track_queries() as stats:
+        response = await call_next(request)
+    # The router stores the matched route in the shared scope; unmatched URLs
+    # share one label so scanners cannot grow the metrics without bound
+    route = request.scope.get("route")
+    label = f"{request.method} {route.path if route is not None else '<unmatched>'}"
+    sql_metrics.add(label, stats)
+    response.headers["Server-Timing"] = stats.server_timing()
+    check_repeats(stats, label)
+    return response
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+# How long a statistics response is served from memory; 0 disables caching
+STATISTICS_CACHE_TTL = float(os.getenv("statistics_cache_ttl", "30"))
+
+
+class StatisticsCache:
+    """Process-wide copy of recently computed statistics responses.
+
+    The statistics endpoints aggregate whole tables and admin dashboards poll
+    them every few seconds, so a result is reused until it is `ttl` seconds
+    old. Each worker process keeps its own copy.
+    """
+
+    def __init__(self, ttl: float = STATISTICS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, dict]] = {}
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key: str, value: dict) -> dict:
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self, prefix: str = "") -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def cached(self, key: str, compute: Callable[[], dict]) -> dict:
+        value = self.get(key)
+        return value if value is not None else self.put(key, compute())
+
+    async def cached_async(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        value = self.get(key)
+        return value if value is not None else self.put(key, await compute())
+
+
+statistics_cache = StatisticsCache()
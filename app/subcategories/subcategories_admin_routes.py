@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
 from sqlalchemy.orm import Session, sessionmaker
-from typing import List
+from sqlalchemy import delete, func, select
+from typing import List, Optional
 
 from app.subcategories.subcategories_schema import (
     SubcategoryCreate,
@@ -10,6 +11,9 @@ from app.subcategories.subcategories_schema import (
 from app.subcategories.subcategories_model import Subcategory
 from app.categories.categories_model import Category
 from app.parts.parts_model import Part
+from app.statistics_cache import statistics_cache
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
 from db_routers_connection import get_db
 
 router = APIRouter(prefix="/api/subcategories/admin", tags=["subcategories-admin"])
@@ -17,18 +21,21 @@ router = APIRouter(prefix="/api/subcategories/admin", tags=["subcategories-admin
 
 @router.get("/all", response_model=List[SubcategoryResponse])
 # Admin: list subcategories
-async def list_all_subcategories_admin(
+def list_all_subcategories_admin(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
-    subcategories = db.query(Subcategory).offset(skip).limit(limit).all()
+    subcategories = paginate(db.query(Subcategory), Subcategory.id, cursor, skip, limit).all()
+    set_next_cursor(response, subcategories, limit)
     return subcategories
 
 
 @router.post("/", response_model=SubcategoryResponse, status_code=201)
 # Admin: create subcategory
-async def create_subcategory(
+def create_subcategory(
     subcategory: SubcategoryCreate,
     db: Session = Depends(get_db),
 ):
@@ -68,7 +75,7 @@ async def create_subcategory(
 
 @router.get("/{subcategory_id}", response_model=SubcategoryResponse)
 # Admin: get subcategory detail
-async def get_subcategory_admin(
+def get_subcategory_admin(
     subcategory_id: int = Path(..., gt=0, description="Subcategory ID"),
     db: Session = Depends(get_db),
 ):
@@ -85,7 +92,7 @@ async def get_subcategory_admin(
 
 @router.put("/{subcategory_id}", response_model=SubcategoryResponse)
 # Admin: update subcategory
-async def update_subcategory(
+def update_subcategory(
     subcategory_id: int = Path(..., gt=0, description="Subcategory ID"),
     subcategory_update: SubcategoryUpdate = None,
     db: Session = Depends(get_db),
@@ -135,7 +142,7 @@ async def update_subcategory(
 
 @router.delete("/{subcategory_id}", status_code=204)
 # Admin: delete subcategory
-async def delete_subcategory(
+def delete_subcategory(
     subcategory_id: int = Path(..., gt=0, description="Subcategory ID"),
     force: bool = Query(False, description="Force delete even if parts exist"),
     db: Session = Depends(get_db),
@@ -162,96 +169,68 @@ async def delete_subcategory(
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create subcategories
-async def bulk_create_subcategories(
+def bulk_create_subcategories(
     subcategories_data: List[SubcategoryCreate],
     db: Session = Depends(get_db),
 ):
+    check = (
+        BulkValidation(subcategories_data)
+        .exists(Category.id, "parent_id", lambda s: f"Parent category with ID {s.parent_id} not found")
+        .unique(
+            (Subcategory.name, Subcategory.parent_id),
+            lambda s, id: f"Subcategory name '{s.name}' already exists under category ID {s.parent_id}",
+        )
+        .run(db)
+    )
+
     created = 0
-    failed = 0
-    errors = []
-    subcategories_to_insert = []
-
-    for idx, subcategory_data in enumerate(subcategories_data):
-        try:
-            parent = db.query(Category).filter(Category.id == subcategory_data.parent_id).first()
-            if not parent:
-                errors.append(
-                    f"Row {idx + 1}: Parent category with ID {subcategory_data.parent_id} not found"
-                )
-                failed += 1
-                continue
-
-            existing = (
-                db.query(Subcategory)
-                .filter(
-                    Subcategory.name == subcategory_data.name,
-                    Subcategory.parent_id == subcategory_data.parent_id,
-                )
-                .first()
-            )
-            if existing:
-                errors.append(
-                    f"Row {idx + 1}: Subcategory name '{subcategory_data.name}' already exists under category ID {subcategory_data.parent_id}"
-                )
-                failed += 1
-                continue
-
-            subcategories_to_insert.append(Subcategory(**subcategory_data.dict()))
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
-
-    if subcategories_to_insert:
-        db.add_all(subcategories_to_insert)
+    if check.valid:
+        db.add_all([Subcategory(**subcategory_data.dict()) for subcategory_data in check.valid])
         db.commit()
-        created = len(subcategories_to_insert)
+        created = len(check.valid)
 
     return {
         "created": created,
-        "failed": failed,
+        "failed": check.failed,
         "total": len(subcategories_data),
-        "errors": errors if errors else None,
+        "errors": check.errors if check.errors else None,
     }
 
 
 @router.post("/bulk-delete", response_model=dict, status_code=200)
 # Admin: bulk delete subcategories
-async def bulk_delete_subcategories(
+def bulk_delete_subcategories(
     subcategory_ids: List[int] = Query(..., description="List of subcategory IDs to delete"),
     force: bool = Query(False, description="Force delete even if parts exist"),
     db: Session = Depends(get_db),
 ):
-    deleted = 0
-    failed = 0
-    errors = []
-
-    for subcategory_id in subcategory_ids:
-        try:
-            db_subcategory = db.query(Subcategory).filter(Subcategory.id == subcategory_id).first()
-
-            if not db_subcategory:
-                errors.append(f"ID {subcategory_id}: Subcategory not found")
-                failed += 1
-                continue
-
-            parts_count = db.query(Part).filter(Part.subcategory_id == subcategory_id).count()
-
-            if parts_count > 0 and not force:
-                errors.append(f"ID {subcategory_id}: Has {parts_count} parts. Set force=true to delete")
-                failed += 1
-                continue
-
-            db.delete(db_subcategory)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {subcategory_id}: {str(e)}")
-            failed += 1
 
+    # One grouped dependency check for the whole list
+    parts_count = select(func.count()).where(Part.subcategory_id == Subcategory.id).scalar_subquery()
+    found = db.execute(select(Subcategory.id, parts_count).where(any_id(Subcategory.id, subcategory_ids))).all()
+    blocked = {
+        subcategory_id: f"ID {subcategory_id}: Has {count} parts. Set force=true to delete"
+        for subcategory_id, count in found
+        if count > 0 and not force
+    }
+    to_delete = [subcategory_id for subcategory_id, _ in found if subcategory_id not in blocked]
+
+    deleted_ids = []
+    if to_delete:
+        deleted_ids = db.scalars(
+            delete(Subcategory)
+            .where(any_id(Subcategory.id, to_delete))
+            .returning(Subcategory.id)
+            .execution_options(synchronize_session=False)
+        ).all()
     db.commit()
 
+    deleted, errors = delete_report(
+        subcategory_ids, deleted_ids, lambda subcategory_id: f"ID {subcategory_id}: Subcategory not found", blocked
+    )
     return {
         "deleted": deleted,
-        "failed": failed,
+        "failed": len(errors),
         "total": len(subcategory_ids),
         "errors": errors if errors else None,
     }
@@ -259,7 +238,7 @@ async def bulk_delete_subcategories(
 
 @router.put("/{subcategory_id}/move-to-parent", response_model=SubcategoryResponse)
 # Admin: move subcategory to different parent
-async def move_subcategory_to_parent(
+def move_subcategory_to_parent(
     subcategory_id: int = Path(..., gt=0, description="Subcategory ID"),
     new_parent_id: int = Query(..., gt=0, description="New parent category ID"),
     db: Session = Depends(get_db),
@@ -306,23 +285,26 @@ async def move_subcategory_to_parent(
 
 @router.get("/statistics", response_model=dict)
 # Admin: subcategories statistics
-async def get_subcategories_statistics(
+def get_subcategories_statistics(
     db: Session = Depends(get_db),
 ):
-    total = db.query(Subcategory).count()
-
-    total_parts = db.query(Part).count()
+    return statistics_cache.cached("subcategories", lambda: _subcategories_statistics(db))
 
-    categories = db.query(Category).count()
 
-    subcategories_with_parts = db.query(Subcategory).join(
-        Part, Subcategory.id == Part.subcategory_id
-    ).count()
+def _subcategories_statistics(db: Session) -> dict:
+    # EXISTS per subcategory rather than a join, which counted one row per part
+    has_parts = select(Part.id).where(Part.subcategory_id == Subcategory.id).exists()
+    s = db.query(
+        func.count(Subcategory.id).label("total"),
+        func.count(Subcategory.id).filter(has_parts).label("with_parts"),
+        select(func.count()).select_from(Part).scalar_subquery().label("total_parts"),
+        select(func.count()).select_from(Category).scalar_subquery().label("categories"),
+    ).one()
 
     return {
-        "total_subcategories": total,
-        "total_categories": categories,
-        "total_parts": total_parts,
-        "subcategories_with_parts": subcategories_with_parts,
-        "subcategories_without_parts": total - subcategories_with_parts,
+        "total_subcategories": s.total,
+        "total_categories": s.categories,
+        "total_parts": s.total_parts,
+        "subcategories_with_parts": s.with_parts,
+        "subcategories_without_parts": s.total - s.with_parts,
     }
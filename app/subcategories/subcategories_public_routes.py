@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
 from sqlalchemy.orm import Session, sessionmaker
-from typing import List
+from typing import List, Optional
 
 from app.subcategories.subcategories_schema import SubcategoryResponse
 from app.subcategories.subcategories_model import Subcategory
 from app.categories.categories_model import Category
 from app.parts.parts_model import Part
-from db_routers_connection import get_db
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from db_routers_connection import get_read_db
 
 
 router = APIRouter(prefix="/api/subcategories", tags=["subcategories-public"]) 
@@ -14,37 +15,45 @@ router = APIRouter(prefix="/api/subcategories", tags=["subcategories-public"])
 
 @router.get("/", response_model=List[SubcategoryResponse])
 # Public: list subcategories
-async def list_subcategories(
+def list_subcategories(
+    response: Response,
     skip: int = Query(0, ge=0, description="Pagination: skip N results"),
     limit: int = Query(50, ge=1, le=500, description="Pagination: max results (default 50, max 500)"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
-    subcategories = db.query(Subcategory).offset(skip).limit(limit).all()
+    subcategories = paginate(db.query(Subcategory), Subcategory.id, cursor, skip, limit).all()
+    set_next_cursor(response, subcategories, limit)
     return subcategories
 
 
 @router.get("/search", response_model=List[SubcategoryResponse])
 # Public: search subcategories by name
-async def search_subcategories(
+def search_subcategories(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=100, description="Subcategory name to search (substring)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
-    subcategories = db.query(Subcategory).filter(
+    subcategories = paginate(db.query(Subcategory).filter(
         Subcategory.name.ilike(f"%{name}%")
-    ).offset(skip).limit(limit).all()
+    ), Subcategory.id, cursor, skip, limit).all()
     
+    set_next_cursor(response, subcategories, limit)
     return subcategories
 
 
 @router.get("/by-parent/{parent_id}", response_model=List[SubcategoryResponse])
 # Public: list subcategories by parent category
-async def get_subcategories_by_parent(
+def get_subcategories_by_parent(
+    response: Response,
     parent_id: int = Path(..., gt=0, description="Parent category ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
     category = db.query(Category).filter(Category.id == parent_id).first()
     
@@ -54,18 +63,19 @@ async def get_subcategories_by_parent(
             detail=f"Parent category with ID {parent_id} not found"
         )
     
-    subcategories = db.query(Subcategory).filter(
+    subcategories = paginate(db.query(Subcategory).filter(
         Subcategory.parent_id == parent_id
-    ).offset(skip).limit(limit).all()
+    ), Subcategory.id, cursor, skip, limit).all()
     
+    set_next_cursor(response, subcategories, limit)
     return subcategories
 
 
 @router.get("/{subcategory_id}", response_model=SubcategoryResponse)
 # Public: get subcategory detail
-async def get_subcategory(
+def get_subcategory(
     subcategory_id: int = Path(..., gt=0, description="Subcategory ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     subcategory = db.query(Subcategory).filter(Subcategory.id == subcategory_id).first()
     
@@ -80,9 +90,9 @@ async def get_subcategory(
 
 @router.get("/{subcategory_id}/parts-count", response_model=dict)
 # Public: subcategory parts count
-async def get_subcategory_parts_count(
+def get_subcategory_parts_count(
     subcategory_id: int = Path(..., gt=0, description="Subcategory ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     subcategory = db.query(Subcategory).filter(Subcategory.id == subcategory_id).first()
     
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
-from typing import List
+import asyncio
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select, tuple_
+from typing import List, Optional
 
 from app.supplier_price.supplier_price_schema import (
     SupplierPriceCreate,
@@ -9,10 +12,15 @@ from app.supplier_price.supplier_price_schema import (
     SupplierPriceResponse,
 )
 from app.supplier_price.supplier_price_model import SupplierPrice
+from app.supplier_price.supplier_price_import import FEED_FORMATS, IMPORT_WORKERS, FeedError, run_import
 from app.parts.parts_model import Part
 from app.suppliers.suppliers_model import Supplier
 from app.warehouses.warehouses_model import Warehouse
-from db_routers_connection import get_db
+from app.part_price_snapshot.part_price_snapshot_service import mark_parts_dirty, snapshot_refresher
+from app.statistics_cache import statistics_cache
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from db_routers_connection import get_async_db
 
 router = APIRouter(prefix="/api/supplierprice/admin", tags=["supplierprice-admin"])
 
@@ -20,21 +28,38 @@ router = APIRouter(prefix="/api/supplierprice/admin", tags=["supplierprice-admin
 @router.get("/all", response_model=List[SupplierPriceResponse])
 # Admin: list supplier prices
 async def list_all_supplier_prices_admin(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prices = db.query(SupplierPrice).offset(skip).limit(limit).all()
+    prices = (await db.scalars(paginate(select(SupplierPrice), SupplierPrice.id, cursor, skip, limit))).all()
+    set_next_cursor(response, prices, limit)
     return prices
 
 
+async def _feed_key_taken(
+    db: AsyncSession, supplier_id: int, warehouse_id: int, supplier_sku: str, exclude_id: Optional[int] = None
+) -> bool:
+    # (supplier_id, warehouse_id, supplier_sku) is unique, it is the key feed imports upsert on
+    stmt = select(SupplierPrice.id).where(
+        SupplierPrice.supplier_id == supplier_id,
+        SupplierPrice.warehouse_id == warehouse_id,
+        SupplierPrice.supplier_sku == supplier_sku,
+    )
+    if exclude_id is not None:
+        stmt = stmt.where(SupplierPrice.id != exclude_id)
+    return await db.scalar(stmt.exists().select())
+
+
 @router.post("/", response_model=SupplierPriceResponse, status_code=201)
 # Admin: create supplier price
 async def create_supplier_price(
     price: SupplierPriceCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    part = db.query(Part).filter(Part.id == price.part_id).first()
+    part = await db.get(Part, price.part_id)
     
     if not part:
         raise HTTPException(
@@ -42,7 +67,7 @@ async def create_supplier_price(
             detail=f"Part with ID {price.part_id} not found"
         )
     
-    supplier = db.query(Supplier).filter(Supplier.id == price.supplier_id).first()
+    supplier = await db.get(Supplier, price.supplier_id)
     
     if not supplier:
         raise HTTPException(
@@ -50,7 +75,7 @@ async def create_supplier_price(
             detail=f"Supplier with ID {price.supplier_id} not found"
         )
     
-    warehouse = db.query(Warehouse).filter(Warehouse.id == price.warehouse_id).first()
+    warehouse = await db.get(Warehouse, price.warehouse_id)
     
     if not warehouse:
         raise HTTPException(
@@ -58,10 +83,19 @@ async def create_supplier_price(
             detail=f"Warehouse with ID {price.warehouse_id} not found"
         )
     
+    if await _feed_key_taken(db, price.supplier_id, price.warehouse_id, price.supplier_sku):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Supplier price with SKU {price.supplier_sku} already exists for supplier {price.supplier_id} and warehouse {price.warehouse_id}"
+        )
+    
     db_price = SupplierPrice(**price.dict())
     db.add(db_price)
-    db.commit()
-    db.refresh(db_price)
+    await db.flush()
+    await db.run_sync(mark_parts_dirty, [db_price.part_id])
+    await db.commit()
+    await db.refresh(db_price)
+    snapshot_refresher.wake()
     
     return db_price
 
@@ -69,115 +103,181 @@ async def create_supplier_price(
 @router.get("/statistics", response_model=dict)
 # Admin: supplier prices statistics
 async def get_supplier_prices_statistics(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    total_prices = db.query(SupplierPrice).count()
-    
-    total_parts = db.query(Part).count()
-    
-    total_suppliers = db.query(Supplier).count()
-    
-    total_warehouses = db.query(Warehouse).count()
-    
-    parts_with_prices = db.query(Part).join(
-        SupplierPrice, Part.id == SupplierPrice.part_id
-    ).count()
-    
-    suppliers_with_prices = db.query(Supplier).join(
-        SupplierPrice, Supplier.id == SupplierPrice.supplier_id
-    ).count()
-    
-    warehouses_with_prices = db.query(Warehouse).join(
-        SupplierPrice, Warehouse.id == SupplierPrice.warehouse_id
-    ).count()
-    
-    avg_price = db.query(SupplierPrice).with_entities(
-        func.avg(SupplierPrice.base_price).label('avg_price')
-    ).scalar() or 0
-    
-    min_price = db.query(SupplierPrice).with_entities(
-        func.min(SupplierPrice.base_price).label('min_price')
-    ).scalar() or 0
-    
-    max_price = db.query(SupplierPrice).with_entities(
-        func.max(SupplierPrice.base_price).label('max_price')
-    ).scalar() or 0
-    
-    total_inventory = db.query(SupplierPrice).with_entities(
-        func.sum(SupplierPrice.available_qty).label('total_qty')
-    ).scalar() or 0
-    
+    return await statistics_cache.cached_async("supplier_prices", lambda: _supplier_prices_statistics(db))
+
+
+async def _supplier_prices_statistics(db: AsyncSession) -> dict:
+    # One scan of supplier_prices; distinct ids instead of join row counts
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_prices"),
+                func.count(func.distinct(SupplierPrice.part_id)).label("parts_with_prices"),
+                func.count(func.distinct(SupplierPrice.supplier_id)).label("suppliers_with_prices"),
+                func.count(func.distinct(SupplierPrice.warehouse_id)).label("warehouses_with_prices"),
+                func.avg(SupplierPrice.base_price).label("avg_price"),
+                func.min(SupplierPrice.base_price).label("min_price"),
+                func.max(SupplierPrice.base_price).label("max_price"),
+                func.sum(SupplierPrice.available_qty).label("total_inventory"),
+                select(func.count()).select_from(Part).scalar_subquery().label("total_parts"),
+                select(func.count()).select_from(Supplier).scalar_subquery().label("total_suppliers"),
+                select(func.count()).select_from(Warehouse).scalar_subquery().label("total_warehouses"),
+            ).select_from(SupplierPrice)
+        )
+    ).one()
+
     return {
-        "total_supplier_prices": total_prices,
-        "total_parts": total_parts,
-        "total_suppliers": total_suppliers,
-        "total_warehouses": total_warehouses,
-        "parts_with_prices": parts_with_prices,
-        "suppliers_with_prices": suppliers_with_prices,
-        "warehouses_with_prices": warehouses_with_prices,
-        "average_price": round(float(avg_price), 4) if avg_price else 0,
-        "min_price": float(min_price) if min_price else 0,
-        "max_price": float(max_price) if max_price else 0,
-        "total_available_inventory": int(total_inventory) if total_inventory else 0
+        "total_supplier_prices": s.total_prices,
+        "total_parts": s.total_parts,
+        "total_suppliers": s.total_suppliers,
+        "total_warehouses": s.total_warehouses,
+        "parts_with_prices": s.parts_with_prices,
+        "suppliers_with_prices": s.suppliers_with_prices,
+        "warehouses_with_prices": s.warehouses_with_prices,
+        "average_price": round(float(s.avg_price), 4) if s.avg_price else 0,
+        "min_price": float(s.min_price) if s.min_price else 0,
+        "max_price": float(s.max_price) if s.max_price else 0,
+        "total_available_inventory": int(s.total_inventory) if s.total_inventory else 0
     }
 
 
 @router.get("/low-stock", response_model=List[SupplierPriceResponse])
 # Admin: list low stock supplier prices
 async def get_low_stock_prices(
+    response: Response,
     threshold: int = Query(10, ge=0, description="Quantity threshold (default: 10)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prices = db.query(SupplierPrice).filter(
-        SupplierPrice.available_qty <= threshold
-    ).offset(skip).limit(limit).all()
+    prices = (await db.scalars(
+        paginate(select(SupplierPrice).where(SupplierPrice.available_qty <= threshold), SupplierPrice.id, cursor, skip, limit)
+    )).all()
     
+    set_next_cursor(response, prices, limit)
     return prices
 
 
 @router.get("/upcoming-lead-time", response_model=dict)
 # Admin: lead time analysis for supplier prices
 async def get_lead_time_analysis(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prices = db.query(SupplierPrice).all()
-    
-    if not prices:
-        return {
-            "total_prices": 0,
-            "average_lead_time": 0,
-            "min_lead_time": 0,
-            "max_lead_time": 0,
-            "zero_lead_time": 0
-        }
-    
-    lead_times = [p.lead_time_days for p in prices]
+    lead_time = SupplierPrice.lead_time_days
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_prices"),
+                func.avg(lead_time).label("avg_lead_time"),
+                func.min(lead_time).label("min_lead_time"),
+                func.max(lead_time).label("max_lead_time"),
+                func.count().filter(lead_time == 0).label("zero_lead_time"),
+            ).select_from(SupplierPrice)
+        )
+    ).one()
     
     return {
-        "total_prices": len(prices),
-        "average_lead_time": round(sum(lead_times) / len(lead_times), 2),
-        "min_lead_time": min(lead_times),
-        "max_lead_time": max(lead_times),
-        "zero_lead_time": len([lt for lt in lead_times if lt == 0])
+        "total_prices": s.total_prices,
+        "average_lead_time": round(float(s.avg_lead_time), 2) if s.total_prices else 0,
+        "min_lead_time": s.min_lead_time or 0,
+        "max_lead_time": s.max_lead_time or 0,
+        "zero_lead_time": s.zero_lead_time
     }
 
 
+# Histogram buckets in days, upper bound inclusive; None is open-ended
+LEAD_TIME_BUCKETS = [(0, 0), (1, 2), (3, 5), (6, 10), (11, 20), (21, 30), (31, None)]
+
+
+def _bucket_label(low: int, high) -> str:
+    if high is None:
+        return f"{low}+"
+    return str(low) if low == high else f"{low}-{high}"
+
+
+@router.get("/lead-time-analytics", response_model=dict)
+# Admin: lead time percentiles and histogram by supplier, warehouse and region
+async def get_lead_time_analytics(
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await statistics_cache.cached_async("supplier_prices:lead_time_analytics", lambda: _lead_time_analytics(db))
+
+
+async def _lead_time_analytics(db: AsyncSession) -> dict:
+    lead_time = SupplierPrice.lead_time_days
+    keys = (SupplierPrice.supplier_id, SupplierPrice.warehouse_id, Warehouse.region)
+    buckets = [
+        func.count().filter(lead_time >= low, *([lead_time <= high] if high is not None else [])).label(f"b{i}")
+        for i, (low, high) in enumerate(LEAD_TIME_BUCKETS)
+    ]
+    # GROUPING SETS computes every grouping plus the overall totals (the ()
+    # set, which returns a row even for an empty table) in one scan
+    rows = (
+        await db.execute(
+            select(
+                *keys,
+                func.grouping(*keys).label("grouping"),
+                func.count().label("total"),
+                func.avg(lead_time).label("avg"),
+                func.min(lead_time).label("min"),
+                func.max(lead_time).label("max"),
+                func.percentile_cont(0.5).within_group(lead_time).label("p50"),
+                func.percentile_cont(0.9).within_group(lead_time).label("p90"),
+                func.percentile_cont(0.99).within_group(lead_time).label("p99"),
+                *buckets,
+            )
+            .join(Warehouse, Warehouse.id == SupplierPrice.warehouse_id)
+            .group_by(func.grouping_sets(tuple_(keys[0]), tuple_(keys[1]), tuple_(keys[2]), tuple_()))
+        )
+    ).all()
+
+    # grouping() bits are set for the keys a row is NOT grouped by
+    sets = {
+        0b011: ("by_supplier", "supplier_id"),
+        0b101: ("by_warehouse", "warehouse_id"),
+        0b110: ("by_region", "region"),
+    }
+    result = {"overall": None, "by_supplier": [], "by_warehouse": [], "by_region": []}
+    for row in rows:
+        stats = {
+            "total_prices": row.total,
+            "average_lead_time": round(float(row.avg), 2) if row.total else 0,
+            "min_lead_time": row.min or 0,
+            "max_lead_time": row.max or 0,
+            "p50_lead_time": float(row.p50) if row.p50 is not None else 0,
+            "p90_lead_time": float(row.p90) if row.p90 is not None else 0,
+            "p99_lead_time": float(row.p99) if row.p99 is not None else 0,
+            "histogram": {
+                _bucket_label(low, high): getattr(row, f"b{i}") for i, (low, high) in enumerate(LEAD_TIME_BUCKETS)
+            },
+        }
+        if row.grouping == 0b111:
+            result["overall"] = stats
+        else:
+            group, key = sets[row.grouping]
+            result[group].append({key: getattr(row, key), **stats})
+    for group, key in sets.values():
+        result[group].sort(key=lambda item: item[key])
+    return result
+
+
 @router.get("/find-best-price", response_model=SupplierPriceResponse)
 # Admin: find best (lowest) supplier price for part
 async def admin_find_best_price(
     part_id: int = Query(..., gt=0, description="Part ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    part = db.query(Part).filter(Part.id == part_id).first()
+    part = await db.get(Part, part_id)
     if not part:
         raise HTTPException(status_code=404, detail=f"Part with ID {part_id} not found")
-    best_price = (
-        db.query(SupplierPrice)
-        .filter(SupplierPrice.part_id == part_id)
+    best_price = await db.scalar(
+        select(SupplierPrice)
+        .where(SupplierPrice.part_id == part_id)
         .order_by(SupplierPrice.base_price)
-        .first()
+        .limit(1)
     )
     if not best_price:
         raise HTTPException(status_code=404, detail=f"No supplier prices found for part ID {part_id}")
@@ -188,9 +288,9 @@ async def admin_find_best_price(
 # Admin: get supplier price detail
 async def get_supplier_price_admin(
     price_id: int = Path(..., gt=0, description="Supplier price ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    price = db.query(SupplierPrice).filter(SupplierPrice.id == price_id).first()
+    price = await db.get(SupplierPrice, price_id)
     
     if not price:
         raise HTTPException(
@@ -206,9 +306,9 @@ async def get_supplier_price_admin(
 async def update_supplier_price(
     price_id: int = Path(..., gt=0, description="Supplier price ID"),
     price_update: SupplierPriceUpdate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_price = db.query(SupplierPrice).filter(SupplierPrice.id == price_id).first()
+    db_price = await db.get(SupplierPrice, price_id)
     
     if not db_price:
         raise HTTPException(
@@ -217,7 +317,7 @@ async def update_supplier_price(
         )
     
     if price_update.part_id and price_update.part_id != db_price.part_id:
-        part = db.query(Part).filter(Part.id == price_update.part_id).first()
+        part = await db.get(Part, price_update.part_id)
         if not part:
             raise HTTPException(
                 status_code=404,
@@ -225,7 +325,7 @@ async def update_supplier_price(
             )
     
     if price_update.supplier_id and price_update.supplier_id != db_price.supplier_id:
-        supplier = db.query(Supplier).filter(Supplier.id == price_update.supplier_id).first()
+        supplier = await db.get(Supplier, price_update.supplier_id)
         if not supplier:
             raise HTTPException(
                 status_code=404,
@@ -233,19 +333,36 @@ async def update_supplier_price(
             )
     
     if price_update.warehouse_id and price_update.warehouse_id != db_price.warehouse_id:
-        warehouse = db.query(Warehouse).filter(Warehouse.id == price_update.warehouse_id).first()
+        warehouse = await db.get(Warehouse, price_update.warehouse_id)
         if not warehouse:
             raise HTTPException(
                 status_code=404,
                 detail=f"Warehouse with ID {price_update.warehouse_id} not found"
             )
     
+    key = (
+        price_update.supplier_id or db_price.supplier_id,
+        price_update.warehouse_id or db_price.warehouse_id,
+        price_update.supplier_sku or db_price.supplier_sku,
+    )
+    if key != (db_price.supplier_id, db_price.warehouse_id, db_price.supplier_sku) and await _feed_key_taken(
+        db, *key, exclude_id=price_id
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Supplier price with SKU {key[2]} already exists for supplier {key[0]} and warehouse {key[1]}"
+        )
+    
+    old_part_id = db_price.part_id
     update_data = price_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_price, key, value)
     
-    db.commit()
-    db.refresh(db_price)
+    await db.flush()
+    await db.run_sync(mark_parts_dirty, [old_part_id, db_price.part_id])
+    await db.commit()
+    await db.refresh(db_price)
+    snapshot_refresher.wake()
     
     return db_price
 
@@ -254,9 +371,9 @@ async def update_supplier_price(
 # Admin: delete supplier price
 async def delete_supplier_price(
     price_id: int = Path(..., gt=0, description="Supplier price ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_price = db.query(SupplierPrice).filter(SupplierPrice.id == price_id).first()
+    db_price = await db.get(SupplierPrice, price_id)
     
     if not db_price:
         raise HTTPException(
@@ -264,89 +381,114 @@ async def delete_supplier_price(
             detail=f"Supplier price with ID {price_id} not found"
         )
     
-    db.delete(db_price)
-    db.commit()
+    part_id = db_price.part_id
+    await db.delete(db_price)
+    await db.flush()
+    await db.run_sync(mark_parts_dirty, [part_id])
+    await db.commit()
+    snapshot_refresher.wake()
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create supplier prices
 async def bulk_create_supplier_prices(
     prices_data: List[SupplierPriceCreate],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     created = 0
-    failed = 0
-    errors = []
-    prices_to_insert = []
-
-    for idx, price_data in enumerate(prices_data):
-        try:
-            part = db.query(Part).filter(Part.id == price_data.part_id).first()
-            if not part:
-                errors.append(f"Row {idx + 1}: Part with ID {price_data.part_id} not found")
-                failed += 1
-                continue
-            
-            supplier = db.query(Supplier).filter(Supplier.id == price_data.supplier_id).first()
-            if not supplier:
-                errors.append(f"Row {idx + 1}: Supplier with ID {price_data.supplier_id} not found")
-                failed += 1
-                continue
-            
-            warehouse = db.query(Warehouse).filter(Warehouse.id == price_data.warehouse_id).first()
-            if not warehouse:
-                errors.append(f"Row {idx + 1}: Warehouse with ID {price_data.warehouse_id} not found")
-                failed += 1
-                continue
-            
-            prices_to_insert.append(SupplierPrice(**price_data.dict()))
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
+    check = await (
+        BulkValidation(prices_data)
+        .exists(Part.id, "part_id", lambda p: f"Part with ID {p.part_id} not found")
+        .exists(Supplier.id, "supplier_id", lambda p: f"Supplier with ID {p.supplier_id} not found")
+        .exists(Warehouse.id, "warehouse_id", lambda p: f"Warehouse with ID {p.warehouse_id} not found")
+        .unique(
+            (SupplierPrice.supplier_id, SupplierPrice.warehouse_id, SupplierPrice.supplier_sku),
+            lambda p, id: f"Supplier price with SKU {p.supplier_sku} already exists for supplier {p.supplier_id} and warehouse {p.warehouse_id}",
+        )
+        .run_async(db)
+    )
+    prices_to_insert = [SupplierPrice(**price_data.dict()) for price_data in check.valid]
 
     if prices_to_insert:
         db.add_all(prices_to_insert)
-        db.commit()
+        await db.flush()
+        await db.run_sync(mark_parts_dirty, {p.part_id for p in prices_to_insert})
+        await db.commit()
+        snapshot_refresher.wake()
         created = len(prices_to_insert)
 
     return {
         "created": created,
-        "failed": failed,
+        "failed": check.failed,
         "total": len(prices_data),
-        "errors": errors if errors else None
+        "errors": check.errors if check.errors else None
     }
 
 
+# Request bodies above this size are spooled to a temporary file
+IMPORT_SPOOL_MEMORY = 16 * 1024 * 1024
+
+
+@router.post("/import", response_model=dict)
+# Admin: import a CSV or NDJSON supplier price feed
+async def import_supplier_price_feed(
+    request: Request,
+    format: str = Query(..., pattern=f"^({'|'.join(FEED_FORMATS)})$", description="Feed format of the request body"),
+    dry_run: bool = Query(False, description="Validate and count without writing"),
+    full: bool = Query(False, description="The feed lists every offer of its suppliers; offers it does not list are retired"),
+):
+    # The body is read as a stream, so a feed is never held in memory whole.
+    # A large one goes to a named file that the parsing processes can open.
+    if int(request.headers.get("content-length") or 0) > IMPORT_SPOOL_MEMORY:
+        spool = tempfile.NamedTemporaryFile(suffix=f".{format}")
+    else:
+        spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MEMORY)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.flush()
+        spool.seek(0)
+        # COPY needs the psycopg2 connection, so the import runs on a sync
+        # session in a worker thread
+        report = await asyncio.to_thread(run_import, spool, format, dry_run, full, IMPORT_WORKERS)
+    except FeedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        spool.close()
+
+    # A feed that repeats the stored offers changes nothing downstream
+    if not dry_run and report.part_ids:
+        statistics_cache.invalidate("supplier_prices")
+        snapshot_refresher.wake()
+    return report.as_dict()
+
+
 @router.post("/bulk-delete", response_model=dict, status_code=200)
 # Admin: bulk delete supplier prices
 async def bulk_delete_supplier_prices(
     price_ids: List[int] = Query(..., description="List of supplier price IDs to delete"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    deleted = 0
-    failed = 0
-    errors = []
-
-    for price_id in price_ids:
-        try:
-            db_price = db.query(SupplierPrice).filter(SupplierPrice.id == price_id).first()
-            
-            if not db_price:
-                errors.append(f"ID {price_id}: Supplier price not found")
-                failed += 1
-                continue
-            
-            db.delete(db_price)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {price_id}: {str(e)}")
-            failed += 1
-
-    db.commit()
 
+    deleted_rows = (
+        await db.execute(
+            delete(SupplierPrice)
+            .where(any_id(SupplierPrice.id, price_ids))
+            .returning(SupplierPrice.id, SupplierPrice.part_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+
+    await db.run_sync(mark_parts_dirty, {row.part_id for row in deleted_rows})
+    await db.commit()
+    snapshot_refresher.wake()
+
+    deleted, errors = delete_report(
+        price_ids, [row.id for row in deleted_rows], lambda price_id: f"ID {price_id}: Supplier price not found"
+    )
     return {
         "deleted": deleted,
-        "failed": failed,
+        "failed": len(errors),
         "total": len(price_ids),
         "errors": errors if errors else None
     }
@@ -355,104 +497,119 @@ async def bulk_delete_supplier_prices(
 @router.get("/by-stock-status/{status}", response_model=List[SupplierPriceResponse])
 # Admin: list supplier prices by stock status
 async def get_prices_by_stock_status(
+    response: Response,
     status: str = Path(..., min_length=1, max_length=100, description="Stock status (e.g., 'In Stock', 'Low Stock', 'Out of Stock')"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prices = db.query(SupplierPrice).filter(
-        SupplierPrice.stock_status.ilike(status)
-    ).offset(skip).limit(limit).all()
+    prices = (await db.scalars(
+        paginate(select(SupplierPrice).where(SupplierPrice.stock_status.ilike(status)), SupplierPrice.id, cursor, skip, limit)
+    )).all()
     
+    set_next_cursor(response, prices, limit)
     return prices
 
 
 @router.get("/by-part/{part_id}", response_model=List[SupplierPriceResponse])
 # Admin: list supplier prices by part
 async def admin_get_prices_by_part(
+    response: Response,
     part_id: int = Path(..., gt=0, description="Part ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    part = db.query(Part).filter(Part.id == part_id).first()
+    part = await db.get(Part, part_id)
     if not part:
         raise HTTPException(status_code=404, detail=f"Part with ID {part_id} not found")
-    prices = (
-        db.query(SupplierPrice)
-        .filter(SupplierPrice.part_id == part_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    prices = (await db.scalars(
+        paginate(
+            select(SupplierPrice)
+            .where(SupplierPrice.part_id == part_id),
+            SupplierPrice.id, cursor, skip, limit,
+        )
+    )).all()
+    set_next_cursor(response, prices, limit)
     return prices
 
 
 @router.get("/by-supplier/{supplier_id}", response_model=List[SupplierPriceResponse])
 # Admin: list supplier prices by supplier
 async def admin_get_prices_by_supplier(
+    response: Response,
     supplier_id: int = Path(..., gt=0, description="Supplier ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail=f"Supplier with ID {supplier_id} not found")
-    prices = (
-        db.query(SupplierPrice)
-        .filter(SupplierPrice.supplier_id == supplier_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    prices = (await db.scalars(
+        paginate(
+            select(SupplierPrice)
+            .where(SupplierPrice.supplier_id == supplier_id),
+            SupplierPrice.id, cursor, skip, limit,
+        )
+    )).all()
+    set_next_cursor(response, prices, limit)
     return prices
 
 
 @router.get("/by-warehouse/{warehouse_id}", response_model=List[SupplierPriceResponse])
 # Admin: list supplier prices by warehouse
 async def admin_get_prices_by_warehouse(
+    response: Response,
     warehouse_id: int = Path(..., gt=0, description="Warehouse ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    warehouse = await db.get(Warehouse, warehouse_id)
     if not warehouse:
         raise HTTPException(status_code=404, detail=f"Warehouse with ID {warehouse_id} not found")
-    prices = (
-        db.query(SupplierPrice)
-        .filter(SupplierPrice.warehouse_id == warehouse_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    prices = (await db.scalars(
+        paginate(
+            select(SupplierPrice)
+            .where(SupplierPrice.warehouse_id == warehouse_id),
+            SupplierPrice.id, cursor, skip, limit,
+        )
+    )).all()
+    set_next_cursor(response, prices, limit)
     return prices
 
 
 @router.get("/filter/by-part-and-supplier", response_model=List[SupplierPriceResponse])
 # Admin: filter supplier prices by part and supplier
 async def admin_filter_by_part_and_supplier(
+    response: Response,
     part_id: int = Query(..., gt=0, description="Part ID"),
     supplier_id: int = Query(..., gt=0, description="Supplier ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    part = db.query(Part).filter(Part.id == part_id).first()
+    part = await db.get(Part, part_id)
     if not part:
         raise HTTPException(status_code=404, detail=f"Part with ID {part_id} not found")
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail=f"Supplier with ID {supplier_id} not found")
-    prices = (
-        db.query(SupplierPrice)
-        .filter(
-            SupplierPrice.part_id == part_id,
-            SupplierPrice.supplier_id == supplier_id,
+    prices = (await db.scalars(
+        paginate(
+            select(SupplierPrice)
+            .where(
+                SupplierPrice.part_id == part_id,
+                SupplierPrice.supplier_id == supplier_id,
+            ),
+            SupplierPrice.id, cursor, skip, limit,
         )
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    )).all()
+    set_next_cursor(response, prices, limit)
     return prices
@@ -0,0 +1,374 @@
+import argparse
+import csv
+import io
+import os
+import time
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, Numeric, String, Table, and_, delete, distinct, func, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import CHAR, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.feed_parsing import (
+    FEED_FORMATS,
+    FEED_SHARD_BYTES,
+    FeedError,
+    FeedNotShardable,
+    copy_line,
+    feed_columns,
+    feed_format,
+    iter_feed,
+    parse_feed_parallel,
+    validate_row,
+)
+from app.part_price_snapshot.part_price_snapshot_service import dirty_upsert, mark_parts_dirty
+from app.parts.parts_model import Part
+from app.supplier_price.supplier_price_model import CONTENT_HASH, SupplierPrice
+from app.supplier_price.supplier_price_schema import SupplierPriceCreate
+from app.suppliers.suppliers_model import Supplier
+from app.warehouses.warehouses_model import Warehouse
+
+from db_routers_connection import SessionLocal
+
+
+# Rows buffered in memory per COPY into the staging table
+IMPORT_COPY_CHUNK = int(os.getenv("supplier_price_import_copy_chunk", "50000"))
+# Errors kept in the report; the count of all errors is always exact
+IMPORT_MAX_ERRORS = int(os.getenv("supplier_price_import_max_errors", "1000"))
+# Processes parsing and validating a feed file; 1 parses in the importing thread
+IMPORT_WORKERS = int(os.getenv("supplier_price_import_workers", str(os.cpu_count() or 1)))
+
+FEED_COLUMNS = feed_columns(SupplierPriceCreate)
+# Upsert key, backed by the uq_supplier_prices_supplier_warehouse_sku index
+FEED_KEY = ["supplier_id", "warehouse_id", "supplier_sku"]
+
+staging = Table(
+    "tmp_supplier_price_feed",
+    MetaData(),
+    Column("line_no", Integer, primary_key=True, autoincrement=False),
+    Column("part_id", Integer),
+    Column("supplier_id", Integer),
+    Column("warehouse_id", Integer),
+    Column("supplier_sku", String),
+    Column("base_price", Numeric(19, 4)),
+    Column("currency", CHAR(3)),
+    Column("available_qty", Integer),
+    Column("stock_status", String),
+    Column("lead_time_days", Integer),
+    Column("min_order_qty", Integer),
+    Column("pack_size", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+class FeedImportReport:
+    def __init__(self, max_errors: int = IMPORT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.staged = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.retired = 0
+        self.retire_skipped = False
+        self.duplicates = 0
+        self.part_ids: Set[int] = set()
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.seconds = 0.0
+
+    def add_error(self, line: int, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "retired": self.retired,
+            "retire_skipped": self.retire_skipped,
+            "duplicates": self.duplicates,
+            "failed": self.error_count,
+            "errors": self.errors or None,
+            "errors_truncated": self.error_count > len(self.errors),
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows / self.seconds, 1) if self.seconds else None,
+            "affected_part_ids": sorted(self.part_ids),
+        }
+
+
+def _copy_chunk(db: Session, buf: io.StringIO) -> None:
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(f"COPY {staging.name} ({', '.join(c.name for c in staging.columns)}) FROM STDIN", buf)
+    buf.seek(0)
+    buf.truncate()
+
+
+def stage_feed(db: Session, rows: Iterator[Tuple[int, Any]], report: FeedImportReport) -> None:
+    """Validates rows one by one and COPYs the valid ones into the staging table."""
+    buf = io.StringIO()
+    pending = 0
+    for line_no, raw in rows:
+        report.rows += 1
+        price, error = validate_row(raw, SupplierPriceCreate)
+        if error:
+            report.add_error(line_no, error)
+            continue
+        buf.write(copy_line(line_no, price, FEED_COLUMNS))
+        pending += 1
+        if pending >= IMPORT_COPY_CHUNK:
+            _copy_chunk(db, buf)
+            report.staged += pending
+            pending = 0
+    if pending:
+        _copy_chunk(db, buf)
+        report.staged += pending
+    # Temp tables are never auto-analyzed; the joins below need row estimates
+    db.execute(text(f"ANALYZE {staging.name}"))
+
+
+def stage_feed_parallel(db: Session, path: str, fmt: str, report: FeedImportReport, workers: int) -> None:
+    """Like stage_feed, with parsing and validation spread over a process
+    pool; this thread is the single writer and COPYs each shard as it comes.
+    Raises FeedNotShardable before anything is staged if the file cannot be
+    split on line breaks."""
+    first_error = len(report.errors)
+    for shard in parse_feed_parallel(path, fmt, SupplierPriceCreate, workers):
+        report.rows += shard.rows
+        for line_no, error in shard.errors:
+            report.add_error(line_no, error)
+        # Errors past the shard's own limit were only counted
+        report.error_count += shard.error_count - len(shard.errors)
+        if shard.staged:
+            _copy_chunk(db, io.StringIO(shard.copy_text))
+            report.staged += shard.staged
+    # Shards finish out of order
+    report.errors[first_error:] = sorted(report.errors[first_error:], key=lambda e: e["line"])
+    db.execute(text(f"ANALYZE {staging.name}"))
+
+
+def _feed_path(stream: IO[bytes]) -> Optional[str]:
+    # Workers open the feed themselves, so it has to be a file on disk
+    name = getattr(stream, "name", None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+def _key_match(table, other=staging):
+    return and_(*(table.c[c] == other.c[c] for c in FEED_KEY))
+
+
+def reject_invalid_rows(db: Session, report: FeedImportReport) -> None:
+    """Reports and drops staged rows whose part, supplier or warehouse does
+    not exist, with one anti-join per table instead of lookups per row."""
+    checks = [
+        (Part, "part_id", "Part"),
+        (Supplier, "supplier_id", "Supplier"),
+        (Warehouse, "warehouse_id", "Warehouse"),
+    ]
+    missing = {
+        column: ~select(model.id).where(model.id == staging.c[column]).exists()
+        for model, column, _ in checks
+    }
+    rows = db.execute(
+        select(staging.c.line_no, *(staging.c[column] for _, column, _ in checks), *missing.values())
+        .where(or_(*missing.values()))
+        .order_by(staging.c.line_no)
+        .execution_options(yield_per=IMPORT_COPY_CHUNK)
+    )
+    for row in rows:
+        line_no, ids, flags = row[0], row[1:4], row[4:]
+        errors = [f"{label} with ID {ids[i]} not found" for i, (_, _, label) in enumerate(checks) if flags[i]]
+        report.add_error(line_no, "; ".join(errors))
+    db.execute(staging.delete().where(or_(*missing.values())))
+
+
+def drop_superseded_rows(db: Session) -> int:
+    # ON CONFLICT cannot update the same row twice in one statement, so only
+    # the last line of each key in the feed is kept
+    ranked = select(
+        staging.c.line_no,
+        func.row_number()
+        .over(partition_by=[staging.c[c] for c in FEED_KEY], order_by=staging.c.line_no.desc())
+        .label("rank"),
+    ).subquery()
+    superseded = select(ranked.c.line_no).where(ranked.c.rank > 1)
+    return db.execute(staging.delete().where(staging.c.line_no.in_(superseded))).rowcount
+
+
+def upsert_staged(db: Session, report: FeedImportReport) -> None:
+    """Writes only the staged rows that are new or differ from the stored
+    offer, compared by content hash, so a feed that mostly repeats itself
+    rewrites (and WAL-logs) only what changed."""
+    prices = SupplierPrice.__table__
+    stored = prices.alias("stored")
+    staged = select(func.count()).select_from(staging).scalar_subquery()
+
+    # An offer moved to another part leaves the old part's price stale as well
+    moved = db.scalars(
+        select(prices.c.part_id).distinct().join(staging, _key_match(prices)).where(prices.c.part_id != staging.c.part_id)
+    ).all()
+    mark_parts_dirty(db, moved)
+    report.part_ids.update(moved)
+
+    incoming = select(staging, literal_column(CONTENT_HASH).label("content_hash")).subquery("incoming")
+    changed = (
+        select(*(incoming.c[c] for c in FEED_COLUMNS), func.now())
+        .select_from(incoming.outerjoin(stored, _key_match(stored, incoming)))
+        .where(
+            or_(
+                stored.c.id.is_(None),
+                stored.c.content_hash != incoming.c.content_hash,
+                stored.c.part_id != incoming.c.part_id,
+            )
+        )
+    )
+    values = [c for c in FEED_COLUMNS if c not in FEED_KEY]
+    stmt = pg_insert(prices).from_select(FEED_COLUMNS + ["updated_at"], changed)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=FEED_KEY,
+        set_={**{c: stmt.excluded[c] for c in values}, "updated_at": stmt.excluded.updated_at},
+    ).returning(prices.c.part_id, literal_column("xmax = 0").label("inserted"))
+    upserted = stmt.cte("upserted")
+    marked = dirty_upsert(select(upserted.c.part_id)).cte("marked")
+
+    inserted, updated, part_ids, total = db.execute(
+        select(
+            func.count().filter(upserted.c.inserted),
+            func.count().filter(~upserted.c.inserted),
+            func.array_agg(distinct(upserted.c.part_id)),
+            staged,
+        )
+        .select_from(upserted)
+        .add_cte(marked)
+    ).one()
+    report.inserted, report.updated = inserted, updated
+    report.unchanged = total - inserted - updated
+    report.part_ids.update(part_ids or ())
+
+
+def retire_missing(db: Session, report: FeedImportReport) -> None:
+    """Deletes the offers of the feed's suppliers that a full feed no longer
+    lists. A row the feed failed to deliver would look missing, so nothing is
+    retired when any row had an error."""
+    if report.error_count:
+        report.retire_skipped = True
+        return
+    prices = SupplierPrice.__table__
+    retired = (
+        delete(prices)
+        .where(
+            prices.c.supplier_id.in_(select(staging.c.supplier_id).distinct()),
+            ~select(staging.c.line_no).where(_key_match(prices)).exists(),
+        )
+        .returning(prices.c.part_id)
+        .cte("retired")
+    )
+    marked = dirty_upsert(select(retired.c.part_id)).cte("marked")
+    report.retired, part_ids = db.execute(
+        select(func.count(), func.array_agg(distinct(retired.c.part_id))).select_from(retired).add_cte(marked)
+    ).one()
+    report.part_ids.update(part_ids or ())
+
+
+def import_feed(
+    db: Session, stream: IO[bytes], fmt: str, dry_run: bool = False, full: bool = False, workers: int = 1
+) -> FeedImportReport:
+    """Loads a CSV or NDJSON supplier price feed into supplier_prices.
+
+    Rows are validated against SupplierPriceCreate while they are streamed
+    into a temporary staging table with COPY, then checked against parts,
+    suppliers and warehouses and upserted on (supplier_id, warehouse_id,
+    supplier_sku) in set-wise statements; offers whose content hash did not
+    change are left alone. A full feed lists every offer of its suppliers, so
+    their offers it does not list are retired. Affected parts are queued for
+    the snapshot refresher in the same transaction. With dry_run everything
+    runs and is rolled back, so the report shows what the import would do.
+
+    With workers > 1 a feed file larger than two shards is parsed and
+    validated by that many processes (see parse_feed_parallel); a CSV with
+    line breaks inside quoted fields falls back to the sequential parser.
+    """
+    started = time.perf_counter()
+    report = FeedImportReport()
+    path = _feed_path(stream)
+    try:
+        staging.create(db.connection())
+        parallel = workers > 1 and path and os.path.getsize(path) > 2 * FEED_SHARD_BYTES
+        if parallel:
+            try:
+                stage_feed_parallel(db, path, fmt, report, workers)
+            except FeedNotShardable:
+                parallel = False
+        if not parallel:
+            stage_feed(db, iter_feed(stream, fmt, SupplierPriceCreate), report)
+        reject_invalid_rows(db, report)
+        report.duplicates = drop_superseded_rows(db)
+        upsert_staged(db, report)
+        if full:
+            retire_missing(db, report)
+    except Exception:
+        db.rollback()
+        raise
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def run_import(
+    stream: IO[bytes], fmt: str, dry_run: bool = False, full: bool = False, workers: int = 1
+) -> FeedImportReport:
+    db = SessionLocal()
+    try:
+        return import_feed(db, stream, fmt, dry_run=dry_run, full=full, workers=workers)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import a supplier price feed (CSV or NDJSON)")
+    parser.add_argument("feed", help="path to the feed file")
+    parser.add_argument("--format", choices=FEED_FORMATS, help="feed format, by default taken from the file extension")
+    parser.add_argument("--dry-run", action="store_true", help="validate and count without writing")
+    parser.add_argument("--full", action="store_true", help="retire offers of the feed's suppliers that the feed does not list")
+    parser.add_argument("--parts-out", help="write the affected part ids to this file, one per line")
+    parser.add_argument("--errors-out", help="write the row errors to this CSV file")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS, help="processes parsing and validating the feed")
+    args = parser.parse_args()
+
+    with open(args.feed, "rb") as feed:
+        report = run_import(
+            feed, feed_format(args.feed, args.format), dry_run=args.dry_run, full=args.full, workers=args.workers
+        )
+
+    summary = report.as_dict()
+    print(f"Rows:       {summary['rows']}")
+    print(f"Inserted:   {summary['inserted']}")
+    print(f"Updated:    {summary['updated']}")
+    print(f"Unchanged:  {summary['unchanged']}")
+    if args.full:
+        print(f"Retired:    {summary['retired']}{' (skipped, the feed had row errors)' if report.retire_skipped else ''}")
+    print(f"Duplicates: {summary['duplicates']} (earlier lines of a repeated key)")
+    print(f"Failed:     {summary['failed']}")
+    print(f"Parts:      {len(report.part_ids)} affected")
+    print(f"Time:       {summary['seconds']}s{' (dry run, rolled back)' if args.dry_run else ''}, {summary['rows_per_second']} rows/s")
+    if args.parts_out:
+        with open(args.parts_out, "w") as out:
+            out.writelines(f"{part_id}\n" for part_id in sorted(report.part_ids))
+    if args.errors_out:
+        with open(args.errors_out, "w", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(["line", "error"])
+            writer.writerows((e["line"], e["error"]) for e in report.errors)
+    else:
+        for e in report.errors[:20]:
+            print(f"  line {e['line']}: {e['error']}")
+    if report.error_count > len(report.errors):
+        print(f"  ... {report.error_count - len(report.errors)} more errors not kept (supplier_price_import_max_errors)")
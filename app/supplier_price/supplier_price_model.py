@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, DateTime, Numeric, func, String, ForeignKey
+from sqlalchemy import Column, Computed, Integer, DateTime, Numeric, func, String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import CHAR
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from app.db_base import Base
 
+# What a supplier feed says about an offer, apart from its key and part
+CONTENT_COLUMNS = ["base_price", "currency", "available_qty", "stock_status", "lead_time_days", "min_order_qty", "pack_size"]
+CONTENT_HASH = "md5(" + " || '|' || ".join(f"coalesce({c}::text, '')" for c in CONTENT_COLUMNS) + ")"
+
 class SupplierPrice(Base):
     __tablename__ = 'supplier_prices'
+    __table_args__ = (
+        Index('ix_supplier_prices_part_id', 'part_id'),
+        Index('ix_supplier_prices_supplier_id', 'supplier_id'),
+        Index('ix_supplier_prices_warehouse_id', 'warehouse_id'),
+        Index('uq_supplier_prices_supplier_warehouse_sku', 'supplier_id', 'warehouse_id', 'supplier_sku', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     part_id = Column(Integer, ForeignKey('parts.id'), nullable=False)
@@ -19,6 +29,9 @@ class SupplierPrice(Base):
     min_order_qty = Column(Integer, nullable=True)
     pack_size = Column(Integer, nullable=True)
     updated_at = Column(DateTime, nullable=False, default=func.now())
+    # Maintained by Postgres; feed imports compare it with the hash of the
+    # incoming row and skip offers that did not change
+    content_hash = deferred(Column(CHAR(32), Computed(CONTENT_HASH, persisted=True)))
 
     part = relationship('app.parts.parts_model.Part', back_populates='supplier_prices')
     supplier = relationship('app.suppliers.suppliers_model.Supplier', back_populates='supplier_prices')
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select, update
+from typing import List, Optional
 
 from app.suppliers.suppliers_schema import (
     SupplierCreate,
@@ -12,7 +13,12 @@ from app.warehouses.warehouses_model import Warehouse
 from app.supplier_price.supplier_price_model import SupplierPrice
 from app.parts.parts_model import Part
 from app.pricing_rules.pricing_rules_model import PricingRule
-from db_routers_connection import get_db
+from app.pricing_rules.pricing_rules_index import pricing_rule_index
+from app.part_price_snapshot.part_price_snapshot_service import mark_dirty_for_rules, rule_scope, snapshot_refresher
+from app.statistics_cache import statistics_cache
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from db_routers_connection import get_async_db
 
 
 router = APIRouter(prefix="/api/suppliers/admin", tags=["suppliers-admin"])
@@ -21,99 +27,93 @@ router = APIRouter(prefix="/api/suppliers/admin", tags=["suppliers-admin"])
 @router.get("/search", response_model=List[SupplierResponse])
 # Admin: search suppliers by name
 async def search_suppliers(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=200),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
     suppliers = (
-        db.query(Supplier)
-        .filter(Supplier.name.ilike(f"%{name}%"))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(Supplier)
+                .where(Supplier.name.ilike(f"%{name}%")),
+                Supplier.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, suppliers, limit)
     return suppliers
 
 
 @router.get("/all", response_model=List[SupplierResponse])
 # Admin: list all suppliers
 async def list_all_suppliers_admin(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    suppliers = db.query(Supplier).offset(skip).limit(limit).all()
+    suppliers = (await db.scalars(paginate(select(Supplier), Supplier.id, cursor, skip, limit))).all()
+    set_next_cursor(response, suppliers, limit)
     return suppliers
 
 
 @router.get("/statistics", response_model=dict)
 # Admin: supplier statistics
-async def supplier_statistics(db: Session = Depends(get_db)):
-    total_suppliers = db.query(Supplier).count()
-
-    suppliers_with_warehouses = (
-        db.query(Supplier)
-        .join(Warehouse, Warehouse.supplier_id == Supplier.id)
-        .distinct()
-        .count()
-    )
-    # Parts table doesn't have supplier_id column
-    suppliers_with_parts = 0
-    suppliers_with_prices = (
-        db.query(Supplier)
-        .join(SupplierPrice, SupplierPrice.supplier_id == Supplier.id)
-        .distinct()
-        .count()
-    )
-    suppliers_with_rules = (
-        db.query(Supplier)
-        .join(PricingRule, PricingRule.supplier_id == Supplier.id)
-        .distinct()
-        .count()
-    )
+async def supplier_statistics(db: AsyncSession = Depends(get_async_db)):
+    return await statistics_cache.cached_async("suppliers", lambda: _supplier_statistics(db))
+
+
+async def _supplier_statistics(db: AsyncSession) -> dict:
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_suppliers"),
+                func.count()
+                .filter(select(Warehouse.id).where(Warehouse.supplier_id == Supplier.id).exists())
+                .label("with_warehouses"),
+                func.count()
+                .filter(select(SupplierPrice.id).where(SupplierPrice.supplier_id == Supplier.id).exists())
+                .label("with_prices"),
+                func.count()
+                .filter(select(PricingRule.id).where(PricingRule.supplier_id == Supplier.id).exists())
+                .label("with_rules"),
+            ).select_from(Supplier)
+        )
+    ).one()
 
     return {
-        "total_suppliers": total_suppliers,
-        "suppliers_with_warehouses": suppliers_with_warehouses,
-        "suppliers_with_parts": suppliers_with_parts,
-        "suppliers_with_prices": suppliers_with_prices,
-        "suppliers_with_pricing_rules": suppliers_with_rules,
+        "total_suppliers": s.total_suppliers,
+        "suppliers_with_warehouses": s.with_warehouses,
+        # Parts table doesn't have supplier_id column
+        "suppliers_with_parts": 0,
+        "suppliers_with_prices": s.with_prices,
+        "suppliers_with_pricing_rules": s.with_rules,
     }
 
 
 @router.post("/bulk-create", response_model=dict, status_code=201)
 # Admin: bulk create suppliers
-async def bulk_create_suppliers(suppliers_data: List[SupplierCreate], db: Session = Depends(get_db)):
+async def bulk_create_suppliers(suppliers_data: List[SupplierCreate], db: AsyncSession = Depends(get_async_db)):
     created = 0
-    failed = 0
-    errors = []
-    to_insert: List[Supplier] = []
-
-    for idx, s in enumerate(suppliers_data):
-        try:
-            existing = db.query(Supplier).filter(Supplier.name == s.name).first()
-            if existing:
-                errors.append(
-                    f"Row {idx + 1}: Supplier name '{s.name}' already exists (ID: {existing.id})"
-                )
-                failed += 1
-                continue
-            to_insert.append(Supplier(**s.dict()))
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
+    check = await BulkValidation(suppliers_data).unique(
+        (Supplier.name,), lambda s, id: f"Supplier name '{s.name}' already exists (ID: {id})"
+    ).run_async(db)
+    to_insert = [Supplier(**s.dict()) for s in check.valid]
 
     if to_insert:
         db.add_all(to_insert)
-        db.commit()
+        await db.commit()
         created = len(to_insert)
 
     return {
         "total": len(suppliers_data),
         "created": created,
-        "failed": failed,
-        "errors": errors or None,
+        "failed": check.failed,
+        "errors": check.errors or None,
     }
 
 
@@ -122,45 +122,45 @@ async def bulk_create_suppliers(suppliers_data: List[SupplierCreate], db: Sessio
 async def bulk_delete_suppliers(
     supplier_ids: List[int] = Query(..., description="Supplier IDs to delete"),
     force: bool = Query(False),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    deleted = 0
-    failed = 0
-    errors = []
-
-    for sid in supplier_ids:
-        try:
-            s = db.query(Supplier).filter(Supplier.id == sid).first()
-            if not s:
-                errors.append(f"ID {sid}: Supplier not found")
-                failed += 1
-                continue
-
-            if not force:
-                deps_total = (
-                    db.query(Warehouse).filter(Warehouse.supplier_id == sid).count()
-                    + db.query(SupplierPrice).filter(SupplierPrice.supplier_id == sid).count()
-                    + db.query(PricingRule).filter(PricingRule.supplier_id == sid).count()
-                )
-                if deps_total > 0:
-                    errors.append(
-                        f"ID {sid}: Has dependent records ({deps_total}). Set force=true to delete."
-                    )
-                    failed += 1
-                    continue
-
-            db.delete(s)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {sid}: {str(e)}")
-            failed += 1
-
-    db.commit()
 
+    # One grouped dependency check for the whole list
+    deps_total = (
+        select(func.count()).where(Warehouse.supplier_id == Supplier.id).scalar_subquery()
+        + select(func.count()).where(SupplierPrice.supplier_id == Supplier.id).scalar_subquery()
+        + select(func.count()).where(PricingRule.supplier_id == Supplier.id).scalar_subquery()
+    )
+    found = (
+        await db.execute(select(Supplier.id, deps_total).where(any_id(Supplier.id, supplier_ids)))
+    ).all()
+    blocked = {
+        sid: f"ID {sid}: Has dependent records ({deps}). Set force=true to delete."
+        for sid, deps in found
+        if deps > 0 and not force
+    }
+    to_delete = [sid for sid, _ in found if sid not in blocked]
+
+    deleted_ids, widened = [], []
+    if to_delete:
+        widened = await _unscope_rules(db, to_delete)
+        deleted_ids = (
+            await db.scalars(
+                delete(Supplier)
+                .where(any_id(Supplier.id, to_delete))
+                .returning(Supplier.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+
+    await db.commit()
+    await _rules_widened(db, widened)
+
+    deleted, errors = delete_report(supplier_ids, deleted_ids, lambda sid: f"ID {sid}: Supplier not found", blocked)
     return {
         "total": len(supplier_ids),
         "deleted": deleted,
-        "failed": failed,
+        "failed": len(errors),
         "errors": errors or None,
     }
 
@@ -168,22 +168,27 @@ async def bulk_delete_suppliers(
 @router.get("/{supplier_id}/warehouses", response_model=list)
 # Admin: list supplier warehouses
 async def get_supplier_warehouses(
+    response: Response,
     supplier_id: int = Path(..., gt=0),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
 
     warehouses = (
-        db.query(Warehouse)
-        .filter(Warehouse.supplier_id == supplier_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            paginate(
+                select(Warehouse)
+                .where(Warehouse.supplier_id == supplier_id),
+                Warehouse.id, cursor, skip, limit,
+            )
+        )
+    ).all()
+    set_next_cursor(response, warehouses, limit)
     return [
         {
             "id": w.id,
@@ -202,9 +207,9 @@ async def get_supplier_warehouses(
 # Admin: count parts supplied by supplier
 async def get_supplier_parts_count(
     supplier_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
 
@@ -215,8 +220,8 @@ async def get_supplier_parts_count(
 
 @router.post("/", response_model=SupplierResponse, status_code=201)
 # Admin: create supplier
-async def create_supplier(supplier: SupplierCreate, db: Session = Depends(get_db)):
-    existing = db.query(Supplier).filter(Supplier.name == supplier.name).first()
+async def create_supplier(supplier: SupplierCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(Supplier).where(Supplier.name == supplier.name).limit(1))
     if existing:
         raise HTTPException(
             status_code=409,
@@ -225,8 +230,8 @@ async def create_supplier(supplier: SupplierCreate, db: Session = Depends(get_db
 
     db_supplier = Supplier(**supplier.dict())
     db.add(db_supplier)
-    db.commit()
-    db.refresh(db_supplier)
+    await db.commit()
+    await db.refresh(db_supplier)
     return db_supplier
 
 
@@ -234,9 +239,9 @@ async def create_supplier(supplier: SupplierCreate, db: Session = Depends(get_db
 # Admin: get supplier detail
 async def get_supplier_admin(
     supplier_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
     return supplier
@@ -247,14 +252,14 @@ async def get_supplier_admin(
 async def update_supplier(
     supplier_id: int = Path(..., gt=0),
     supplier_update: SupplierUpdate = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    db_supplier = await db.get(Supplier, supplier_id)
     if not db_supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
 
     if supplier_update and supplier_update.name and supplier_update.name != db_supplier.name:
-        existing = db.query(Supplier).filter(Supplier.name == supplier_update.name).first()
+        existing = await db.scalar(select(Supplier).where(Supplier.name == supplier_update.name).limit(1))
         if existing and existing.id != supplier_id:
             raise HTTPException(status_code=409, detail="Supplier name already exists")
 
@@ -262,8 +267,8 @@ async def update_supplier(
     for key, value in update_data.items():
         setattr(db_supplier, key, value)
 
-    db.commit()
-    db.refresh(db_supplier)
+    await db.commit()
+    await db.refresh(db_supplier)
     return db_supplier
 
 
@@ -272,16 +277,16 @@ async def update_supplier(
 async def delete_supplier(
     supplier_id: int = Path(..., gt=0),
     force: bool = Query(False, description="Force delete even if dependencies exist"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    db_supplier = await db.get(Supplier, supplier_id)
     if not db_supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
 
     deps = {
-        "warehouses": db.query(Warehouse).filter(Warehouse.supplier_id == supplier_id).count(),
-        "supplier_prices": db.query(SupplierPrice).filter(SupplierPrice.supplier_id == supplier_id).count(),
-        "pricing_rules": db.query(PricingRule).filter(PricingRule.supplier_id == supplier_id).count(),
+        "warehouses": await db.scalar(select(func.count()).select_from(Warehouse).where(Warehouse.supplier_id == supplier_id)),
+        "supplier_prices": await db.scalar(select(func.count()).select_from(SupplierPrice).where(SupplierPrice.supplier_id == supplier_id)),
+        "pricing_rules": await db.scalar(select(func.count()).select_from(PricingRule).where(PricingRule.supplier_id == supplier_id)),
     }
 
     if not force and any(v > 0 for v in deps.values()):
@@ -293,5 +298,30 @@ async def delete_supplier(
             ),
         )
 
-    db.delete(db_supplier)
-    db.commit()
+    widened = await _unscope_rules(db, [supplier_id])
+    await db.delete(db_supplier)
+    await db.commit()
+    await _rules_widened(db, widened)
+
+
+async def _unscope_rules(db: AsyncSession, supplier_ids: List[int]) -> list:
+    # Rules scoped to a deleted supplier lose the scope, as the ORM delete did.
+    # The widened rule matches every part the scoped one did, so queueing its
+    # new scope covers the parts it priced before as well as the new ones.
+    widened = (
+        await db.execute(
+            update(PricingRule)
+            .where(any_id(PricingRule.supplier_id, supplier_ids))
+            .values(supplier_id=None)
+            .returning(PricingRule.warehouse_region, PricingRule.brand_id, PricingRule.category_id, PricingRule.supplier_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+    await db.run_sync(mark_dirty_for_rules, [rule_scope(r) for r in widened])
+    return widened
+
+
+async def _rules_widened(db: AsyncSession, widened: list) -> None:
+    if widened:
+        await db.run_sync(pricing_rule_index.rebuild)
+        snapshot_refresher.wake()
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import func
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
 from typing import List, Optional
 from datetime import datetime
 
@@ -13,43 +13,55 @@ from app.warehouses.warehouses_model import Warehouse
 from app.suppliers.suppliers_model import Supplier
 from app.shipping_zones.shipping_zones_model import ShippingZone
 from app.supplier_price.supplier_price_model import SupplierPrice
-from db_routers_connection import get_db
+from app.part_price_snapshot.part_price_snapshot_service import mark_dirty_for_warehouses, snapshot_refresher
+from app.statistics_cache import statistics_cache
+from app.pagination import CURSOR_DESCRIPTION, paginate, set_next_cursor
+from app.bulk_validation import BulkValidation, any_id, delete_report
+from db_routers_connection import get_async_db
 
 router = APIRouter(prefix="/api/warehouses/admin", tags=["warehouses", "admin"])
 
 # Admin: list warehouses (paginated)
 @router.get("/all", response_model=List[WarehouseResponse])
 async def list_warehouses_admin(
+    response: Response,
     skip: int = Query(0, ge=0, description="Pagination: skip N results"),
     limit: int = Query(50, ge=1, le=500, description="Pagination: max results (default 50, max 500)"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    warehouses = db.query(Warehouse).offset(skip).limit(limit).all()
+    warehouses = (await db.scalars(paginate(select(Warehouse), Warehouse.id, cursor, skip, limit))).all()
+    set_next_cursor(response, warehouses, limit)
     return warehouses
 
 # Admin: search warehouses by substring match on name
 @router.get("/search", response_model=List[WarehouseResponse])
 async def search_warehouses(
+    response: Response,
     name: str = Query(..., min_length=1, max_length=100, description="Warehouse name to search (substring)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    warehouses = db.query(Warehouse).filter(
+    warehouses = (await db.scalars(paginate(select(Warehouse).where(
         Warehouse.name.ilike(f"%{name}%")
-    ).offset(skip).limit(limit).all()
+    ), Warehouse.id, cursor, skip, limit))).all()
     
+    set_next_cursor(response, warehouses, limit)
     return warehouses
 
 # Admin: list warehouses for a given supplier
 @router.get("/by-supplier/{supplier_id}", response_model=List[WarehouseResponse])
 async def get_warehouses_by_supplier(
+    response: Response,
     supplier_id: int = Path(..., gt=0, description="Supplier ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     
     if not supplier:
         raise HTTPException(
@@ -57,21 +69,24 @@ async def get_warehouses_by_supplier(
             detail=f"Supplier with ID {supplier_id} not found"
         )
     
-    warehouses = db.query(Warehouse).filter(
+    warehouses = (await db.scalars(paginate(select(Warehouse).where(
         Warehouse.supplier_id == supplier_id
-    ).offset(skip).limit(limit).all()
+    ), Warehouse.id, cursor, skip, limit))).all()
     
+    set_next_cursor(response, warehouses, limit)
     return warehouses
 
 # Admin: list warehouses belonging to a shipping zone
 @router.get("/by-zone/{shipping_zone_id}", response_model=List[WarehouseResponse])
 async def get_warehouses_by_shipping_zone(
+    response: Response,
     shipping_zone_id: int = Path(..., gt=0, description="Shipping zone ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    zone = db.query(ShippingZone).filter(ShippingZone.id == shipping_zone_id).first()
+    zone = await db.get(ShippingZone, shipping_zone_id)
     
     if not zone:
         raise HTTPException(
@@ -79,55 +94,68 @@ async def get_warehouses_by_shipping_zone(
             detail=f"Shipping zone with ID {shipping_zone_id} not found"
         )
     
-    warehouses = db.query(Warehouse).filter(
+    warehouses = (await db.scalars(paginate(select(Warehouse).where(
         Warehouse.shipping_zone_id == shipping_zone_id
-    ).offset(skip).limit(limit).all()
+    ), Warehouse.id, cursor, skip, limit))).all()
     
+    set_next_cursor(response, warehouses, limit)
     return warehouses
 
 # Admin: list warehouses by country (case-insensitive)
 @router.get("/by-country/{country}", response_model=List[WarehouseResponse])
 async def get_warehouses_by_country(
+    response: Response,
     country: str = Path(..., min_length=1, max_length=200, description="Country name"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    warehouses = db.query(Warehouse).filter(
+    warehouses = (await db.scalars(paginate(select(Warehouse).where(
         Warehouse.country.ilike(country)
-    ).offset(skip).limit(limit).all()
+    ), Warehouse.id, cursor, skip, limit))).all()
     
+    set_next_cursor(response, warehouses, limit)
     return warehouses
 
 # Admin: statistics
 @router.get("/statistics", response_model=dict)
 async def get_warehouses_statistics(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    total_warehouses = db.query(Warehouse).count()
-    
-    total_suppliers = db.query(Supplier).count()
-    total_zones = db.query(ShippingZone).count()
-    total_inventory_entries = db.query(SupplierPrice).count()
-    avg_lead_time = db.query(func.avg(Warehouse.default_lead_time_days)).scalar() or 0
-    total_suppliers_with_warehouses = db.query(Warehouse.supplier_id).distinct().count()
+    return await statistics_cache.cached_async("warehouses", lambda: _warehouses_statistics(db))
+
+
+async def _warehouses_statistics(db: AsyncSession) -> dict:
+    s = (
+        await db.execute(
+            select(
+                func.count().label("total_warehouses"),
+                func.count(func.distinct(Warehouse.supplier_id)).label("suppliers_with_warehouses"),
+                func.avg(Warehouse.default_lead_time_days).label("avg_lead_time"),
+                select(func.count()).select_from(Supplier).scalar_subquery().label("total_suppliers"),
+                select(func.count()).select_from(ShippingZone).scalar_subquery().label("total_zones"),
+                select(func.count()).select_from(SupplierPrice).scalar_subquery().label("total_inventory_entries"),
+            ).select_from(Warehouse)
+        )
+    ).one()
 
     return {
-        "total_warehouses": total_warehouses,
-        "total_suppliers_with_warehouses": total_suppliers_with_warehouses,
-        "total_shipping_zones": total_zones,
-        "total_inventory_entries_in_system": total_inventory_entries,
-        "average_lead_time_days": round(float(avg_lead_time), 2) if avg_lead_time else 0,
-        "total_available_suppliers": total_suppliers
+        "total_warehouses": s.total_warehouses,
+        "total_suppliers_with_warehouses": s.suppliers_with_warehouses,
+        "total_shipping_zones": s.total_zones,
+        "total_inventory_entries_in_system": s.total_inventory_entries,
+        "average_lead_time_days": round(float(s.avg_lead_time), 2) if s.avg_lead_time else 0,
+        "total_available_suppliers": s.total_suppliers
     }
 
 # Admin: get warehouse detail
 @router.get("/{warehouse_id}", response_model=WarehouseResponse)
 async def get_warehouse(
     warehouse_id: int = Path(..., gt=0, description="Warehouse ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    warehouse = await db.get(Warehouse, warehouse_id)
     
     if not warehouse:
         raise HTTPException(
@@ -141,9 +169,9 @@ async def get_warehouse(
 @router.get("/{warehouse_id}/inventory-count", response_model=dict)
 async def get_warehouse_inventory_count(
     warehouse_id: int = Path(..., gt=0, description="Warehouse ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    warehouse = await db.get(Warehouse, warehouse_id)
     
     if not warehouse:
         raise HTTPException(
@@ -151,9 +179,9 @@ async def get_warehouse_inventory_count(
             detail=f"Warehouse with ID {warehouse_id} not found"
         )
     
-    supplier_prices_count = db.query(SupplierPrice).filter(
+    supplier_prices_count = await db.scalar(select(func.count()).select_from(SupplierPrice).where(
         SupplierPrice.warehouse_id == warehouse_id
-    ).count()
+    ))
     
     return {
         "warehouse_id": warehouse.id,
@@ -169,9 +197,9 @@ async def get_warehouse_inventory_count(
 @router.post("/", response_model=WarehouseResponse, status_code=201)
 async def create_warehouse(
     warehouse: WarehouseCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == warehouse.supplier_id).first()
+    supplier = await db.get(Supplier, warehouse.supplier_id)
     
     if not supplier:
         raise HTTPException(
@@ -179,7 +207,7 @@ async def create_warehouse(
             detail=f"Supplier with ID {warehouse.supplier_id} not found"
         )
     
-    zone = db.query(ShippingZone).filter(ShippingZone.id == warehouse.shipping_zone_id).first()
+    zone = await db.get(ShippingZone, warehouse.shipping_zone_id)
     
     if not zone:
         raise HTTPException(
@@ -187,10 +215,10 @@ async def create_warehouse(
             detail=f"Shipping zone with ID {warehouse.shipping_zone_id} not found"
         )
     
-    existing = db.query(Warehouse).filter(
+    existing = await db.scalar(select(Warehouse).where(
         Warehouse.name == warehouse.name,
         Warehouse.supplier_id == warehouse.supplier_id
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(
@@ -200,8 +228,8 @@ async def create_warehouse(
     
     db_warehouse = Warehouse(**warehouse.dict())
     db.add(db_warehouse)
-    db.commit()
-    db.refresh(db_warehouse)
+    await db.commit()
+    await db.refresh(db_warehouse)
     
     return db_warehouse
 
@@ -211,9 +239,9 @@ async def create_warehouse(
 async def update_warehouse(
     warehouse_id: int = Path(..., gt=0, description="Warehouse ID"),
     warehouse_update: WarehouseUpdate = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    db_warehouse = await db.get(Warehouse, warehouse_id)
     
     if not db_warehouse:
         raise HTTPException(
@@ -222,7 +250,7 @@ async def update_warehouse(
         )
     
     if warehouse_update.supplier_id and warehouse_update.supplier_id != db_warehouse.supplier_id:
-        supplier = db.query(Supplier).filter(Supplier.id == warehouse_update.supplier_id).first()
+        supplier = await db.get(Supplier, warehouse_update.supplier_id)
         if not supplier:
             raise HTTPException(
                 status_code=404,
@@ -230,7 +258,7 @@ async def update_warehouse(
             )
     
     if warehouse_update.shipping_zone_id and warehouse_update.shipping_zone_id != db_warehouse.shipping_zone_id:
-        zone = db.query(ShippingZone).filter(ShippingZone.id == warehouse_update.shipping_zone_id).first()
+        zone = await db.get(ShippingZone, warehouse_update.shipping_zone_id)
         if not zone:
             raise HTTPException(
                 status_code=404,
@@ -239,11 +267,11 @@ async def update_warehouse(
     
     if warehouse_update.name and warehouse_update.name != db_warehouse.name:
         supplier_id = warehouse_update.supplier_id or db_warehouse.supplier_id
-        existing = db.query(Warehouse).filter(
+        existing = await db.scalar(select(Warehouse).where(
             Warehouse.name == warehouse_update.name,
             Warehouse.supplier_id == supplier_id,
             Warehouse.id != warehouse_id
-        ).first()
+        ).limit(1))
         if existing:
             raise HTTPException(
                 status_code=409,
@@ -254,8 +282,10 @@ async def update_warehouse(
     for key, value in update_data.items():
         setattr(db_warehouse, key, value)
     
-    db.commit()
-    db.refresh(db_warehouse)
+    await db.run_sync(mark_dirty_for_warehouses, [warehouse_id])
+    await db.commit()
+    await db.refresh(db_warehouse)
+    snapshot_refresher.wake()
     
     return db_warehouse
 
@@ -264,9 +294,9 @@ async def update_warehouse(
 async def delete_warehouse(
     warehouse_id: int = Path(..., gt=0, description="Warehouse ID"),
     force: bool = Query(False, description="Force delete even if inventory exists"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    db_warehouse = await db.get(Warehouse, warehouse_id)
     
     if not db_warehouse:
         raise HTTPException(
@@ -274,9 +304,9 @@ async def delete_warehouse(
             detail=f"Warehouse with ID {warehouse_id} not found"
         )
     
-    inventory_count = db.query(SupplierPrice).filter(
+    inventory_count = await db.scalar(select(func.count()).select_from(SupplierPrice).where(
         SupplierPrice.warehouse_id == warehouse_id
-    ).count()
+    ))
     
     if inventory_count > 0 and not force:
         raise HTTPException(
@@ -284,99 +314,82 @@ async def delete_warehouse(
             detail=f"Cannot delete warehouse: has {inventory_count} inventory entries. Use force=true to delete anyway."
         )
     
-    db.delete(db_warehouse)
-    db.commit()
+    await db.run_sync(mark_dirty_for_warehouses, [warehouse_id])
+    await db.delete(db_warehouse)
+    await db.commit()
+    snapshot_refresher.wake()
 
 # Admin: bulk create
 @router.post("/bulk-create", response_model=dict, status_code=201)
 async def bulk_create_warehouses(
     warehouses_data: List[WarehouseCreate],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     created = 0
-    failed = 0
-    errors = []
-    warehouses_to_insert = []
-
-    for idx, warehouse_data in enumerate(warehouses_data):
-        try:
-            supplier = db.query(Supplier).filter(Supplier.id == warehouse_data.supplier_id).first()
-            if not supplier:
-                errors.append(f"Row {idx + 1}: Supplier with ID {warehouse_data.supplier_id} not found")
-                failed += 1
-                continue
-            
-            zone = db.query(ShippingZone).filter(ShippingZone.id == warehouse_data.shipping_zone_id).first()
-            if not zone:
-                errors.append(f"Row {idx + 1}: Shipping zone with ID {warehouse_data.shipping_zone_id} not found")
-                failed += 1
-                continue
-            
-            existing = db.query(Warehouse).filter(
-                Warehouse.name == warehouse_data.name,
-                Warehouse.supplier_id == warehouse_data.supplier_id
-            ).first()
-            if existing:
-                errors.append(f"Row {idx + 1}: Warehouse name '{warehouse_data.name}' already exists for supplier ID {warehouse_data.supplier_id}")
-                failed += 1
-                continue
-            
-            warehouses_to_insert.append(Warehouse(**warehouse_data.dict()))
-        except Exception as e:
-            errors.append(f"Row {idx + 1}: {str(e)}")
-            failed += 1
+    check = await (
+        BulkValidation(warehouses_data)
+        .exists(Supplier.id, "supplier_id", lambda w: f"Supplier with ID {w.supplier_id} not found")
+        .exists(ShippingZone.id, "shipping_zone_id", lambda w: f"Shipping zone with ID {w.shipping_zone_id} not found")
+        .unique(
+            (Warehouse.name, Warehouse.supplier_id),
+            lambda w, id: f"Warehouse name '{w.name}' already exists for supplier ID {w.supplier_id}",
+        )
+        .run_async(db)
+    )
+    warehouses_to_insert = [Warehouse(**warehouse_data.dict()) for warehouse_data in check.valid]
 
     if warehouses_to_insert:
         db.add_all(warehouses_to_insert)
-        db.commit()
+        await db.commit()
         created = len(warehouses_to_insert)
 
     return {
         "created": created,
-        "failed": failed,
+        "failed": check.failed,
         "total": len(warehouses_data),
-        "errors": errors if errors else None
+        "errors": check.errors if check.errors else None
     }
 # Admin: bulk delete
 @router.post("/bulk-delete", response_model=dict, status_code=200)
 async def bulk_delete_warehouses(
     warehouse_ids: List[int] = Query(..., description="List of warehouse IDs to delete"),
     force: bool = Query(False, description="Force delete even if inventory exists"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    deleted = 0
-    failed = 0
-    errors = []
 
-    for idx, warehouse_id in enumerate(warehouse_ids):
-        try:
-            db_warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
-            
-            if not db_warehouse:
-                errors.append(f"ID {warehouse_id}: Warehouse not found")
-                failed += 1
-                continue
-            
-            inventory_count = db.query(SupplierPrice).filter(
-                SupplierPrice.warehouse_id == warehouse_id
-            ).count()
-            
-            if inventory_count > 0 and not force:
-                errors.append(f"ID {warehouse_id}: Has {inventory_count} inventory entries. Set force=true to delete")
-                failed += 1
-                continue
-            
-            db.delete(db_warehouse)
-            deleted += 1
-        except Exception as e:
-            errors.append(f"ID {warehouse_id}: {str(e)}")
-            failed += 1
+    # One grouped dependency check for the whole list
+    inventory_count = select(func.count()).where(SupplierPrice.warehouse_id == Warehouse.id).scalar_subquery()
+    found = (
+        await db.execute(select(Warehouse.id, inventory_count).where(any_id(Warehouse.id, warehouse_ids)))
+    ).all()
+    blocked = {
+        warehouse_id: f"ID {warehouse_id}: Has {count} inventory entries. Set force=true to delete"
+        for warehouse_id, count in found
+        if count > 0 and not force
+    }
+    to_delete = [warehouse_id for warehouse_id, _ in found if warehouse_id not in blocked]
+
+    deleted_ids = []
+    if to_delete:
+        await db.run_sync(mark_dirty_for_warehouses, to_delete)
+        deleted_ids = (
+            await db.scalars(
+                delete(Warehouse)
+                .where(any_id(Warehouse.id, to_delete))
+                .returning(Warehouse.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
 
-    db.commit()
+    await db.commit()
+    snapshot_refresher.wake()
 
+    deleted, errors = delete_report(
+        warehouse_ids, deleted_ids, lambda warehouse_id: f"ID {warehouse_id}: Warehouse not found", blocked
+    )
     return {
         "deleted": deleted,
-        "failed": failed,
+        "failed": len(errors),
         "total": len(warehouse_ids),
         "errors": errors if errors else None
     }
@@ -385,13 +398,15 @@ async def bulk_delete_warehouses(
 # Admin: filter by supplier and shipping zone
 @router.get("/filter/by-supplier-and-zone", response_model=List[WarehouseResponse])
 async def filter_warehouses_by_supplier_and_zone(
+    response: Response,
     supplier_id: int = Query(..., gt=0, description="Supplier ID"),
     shipping_zone_id: int = Query(..., gt=0, description="Shipping zone ID"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    supplier = await db.get(Supplier, supplier_id)
     
     if not supplier:
         raise HTTPException(
@@ -399,7 +414,7 @@ async def filter_warehouses_by_supplier_and_zone(
             detail=f"Supplier with ID {supplier_id} not found"
         )
     
-    zone = db.query(ShippingZone).filter(ShippingZone.id == shipping_zone_id).first()
+    zone = await db.get(ShippingZone, shipping_zone_id)
     
     if not zone:
         raise HTTPException(
@@ -407,9 +422,10 @@ async def filter_warehouses_by_supplier_and_zone(
             detail=f"Shipping zone with ID {shipping_zone_id} not found"
         )
     
-    warehouses = db.query(Warehouse).filter(
+    warehouses = (await db.scalars(paginate(select(Warehouse).where(
         Warehouse.supplier_id == supplier_id,
         Warehouse.shipping_zone_id == shipping_zone_id
-    ).offset(skip).limit(limit).all()
+    ), Warehouse.id, cursor, skip, limit))).all()
     
+    set_next_cursor(response, warehouses, limit)
     return warehouses
@@ -0,0 +1,90 @@
+"""Compares an `async def` route on a blocking Session with one on AsyncSession.
+
+The "sync" endpoint is how the admin routers used to look: declared async but
+calling Session, so every query blocks the event loop. The "async" endpoint
+awaits the same query through get_async_db. Requests are sent concurrently
+in-process over ASGI, so the numbers show event loop throughput rather than
+HTTP overhead. Run from the repo root:
+
+    PYTHONPATH=.:app python benchmarks/async_db_benchmark.py --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db_routers_connection import async_engine, describe_pool, get_async_db, get_db
+
+
+def build_app(query: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def blocking_route(db: Session = Depends(get_db)):
+        return {"rows": len(db.execute(text(query)).all())}
+
+    @app.get("/async")
+    async def async_route(db: AsyncSession = Depends(get_async_db)):
+        return {"rows": len((await db.execute(text(query))).all())}
+
+    return app
+
+
+async def run(app: FastAPI, path: str, concurrency: int, requests: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    limit = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def task():
+            async with limit:
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                return time.perf_counter() - started
+
+        # Warm-up round so pooled modes are measured with open connections
+        await asyncio.gather(*(task() for _ in range(concurrency)))
+        started = time.perf_counter()
+        latencies = sorted(await asyncio.gather(*(task() for _ in range(requests))))
+        elapsed = time.perf_counter() - started
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs async sessions in async routes")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--query", default="SELECT id, name FROM brands ORDER BY id LIMIT 1")
+    args = parser.parse_args()
+
+    async def main():
+        app = build_app(args.query)
+        print(describe_pool())
+        for path in ("/sync", "/async"):
+            r = await run(app, path, args.concurrency, args.requests)
+            print(path[1:])
+            print(
+                f"  {r['requests_per_second']:.1f} req/s, p50 {r['p50_ms']:.1f}ms, "
+                f"p95 {r['p95_ms']:.1f}ms, p99 {r['p99_ms']:.1f}ms, mean {r['mean_ms']:.1f}ms"
+            )
+        # Pooled asyncpg connections belong to this event loop
+        await async_engine.dispose()
+
+    asyncio.run(main())
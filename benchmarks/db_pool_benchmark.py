@@ -0,0 +1,67 @@
+"""Compares NullPool and QueuePool latency under concurrent requests.
+
+Each task opens a session, runs one query and closes the session, the same
+lifecycle as a request going through get_db. Run from the repo root:
+
+    PYTHONPATH=.:app python benchmarks/db_pool_benchmark.py --threads 16 --requests 2000
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from db_routers_connection import build_engine, describe_pool
+
+
+def run(pool_mode: str, query: str, threads: int, requests: int) -> dict:
+    engine = build_engine(pool_mode)
+    Session = sessionmaker(bind=engine)
+
+    def task(_):
+        started = time.perf_counter()
+        db = Session()
+        try:
+            db.execute(text(query)).all()
+        finally:
+            db.close()
+        return time.perf_counter() - started
+
+    # One warm-up round so QueuePool is measured with open connections
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(task, range(threads)))
+        started = time.perf_counter()
+        latencies = sorted(pool.map(task, range(requests)))
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "mode": describe_pool(pool_mode),
+        "requests_per_second": requests / elapsed,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark database pool modes")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--query", default="SELECT id, name FROM brands ORDER BY id LIMIT 1")
+    parser.add_argument("--modes", nargs="+", default=["null", "queue"], choices=["null", "queue"])
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        r = run(mode, args.query, args.threads, args.requests)
+        print(r["mode"])
+        print(
+            f"  {r['requests_per_second']:.1f} req/s, p50 {r['p50_ms']:.1f}ms, "
+            f"p95 {r['p95_ms']:.1f}ms, p99 {r['p99_ms']:.1f}ms, mean {r['mean_ms']:.1f}ms"
+        )
@@ -0,0 +1,113 @@
+"""Checks that the hot lookup queries are planned on their indexes.
+
+Runs EXPLAIN on the filters the catalog, pricing, shipping and FX paths issue
+on every request and fails if a plan does not use the expected index. Small
+development tables are cheaper to scan than to index, so sequential scans
+are disabled for the check unless --planner-choice is given. Run from the
+repo root against a migrated database:
+
+    PYTHONPATH=.:app python benchmarks/explain_hot_queries.py
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import func, literal, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.fx_rates.fx_rates_model import FxRate
+from app.parts.parts_model import Part
+from app.pricing_rules.pricing_rules_model import PricingRule
+from app.shipping_rates.shipping_rates_model import ShippingRate
+from app.supplier_price.supplier_price_model import SupplierPrice
+from db_routers_connection import engine
+
+
+HOT_QUERIES = [
+    (
+        "offers for a cart",
+        select(SupplierPrice).where(SupplierPrice.part_id.in_([1, 2, 3])),
+        "ix_supplier_prices_part_id",
+    ),
+    (
+        "offers of a supplier",
+        select(SupplierPrice).where(SupplierPrice.supplier_id == 1),
+        "ix_supplier_prices_supplier_id",
+    ),
+    (
+        "offers in a warehouse",
+        select(SupplierPrice.part_id).where(SupplierPrice.warehouse_id.in_([1])),
+        "ix_supplier_prices_warehouse_id",
+    ),
+    (
+        "part by brand and number",
+        select(Part).where(Part.brand_id == 1, Part.normalized_part_number == "0986494524"),
+        "ix_parts_brand_id_normalized_part_number",
+    ),
+    (
+        "part number search",
+        select(Part.id).where(Part.normalized_part_number.ilike("%0986494%")),
+        "ix_parts_normalized_part_number_trgm",
+    ),
+    (
+        "part text search",
+        select(Part.id).where(Part.search_vector.op("@@")(func.to_tsquery(literal("simple").cast(REGCONFIG), "brake:* & pad:*"))),
+        "ix_parts_search_vector",
+    ),
+    (
+        "active rules of a region",
+        select(PricingRule)
+        .where(PricingRule.is_active == True, PricingRule.warehouse_region == "EU")
+        .order_by(PricingRule.priority),
+        "ix_pricing_rules_active_region_priority",
+    ),
+    (
+        "shipping rate bracket",
+        select(ShippingRate).where(
+            ShippingRate.shipping_zone_id == 1,
+            ShippingRate.warehouse_region == "EU",
+            ShippingRate.weight_min <= 2.5,
+            ShippingRate.weight_max >= 2.5,
+        ),
+        "ix_shipping_rates_zone_region_weight",
+    ),
+    (
+        "fx rate of a pair",
+        select(FxRate.rate).where(FxRate.from_currency == "EUR", FxRate.to_currency == "PLN"),
+        "fx_rates_from_currency_to_currency_key",
+    ),
+]
+
+
+def _index_names(plan: dict) -> set:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def check(planner_choice: bool = False) -> bool:
+    ok = True
+    with engine.connect() as conn:
+        if not planner_choice:
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for label, stmt, expected in HOT_QUERIES:
+            sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            used = _index_names(plan[0]["Plan"])
+            passed = expected in used
+            ok = ok and passed
+            print(f"{'ok  ' if passed else 'FAIL'} {label}: expected {expected}, plan uses {sorted(used) or 'no index'}")
+        conn.rollback()
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot queries and check their indexes")
+    parser.add_argument("--planner-choice", action="store_true", help="Keep sequential scans enabled")
+    args = parser.parse_args()
+
+    sys.exit(0 if check(args.planner_choice) else 1)
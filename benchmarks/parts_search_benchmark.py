@@ -0,0 +1,51 @@
+"""Measures ranked part search latency on the current database.
+
+Each query runs through app.parts.parts_search.search_parts with a fresh
+session, the way GET /api/parts/search does. The default queries mix part
+numbers (with and without separators), partial numbers and words; pass your
+own with --query. Run from the repo root:
+
+    PYTHONPATH=.:app python benchmarks/parts_search_benchmark.py --rounds 20
+"""
+import argparse
+import statistics
+import time
+
+from app.parts.parts_search import search_parts
+from db_routers_connection import SessionLocal
+
+
+DEFAULT_QUERIES = ["0986494524", "0 986 494 524", "494", "brake pad", "filter", "oil filt", "spark plug"]
+
+
+def run(queries, rounds: int, limit: int) -> dict:
+    latencies = {q: [] for q in queries}
+    for _ in range(rounds):
+        for q in queries:
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                search_parts(db, q, limit=limit)
+                latencies[q].append(time.perf_counter() - started)
+            finally:
+                db.close()
+    return latencies
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark ranked part search")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--query", action="append", help="Search string, may be repeated")
+    args = parser.parse_args()
+
+    results = run(args.query or DEFAULT_QUERIES, args.rounds, args.limit)
+    everything = [t for ts in results.values() for t in ts]
+    for q, ts in results.items():
+        print(f"{q!r}: p50 {pct(ts, 0.50):.1f}ms, p95 {pct(ts, 0.95):.1f}ms, mean {statistics.mean(ts) * 1000:.1f}ms")
+    print(f"all: p50 {pct(everything, 0.50):.1f}ms, p95 {pct(everything, 0.95):.1f}ms, p99 {pct(everything, 0.99):.1f}ms")
@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import FastAPI
 
 # Routers
@@ -16,10 +18,25 @@ from app.supplier_price.supplier_price_admin_routes import router as admin_suppl
 from app.suppliers.suppliers_admin_routes import router as admin_suppliers_router
 from app.warehouses.warehouses_admin_routes import router as admin_warehouses_router
 from app.cart.cart_routes import router as cart_router
+from app.jobs.jobs_routes import router as jobs_router
+
+from app.part_price_snapshot.part_price_snapshot_service import snapshot_refresher
+from app.jobs.jobs_runner import job_runner
+from app.shipping_rates.shipping_rates_matrix import shipping_rate_matrix
+from app.shipping_zones.shipping_zones_resolver import country_zone_resolver
+from app.sql_instrumentation import sql_instrumentation_middleware, sql_metrics
+from db_routers_connection import SessionLocal, async_engine, async_replica_engine, describe_pool, describe_replica
 
 
 app = FastAPI(title="PB_upwork API")
 
+# uvicorn configures this logger, so startup messages show up in its output
+logger = logging.getLogger("uvicorn.error")
+
+# Query count and DB time per request: Server-Timing header, /metrics/sql,
+# and the repeated statement (N+1) detector
+app.middleware("http")(sql_instrumentation_middleware)
+
 
 # Include routers
 app.include_router(public_parts_router)
@@ -37,9 +54,39 @@ app.include_router(admin_supplierprice_router)
 app.include_router(admin_suppliers_router)
 app.include_router(admin_warehouses_router)
 app.include_router(cart_router)
+app.include_router(jobs_router)
+
+
+@app.on_event("startup")
+def start_background_workers():
+	logger.info("Database pool: %s", describe_pool())
+	logger.info("Read replica: %s", describe_replica())
+	db = SessionLocal()
+	try:
+		shipping_rate_matrix.rebuild(db)
+		country_zone_resolver.reload(db)
+	finally:
+		db.close()
+	snapshot_refresher.start()
+	job_runner.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+	# Running jobs finish their current chunk; queued ones are dropped
+	job_runner.stop()
+	snapshot_refresher.stop()
+	await async_engine.dispose()
+	if async_replica_engine is not None:
+		await async_replica_engine.dispose()
 
 
 @app.get("/healthz")
 def health_check():
 	return {"status": "ok"}
 
+
+@app.get("/metrics/sql")
+def sql_metrics_summary():
+	return sql_metrics.snapshot()
+